@@ -1,5 +1,6 @@
 import streamlit as st
-from PIL import Image
+
+from curry.assets import LOGO_WIDTH, logo_png
 
 st.set_page_config( 
     page_title='Home',
@@ -8,9 +9,8 @@ st.set_page_config(
 # layout='wide' faz usar todo o espaço do monitor
 
 
-#image_path = '/Users/leona/Documents/repos/jupyterlab/'
-image = Image.open( 'logo.PNG' )
-st.sidebar.image( image, width=120 )
+# logo decodificado uma vez por processo ( curry.assets ), nao a cada execucao
+st.sidebar.image( logo_png(), width=LOGO_WIDTH )
 
 st.sidebar.markdown( '# Cury Company' )
 st.sidebar.markdown( '## Fastest Delivery in Town' )
@@ -0,0 +1,94 @@
+"""
+    Benchmark do clean_code: versao original ( mascara + copia por
+    coluna, apply por linha ) contra a versao vetorizada de curry.data.
+
+    Confere que os dois frames sao identicos e mede o tempo em 45k e
+    5M linhas ( o CSV e replicado ate o tamanho pedido ).
+
+    Uso:
+        python -m benchmarks.bench_clean_code --csv dataset/train.csv
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from curry.data import DATASET_PATH, clean_code
+
+
+def clean_code_legacy( df1 ):
+    """ Copia fiel do clean_code original das paginas, usada como referencia. """
+    linhas_selecionadas = (df1['Delivery_person_Age'] != 'NaN ')
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    linhas_selecionadas = (df1['Road_traffic_density'] != 'NaN ')
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    linhas_selecionadas = (df1['City'] != 'NaN ')
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    linhas_selecionadas = (df1['Festival'] != 'NaN ')
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( int )
+    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float)
+    df1['Order_Date'] = pd.to_datetime( df1['Order_Date'], format='%d-%m-%Y' )
+
+    linhas_selecionadas = (df1['multiple_deliveries'] != 'NaN ' )
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( int )
+
+    df1.loc[ :, 'ID' ] = df1.loc[ :, 'ID' ].str.strip()
+    df1.loc[ :, 'Road_traffic_density'] = df1.loc[ :, 'Road_traffic_density' ].str.strip()
+    df1.loc[ :, 'Type_of_order'] = df1.loc[ :, 'Type_of_order' ].str.strip()
+    df1.loc[ :, 'Type_of_vehicle'] = df1.loc[ :, 'Type_of_vehicle' ].str.strip()
+    df1.loc[ :, 'City' ] = df1.loc[ :, 'City' ].str.strip()
+    df1.loc[ :, 'Festival' ] = df1.loc[ :, 'Festival' ].str.strip()
+
+    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1] )
+    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype( int )
+
+    return df1
+
+
+def resize( df, n_rows ):
+    """ Replica ( ou corta ) o frame bruto ate n_rows linhas. """
+    idx = np.resize( np.arange( len( df ) ), n_rows )
+    return df.iloc[idx].reset_index( drop=True )
+
+
+def best_of( func, df, repeat ):
+    best = float( 'inf' )
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        result = func( df )
+        best = min( best, time.perf_counter() - start )
+
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--csv', default=DATASET_PATH )
+    parser.add_argument( '--rows', type=int, nargs='+', default=[45_000, 5_000_000] )
+    parser.add_argument( '--repeat', type=int, default=3 )
+    args = parser.parse_args()
+
+    raw = pd.read_csv( args.csv )
+
+    for n_rows in args.rows:
+        df = resize( raw, n_rows )
+        repeat = args.repeat if n_rows <= 1_000_000 else 1
+
+        t_old, old = best_of( clean_code_legacy, df, repeat )
+        t_new, new = best_of( clean_code, df, repeat )
+        pd.testing.assert_frame_equal( old, new )
+
+        print( f'{n_rows:>10,} linhas | original {t_old:8.3f}s | vetorizado {t_new:8.3f}s '
+               f'| {t_old / t_new:5.1f}x | frames identicos' )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+    Benchmark da coluna distance_km: haversine() por linha via
+    DataFrame.apply( axis=1 ) contra curry.data.haversine_km vetorizado.
+
+    Confere que os resultados batem com o pacote haversine dentro da
+    tolerancia e mede o tempo de cada versao.
+
+    Uso:
+        python -m benchmarks.bench_distance --csv dataset/train.csv
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from haversine import haversine
+
+from curry.data import DATASET_PATH, clean_code, haversine_km
+
+COLS = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude']
+
+
+def distance_apply( df1 ):
+    """ Calculo original da pagina 3_Visao_Restaurantes. """
+    return ( df1.loc[:, COLS].apply( lambda x: haversine(
+                                        (x['Restaurant_latitude'], x['Restaurant_longitude']),
+                                        (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ), axis=1 ) )
+
+
+def distance_vectorized( df1 ):
+    return haversine_km( *( df1[col] for col in COLS ) )
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--csv', default=DATASET_PATH )
+    parser.add_argument( '--rtol', type=float, default=1e-9 )
+    args = parser.parse_args()
+
+    df1 = clean_code( pd.read_csv( args.csv ) )
+
+    start = time.perf_counter()
+    expected = distance_apply( df1 ).to_numpy()
+    t_apply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = distance_vectorized( df1 )
+    t_vec = time.perf_counter() - start
+
+    np.testing.assert_allclose( result, expected, rtol=args.rtol, atol=1e-9 )
+    max_err = np.max( np.abs( result - expected ) )
+
+    print( f'{len( df1 ):,} linhas | apply {t_apply:.3f}s | vetorizado {t_vec:.4f}s '
+           f'| {t_apply / t_vec:,.0f}x | erro max {max_err:.2e} km' )
+
+
+if __name__ == '__main__':
+    main()
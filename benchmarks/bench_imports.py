@@ -0,0 +1,100 @@
+"""
+    Tempo de importacao a frio de cada pagina: os imports do topo do
+    arquivo ( como o Streamlit executa na primeira visita a pagina em um
+    processo novo ), cada medicao em um interpretador novo.
+
+    Com --rev compara com outra revisao do repositorio ( git archive em
+    um diretorio temporario, com o pacote curry daquela revisao ).
+
+    Modulos que nao estao instalados ( ex.: streamlit fora do servidor )
+    sao pulados e listados; o tempo deles fica fora das duas colunas.
+
+    Uso:
+        python -m benchmarks.bench_imports
+        python -m benchmarks.bench_imports --rev HEAD~1 --repeat 7
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+PAGES = ['Home.py', 'pages/1_Visao_Empresa.py', 'pages/2_Visao_Entregadores.py', 'pages/3_Visao_Restaurantes.py']
+
+# roda no interpretador novo: importa cada linha, pula o que nao esta instalado
+RUNNER = """
+import json, sys, time
+missing = []
+start = time.perf_counter()
+for stmt in json.loads( sys.argv[1] ):
+    try:
+        exec( stmt, {} )
+    except ImportError as exc:
+        missing.append( exc.name or stmt )
+print( json.dumps( { 'seconds': time.perf_counter() - start, 'missing': missing } ) )
+"""
+
+
+def import_statements( path ):
+    """ Imports do nivel do modulo, na ordem do arquivo. """
+    with open( path, encoding='utf-8' ) as f:
+        tree = ast.parse( f.read(), path )
+
+    return [ast.unparse( node ) for node in tree.body if isinstance( node, ( ast.Import, ast.ImportFrom ) )]
+
+
+def cold_import( root, statements, repeat ):
+    """ Mediana de repeat importacoes, cada uma em um processo novo com root no sys.path. """
+    env = dict( os.environ, PYTHONPATH=root )
+    times, missing = [], []
+    for _ in range( repeat ):
+        out = subprocess.run( [sys.executable, '-c', RUNNER, json.dumps( statements )], cwd=root, env=env,
+                              capture_output=True, text=True, check=True ).stdout
+        result = json.loads( out )
+        times.append( result['seconds'] )
+        missing = result['missing']
+
+    return statistics.median( times ), missing
+
+
+def export_revision( rev, workdir ):
+    """ Arvore da revisao rev em workdir ( git archive ). """
+    archive = os.path.join( workdir, 'rev.tar' )
+    subprocess.run( ['git', 'archive', '--format=tar', '-o', archive, rev], cwd=ROOT, check=True )
+    with tarfile.open( archive ) as tar:
+        tar.extractall( os.path.join( workdir, 'tree' ) )
+
+    return os.path.join( workdir, 'tree' )
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--rev', default=None, help='revisao para comparar ( ex.: HEAD~1 )' )
+    parser.add_argument( '--repeat', type=int, default=5 )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        trees = { 'atual': ROOT }
+        if args.rev:
+            trees = { args.rev: export_revision( args.rev, workdir ), **trees }
+
+        print( f'{"pagina":<32} | ' + ' | '.join( f'{name:>10}' for name in trees ) + ' | nao instalados' )
+        for page in PAGES:
+            row, skipped = [], set()
+            for root in trees.values():
+                seconds, missing = cold_import( root, import_statements( os.path.join( root, page ) ), args.repeat )
+                row.append( f'{seconds:>9.3f}s' )
+                skipped.update( missing )
+
+            print( f'{page:<32} | ' + ' | '.join( row ) + f' | {", ".join( sorted( skipped ) ) or "-"}' )
+
+
+if __name__ == '__main__':
+    main()
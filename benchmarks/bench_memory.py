@@ -0,0 +1,49 @@
+"""
+    Memoria do frame limpo, em bytes por linha, antes e depois do schema
+    compacto ( curry.data.compact_frame ):
+
+        - antes: todas as colunas do CSV, strings como object, int64 e float64
+        - depois: usecols + categoricas, inteiros reduzidos e float32
+
+    Uso:
+        python -m benchmarks.bench_memory --dataset dataset/train.csv
+        python -m benchmarks.bench_memory --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from benchmarks.synthetic import write_csv
+from curry.data import USE_COLUMNS, add_derived_columns, clean_code, compact_frame, memory_report
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--dataset', default=None )
+    parser.add_argument( '--rows', type=int, default=100_000 )
+    args = parser.parse_args()
+
+    path = args.dataset
+    if path is None:
+        path = os.path.join( tempfile.gettempdir(), 'curry_bench', f'train_{args.rows}.csv' )
+        os.makedirs( os.path.dirname( path ), exist_ok=True )
+        if not os.path.exists( path ):
+            write_csv( path, args.rows )
+
+    before = memory_report( add_derived_columns( clean_code( pd.read_csv( path ) ) ) )
+    after = memory_report( compact_frame( add_derived_columns( clean_code( pd.read_csv( path, usecols=USE_COLUMNS ) ) ) ) )
+
+    report = pd.concat( [before, after], axis=1, keys=['antes', 'depois'] )
+    with pd.option_context( 'display.width', 160, 'display.max_rows', None, 'display.max_columns', None ):
+        print( report.fillna( '-' ) )
+
+    ratio = before.loc['total', 'bytes'] / after.loc['total', 'bytes']
+    print( f'\n{before.loc["total", "bytes_per_row"]} -> {after.loc["total", "bytes_per_row"]} bytes/linha '
+           f'( {ratio:.1f}x menor )' )
+
+
+if __name__ == '__main__':
+    main()
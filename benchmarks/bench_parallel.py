@@ -0,0 +1,77 @@
+"""
+    Agregacao paralela ( curry.parallel ) x groupby do pandas em um
+    dataset sintetico limpo: confere que os resultados batem e mede o
+    tempo no processo e com o pool.
+
+        - count, min, max e somas de inteiros: iguais bit a bit
+        - somas de floats, media, variancia e desvio: rtol 1e-12
+
+    Uso:
+        python -m benchmarks.bench_parallel --rows 2000000 --workers 8
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate
+from curry.data import add_derived_columns, clean_code, compact_frame
+from curry.parallel import AggregationExecutor
+
+AGGS = { 'Time_taken(min)': ['count', 'sum', 'mean', 'std', 'min', 'max'],
+         'Delivery_person_Ratings': ['count', 'sum', 'mean', 'std', 'min', 'max'],
+         'distance_km': ['mean', 'std', 'min', 'max'] }
+
+GROUPINGS = ['City', ['City', 'Road_traffic_density'], 'Order_Date', 'Delivery_person_ID']
+
+
+def check( result, expected ):
+    pd.testing.assert_frame_equal( result, expected, check_exact=False, rtol=1e-12 )
+
+    for col in expected.columns:
+        exact = col[1] in ( 'count', 'min', 'max' ) or ( col[1] == 'sum' and expected[col].dtype.kind == 'i' )
+        if exact and not result[col].equals( expected[col] ):
+            raise AssertionError( f'{col} difere do pandas' )
+
+
+def best_of( func, repeat ):
+    best = float( 'inf' )
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        value = func()
+        best = min( best, time.perf_counter() - start )
+
+    return best, value
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--rows', type=int, default=1_000_000 )
+    parser.add_argument( '--workers', type=int, default=None )
+    parser.add_argument( '--repeat', type=int, default=3 )
+    args = parser.parse_args()
+
+    df = compact_frame( add_derived_columns( clean_code( generate( args.rows ) ) ) ).sort_values( 'Order_Date', kind='stable' )
+
+    serial = AggregationExecutor( max_workers=1 )
+    pool = AggregationExecutor( **( { 'max_workers': args.workers } if args.workers else {} ), min_rows=0 )
+    pool.aggregate( df.iloc[:1000], 'City', AGGS )  # sobe o pool fora da medicao
+
+    print( f'{len( df ):,} linhas, {pool.max_workers} processos' )
+    for by in GROUPINGS:
+        t_pandas, expected = best_of( lambda: df.groupby( by, observed=True ).agg( AGGS ), args.repeat )
+        for partition in ( 'date', 'city' ):
+            t_serial, result = best_of( lambda: serial.aggregate( df, by, AGGS, partition ), args.repeat )
+            check( result, expected )
+            t_pool, result = best_of( lambda: pool.aggregate( df, by, AGGS, partition ), args.repeat )
+            check( result, expected )
+
+            print( f'{str( by ):<36} {partition:<5} | pandas {t_pandas:8.4f}s | '
+                   f'processo {t_serial:8.4f}s | pool {t_pool:8.4f}s' )
+
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+    Suite de benchmark de escala: gera train.csv sinteticos de 100k, 1M
+    e 10M linhas e mede cada etapa de uma execucao das paginas:
+
+        - carga: read_csv, clean_code, colunas derivadas, schema compacto, cache Arrow
+        - estruturas: cubo, indice de datas, indice de dimensoes
+        - filtros: data limite, transito, recorte do cubo
+        - cada funcao de pagina ( graficos, tabelas, KPIs, mapas )
+
+    O resultado e gravado em JSON para comparar versoes entre si.
+
+    Uso:
+        python -m benchmarks.bench_scaling --out bench_results.json
+        python -m benchmarks.bench_scaling --rows 100000 --workdir /tmp/curry_bench
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.pages import load_page
+from benchmarks.synthetic import write_csv
+from curry import columnar, maps, metrics
+from curry.backends import PandasQuery
+from curry.cube import build_cube, slice_cube
+from curry.data import USE_COLUMNS, add_derived_columns, clean_code, compact_frame, date_position
+from curry.dimensions import DimensionIndex
+from curry.kpi import KPIS
+from curry.timeline import DateIndex
+
+DATE_LIMIT = datetime.datetime( 2022, 3, 20 )
+TRAFFIC = ['Low', 'Medium', 'High', 'Jam']
+
+
+def timed( results, n_rows, stage, func, repeat ):
+    """ Executa func repeat vezes, guarda o melhor tempo e devolve o resultado. """
+    best = float( 'inf' )
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        value = func()
+        best = min( best, time.perf_counter() - start )
+
+    results.append( { 'rows': n_rows, 'stage': stage, 'seconds': round( best, 6 ) } )
+    print( f'{n_rows:>12,} | {stage:<40} | {best:10.4f}s', flush=True )
+
+    return value
+
+
+def run_size( n_rows, workdir, repeat, results ):
+    csv_path = os.path.join( workdir, f'train_{n_rows}.csv' )
+    if not os.path.exists( csv_path ):
+        write_csv( csv_path, n_rows )
+
+    raw = timed( results, n_rows, 'load/read_csv', lambda: pd.read_csv( csv_path, usecols=USE_COLUMNS ), 1 )
+    df = timed( results, n_rows, 'load/clean_code', lambda: clean_code( raw ), repeat )
+    df = timed( results, n_rows, 'load/derived_columns', lambda: add_derived_columns( df.copy() ), repeat )
+    df = timed( results, n_rows, 'load/compact_frame',
+                lambda: compact_frame( df.copy() ).sort_values( 'Order_Date', kind='stable' ), repeat )
+    del raw
+
+    arrow_path = columnar.cache_path( csv_path )
+    if columnar.available():
+        timed( results, n_rows, 'load/arrow_write', lambda: columnar.write_cache( df, arrow_path, 'bench' ), 1 )
+        timed( results, n_rows, 'load/arrow_read', lambda: columnar.read_cache( arrow_path, 'bench' ), repeat )
+
+    cube = timed( results, n_rows, 'index/cube', lambda: build_cube( df ), 1 )
+    dim_index = timed( results, n_rows, 'index/dimensions', lambda: DimensionIndex( df ), 1 )
+    date_index = timed( results, n_rows, 'index/dates', lambda: DateIndex( df ), 1 )
+
+    position = timed( results, n_rows, 'filter/date_limit', lambda: date_position( df, DATE_LIMIT ), repeat )
+    rows = timed( results, n_rows, 'filter/traffic',
+                  lambda: np.flatnonzero( dim_index.select( {'Road_traffic_density': TRAFFIC}, position ) )
+                            .astype( np.int32 ), repeat )
+    cube1 = timed( results, n_rows, 'filter/cube', lambda: slice_cube( cube, DATE_LIMIT, TRAFFIC ), repeat )
+
+    query = PandasQuery( df, cube1, rows )
+    indexed = PandasQuery( df, cube1, rows, date_limit=DATE_LIMIT, traffic=TRAFFIC, date_index=date_index )
+    empresa = load_page( '1_Visao_Empresa.py' )
+    restaurantes = load_page( '3_Visao_Restaurantes.py' )
+
+    page_functions = [
+        ( 'empresa/order_metric', lambda: empresa.order_metric( query ) ),
+        ( 'empresa/traffic_order_share', lambda: empresa.traffic_order_share( query ) ),
+        ( 'empresa/traffic_order_city', lambda: empresa.traffic_order_city( query ) ),
+        ( 'empresa/order_by_week', lambda: empresa.order_by_week( query ) ),
+        ( 'empresa/order_share_by_week', lambda: empresa.order_share_by_week( query ) ),
+        ( 'empresa/map_medianas', lambda: maps.render_html( maps.median_markers_map( query.rows( maps.MAP_COLUMNS['Medianas'] ) ) ) ),
+        ( 'empresa/map_densidade', lambda: maps.render_html( maps.density_map( query.rows( maps.MAP_COLUMNS['Densidade'] ) ) ) ),
+        ( 'entregadores/kpis', lambda: query.kpis( ['max_age', 'min_age', 'best_vehicle_condition',
+                                                    'worst_vehicle_condition'] ) ),
+        ( 'entregadores/kpis_date_index', lambda: indexed.kpis( ['max_age', 'min_age', 'best_vehicle_condition',
+                                                                 'worst_vehicle_condition'] ) ),
+        ( 'entregadores/rating_by_courier', lambda: query.table( 'rating_by_courier' ) ),
+        ( 'entregadores/rating_by_traffic', lambda: metrics.rating_by( cube1, 'Road_traffic_density' ) ),
+        ( 'entregadores/rating_by_weather', lambda: metrics.rating_by( cube1, 'Weatherconditions' ) ),
+        ( 'entregadores/top_delivers', lambda: metrics.top_delivers( query.columns( ['Delivery_person_ID', 'City', 'Time_taken(min)'] ) ) ),
+        ( 'restaurantes/kpis', lambda: query.kpis( KPIS - {'max_age', 'min_age', 'best_vehicle_condition',
+                                                            'worst_vehicle_condition'} ) ),
+        ( 'restaurantes/time_by_city_order', lambda: metrics.avg_std_time( cube1, ['City', 'Type_of_order'] ) ),
+        ( 'restaurantes/avg_std_time_graph', lambda: restaurantes.avg_std_time_graph( query ) ),
+        ( 'restaurantes/distance', lambda: restaurantes.distance( query, True ) ),
+        ( 'restaurantes/avg_std_time_on_traffic', lambda: restaurantes.avg_std_time_on_traffic( query ) ),
+    ]
+    for stage, func in page_functions:
+        timed( results, n_rows, stage, func, repeat )
+
+
+def git_revision():
+    try:
+        return subprocess.run( ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                               text=True, check=True ).stdout.strip()
+    except ( OSError, subprocess.CalledProcessError ):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--rows', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000] )
+    parser.add_argument( '--workdir', default=os.path.join( tempfile.gettempdir(), 'curry_bench' ) )
+    parser.add_argument( '--repeat', type=int, default=3 )
+    parser.add_argument( '--out', default='bench_results.json' )
+    args = parser.parse_args()
+
+    os.makedirs( args.workdir, exist_ok=True )
+
+    results = []
+    for n_rows in args.rows:
+        repeat = args.repeat if n_rows <= 1_000_000 else 1
+        run_size( n_rows, args.workdir, repeat, results )
+
+    report = { 'meta': { 'revision': git_revision(),
+                         'timestamp': datetime.datetime.now().isoformat( timespec='seconds' ),
+                         'python': platform.python_version(),
+                         'pandas': pd.__version__,
+                         'numpy': np.__version__,
+                         'machine': platform.machine() },
+               'results': results }
+
+    with open( args.out, 'w' ) as f:
+        json.dump( report, f, indent=2 )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+    Memoria com varias sessoes simultaneas: cada sessao simulada ( uma
+    thread, como no servidor do Streamlit ) aplica um estado de filtros,
+    calcula todos os KPIs e tabelas e segura a consulta ate todas as
+    outras terminarem. Mede quanto fica alocado alem do dataset
+    compartilhado, para 1, 2, 4, ... sessoes:
+
+        - copia: cada sessao copia as linhas filtradas ( df1 com .loc,
+          como as paginas faziam )
+        - compartilhado: PandasBackend.query, so posicoes das linhas e
+          colunas lidas sob demanda
+
+    A memoria e a do tracemalloc ( numpy / Python ) mais a do pool do
+    pyarrow; o frame compartilhado e carregado antes da medicao.
+
+    Uso:
+        python -m benchmarks.bench_sessions --rows 1000000 --sessions 1 2 4 8 16 32
+"""
+
+import argparse
+import datetime
+import gc
+import os
+import tempfile
+import threading
+import tracemalloc
+
+from benchmarks.synthetic import write_csv
+from curry.backends import PandasBackend, PandasQuery, report
+from curry.cube import load_cube, slice_cube
+from curry.data import filter_date_limit, load_data
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow e opcional
+    pa = None
+
+FILTERS = [( datetime.datetime( 2022, 3, 20 ), ['Low', 'Medium', 'High', 'Jam'] ),
+           ( datetime.datetime( 2022, 3, 1 ), ['Low', 'Jam'] ),
+           ( datetime.datetime( 2022, 2, 15 ), ['High'] ),
+           ( datetime.datetime( 2022, 4, 1 ), ['Medium', 'High'] )]
+
+
+def allocated():
+    gc.collect()
+    arrow = pa.total_allocated_bytes() if pa is not None else 0
+    return tracemalloc.get_traced_memory()[0] + arrow
+
+
+def copied_query( path, date_limit, traffic ):
+    """ Caminho antigo: cada sessao materializa o seu df1. """
+    df1 = filter_date_limit( load_data( path ), date_limit )
+    df1 = df1.loc[df1['Road_traffic_density'].isin( traffic ), :]
+
+    return PandasQuery( df1, slice_cube( load_cube( path ), date_limit, traffic ) )
+
+
+def measure( make_query, n_sessions ):
+    """ Bytes alocados com n_sessions sessoes vivas ao mesmo tempo. """
+    ready = threading.Barrier( n_sessions + 1 )
+    release = threading.Event()
+    errors = []
+
+    def session( i ):
+        try:
+            date_limit, traffic = FILTERS[i % len( FILTERS )]
+            query = make_query( date_limit, traffic )
+            result = report( query )  # noqa: F841 - a sessao segura o resultado
+        except Exception as exc:  # pragma: no cover - repassado para a thread principal
+            errors.append( exc )
+        ready.wait()
+        release.wait()
+
+    base = allocated()
+    threads = [threading.Thread( target=session, args=( i, ) ) for i in range( n_sessions )]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    used = allocated() - base
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--dataset', default=None )
+    parser.add_argument( '--rows', type=int, default=200_000 )
+    parser.add_argument( '--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32] )
+    args = parser.parse_args()
+
+    path = args.dataset
+    if path is None:
+        path = os.path.join( tempfile.gettempdir(), 'curry_bench', f'train_{args.rows}.csv' )
+        os.makedirs( os.path.dirname( path ), exist_ok=True )
+        if not os.path.exists( path ):
+            write_csv( path, args.rows )
+
+    backend = PandasBackend( path )
+    frame = load_data( path )
+    report( backend.query( *FILTERS[0] ) )  # dataset, cubo e indices fora da medicao
+
+    modes = { 'copia': lambda date_limit, traffic: copied_query( path, date_limit, traffic ),
+              'compartilhado': backend.query }
+
+    shared_mb = frame.memory_usage( deep=True ).sum() / 2**20
+    print( f'{len( frame ):,} linhas, dataset compartilhado: {shared_mb:.1f} MB' )
+    print( f'{"sessoes":>8} | {"copia MB":>10} | {"compartilhado MB":>16} | {"por sessao KB":>13}' )
+
+    tracemalloc.start()
+    for n_sessions in args.sessions:
+        used = { name: measure( make_query, n_sessions ) for name, make_query in modes.items() }
+        print( f'{n_sessions:>8} | {used["copia"] / 2**20:>10.2f} | {used["compartilhado"] / 2**20:>16.2f} | '
+               f'{used["compartilhado"] / n_sessions / 1024:>13.1f}' )
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+    Equivalencia entre os backends ( curry.backends ): para varios estados
+    de filtro, todos os KPIs e todas as tabelas das paginas precisam sair
+    iguais no pandas ( padrao ) e no SQLite.
+
+        - contagens, chaves, ordem das linhas e KPIs: iguais
+        - medias e desvios: rtol 1e-9 ( a ordem das somas muda )
+
+    O pandas roda com os sketches de entregadores no modo exato
+    ( distinct='exact' ); o erro do HyperLogLog e medido em
+    benchmarks.check_sketches. Os KPIs de coluna do pandas saem do
+    DateIndex ( curry.timeline ) e tambem sao conferidos contra as linhas.
+
+    Tambem mede o tempo de cada consulta nos dois backends.
+
+    Uso:
+        python -m benchmarks.check_backends --dataset dataset/train.csv
+        python -m benchmarks.check_backends --rows 200000
+"""
+
+import argparse
+import copy
+import datetime
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import write_csv
+from curry.backends import TABLES, PandasBackend, get_backend
+from curry.kpi import KPIS
+
+FILTERS = [( None, None ),
+           ( datetime.datetime( 2022, 3, 20 ), ['Low', 'Medium', 'High', 'Jam'] ),
+           ( datetime.datetime( 2022, 3, 1 ), ['Low', 'Jam'] ),
+           ( datetime.datetime( 2022, 2, 11, 12 ), None ),
+           ( datetime.datetime( 2022, 2, 15 ), ['High'] ),
+           ( datetime.datetime( 2022, 4, 13 ), [] )]
+
+
+def assert_same_report( expected, result, label ):
+    """ KPIs iguais e tabelas iguais ( medias e desvios com rtol 1e-9 ) entre dois report(). """
+    ( kpis, tables ), ( other_kpis, other_tables ) = expected, result
+    if kpis != other_kpis:
+        raise AssertionError( f'KPIs diferem em {label}:\n{kpis}\n{other_kpis}' )
+
+    for name in TABLES:
+        try:
+            # sem linhas o merge do pandas reordena as colunas: compara so o conjunto;
+            # no pandas as dimensoes sao categoricas, no SQLite texto
+            pd.testing.assert_frame_equal( other_tables[name], tables[name], check_exact=False,
+                                           rtol=1e-9, check_dtype=False, check_index_type=False,
+                                           check_categorical=False, check_like=tables[name].empty )
+        except AssertionError as exc:
+            raise AssertionError( f'{name} difere em {label}: {exc}' ) from None
+
+
+def compare( path, k=10 ):
+    pandas_backend = PandasBackend( path, distinct='exact' )
+    sqlite_backend = get_backend( 'sqlite', path )
+    timings = { 'pandas': 0.0, 'sqlite': 0.0 }
+
+    for date_limit, traffic in FILTERS:
+        results = {}
+        for backend in ( pandas_backend, sqlite_backend ):
+            start = time.perf_counter()
+            query = backend.query( date_limit, traffic )
+            kpis = query.kpis( KPIS )
+            tables = { name: query.table( name, k ) for name in TABLES }
+            timings[backend.name] += time.perf_counter() - start
+            results[backend.name] = ( kpis, tables )
+
+            if getattr( query, 'date_index', None ) is not None:
+                from_rows = copy.copy( query )
+                from_rows.date_index = None
+                if from_rows.kpis( KPIS ) != kpis:
+                    raise AssertionError( f'KPIs do DateIndex diferem das linhas em {date_limit}, {traffic}:\n'
+                                          f'{kpis}\n{from_rows.kpis( KPIS )}' )
+
+        assert_same_report( results['pandas'], results['sqlite'], f'{date_limit}, {traffic}' )
+        print( f'ok  {str( date_limit ):<20} {traffic}' )
+
+    print( f'tempo total: pandas {timings["pandas"]:.3f}s | sqlite {timings["sqlite"]:.3f}s' )
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--dataset', default=None )
+    parser.add_argument( '--rows', type=int, default=100_000 )
+    args = parser.parse_args()
+
+    path = args.dataset
+    if path is None:
+        path = os.path.join( tempfile.gettempdir(), 'curry_bench', f'train_{args.rows}.csv' )
+        os.makedirs( os.path.dirname( path ), exist_ok=True )
+        if not os.path.exists( path ):
+            write_csv( path, args.rows )
+
+    compare( path )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+    Confere e mede o append incremental de lotes ( curry.ingest ):
+
+        - o CSV sintetico e separado em um CSV base e lotes de dias novos,
+          mais um lote com pedidos atrasados de um dia antigo ( fora de ordem )
+        - depois de acrescentar os lotes, todos os KPIs e tabelas iguais aos
+          do CSV com todas as linhas, em cada estado de filtro de
+          check_backends:
+              - pandas com o cache ja aquecido ( frame e agregados somados
+                so com as linhas novas )
+              - pandas em um processo novo ( CSV base + particoes )
+              - SQLite ( linhas novas no fim da tabela; o lote fora de
+                ordem regera o arquivo )
+              - ingestao em pedacos ( curry.streaming )
+        - o mesmo lote duas vezes e acrescentado uma vez so
+        - com o pyarrow, o frame do cache aquecido continua mapeado do
+          store combinado ( sem copia privada do historico ) e o
+          DimensionIndex estendido e igual ao reconstruido
+
+    E mede o tempo do append + primeira consulta x reprocessar o CSV inteiro.
+
+    Uso:
+        python -m benchmarks.check_ingest
+        python -m benchmarks.check_ingest --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.check_backends import FILTERS, assert_same_report
+from benchmarks.synthetic import write_csv
+from curry.backends import PandasBackend, SqliteBackend, report
+from curry import columnar
+from curry.columnar import cache_path
+from curry.data import _CACHE, clear_cache, combined_dir, dataset_version, read_manifest
+from curry.dimensions import DimensionIndex, load_dimension_index
+from curry.ingest import append_batch
+from curry.streaming import StreamQuery, stream_aggregates
+
+# dias de cada lote; o ultimo lote traz uma fracao dos pedidos de um dia antigo
+BATCH_DAYS = [( '2022-03-25', '2022-03-28' ), ( '2022-03-29', '2022-04-02' ), ( '2022-04-03', '2022-12-31' )]
+LATE_DAY = '2022-03-10'
+
+
+def split_dataset( source, folder ):
+    """ CSV base, lotes ( em ordem de chegada ) e os CSVs de referencia com as mesmas linhas. """
+    raw = pd.read_csv( source, dtype=str, keep_default_na=False )
+    days = pd.to_datetime( raw['Order_Date'], format='%d-%m-%Y' )
+    late = ( days == LATE_DAY ) & ( raw.index % 10 == 0 )
+
+    base = raw.loc[( days < BATCH_DAYS[0][0] ) & ~late]
+    batches = [raw.loc[( days >= first ) & ( days <= last )] for first, last in BATCH_DAYS] + [raw.loc[late]]
+
+    paths = { 'base': os.path.join( folder, 'base.csv' ) }
+    base.to_csv( paths['base'], index=False )
+    for i, batch in enumerate( batches ):
+        paths[f'batch_{i}'] = os.path.join( folder, f'batch_{i}.csv' )
+        batch.to_csv( paths[f'batch_{i}'], index=False )
+
+    # referencias: as mesmas linhas em um CSV so, na ordem de chegada
+    paths['in_order'] = os.path.join( folder, 'in_order.csv' )
+    pd.concat( [base] + batches[:-1] ).to_csv( paths['in_order'], index=False )
+    paths['all'] = os.path.join( folder, 'all.csv' )
+    pd.concat( [base] + batches ).to_csv( paths['all'], index=False )
+
+    return paths, len( batches )
+
+
+def reports( backend ):
+    return { ( date_limit, None if traffic is None else tuple( traffic ) ): report( backend.query( date_limit, traffic ) )
+             for date_limit, traffic in FILTERS }
+
+
+def assert_same_reports( expected, result, label ):
+    for key in expected:
+        assert_same_report( expected[key], result[key], f'{label}, {key}' )
+
+    print( f'ok  {label}: {len( expected )} filtros iguais ao CSV inteiro' )
+
+
+def mapped_file( array ):
+    """ Arquivo mapeado em memoria onde estao os dados do array ( Linux, /proc/self/maps ). """
+    address = array.__array_interface__['data'][0]
+    with open( '/proc/self/maps' ) as f:
+        for line in f:
+            fields = line.split()
+            start, end = ( int( value, 16 ) for value in fields[0].split( '-' ) )
+            if start <= address < end:
+                return fields[5] if len( fields ) > 5 else None
+
+    return None
+
+
+def assert_shared_frame( path ):
+    """ Frame em cache lido do store combinado e DimensionIndex estendido igual ao reconstruido. """
+    frame = _CACHE.get( path )
+    if columnar.available() and os.path.exists( '/proc/self/maps' ):
+        source = mapped_file( frame['Delivery_person_Age'].to_numpy() )
+        assert source is not None and os.path.dirname( source ) == combined_dir( os.path.abspath( path ) ), \
+            f'frame fora do store combinado ( {source} )'
+
+    index, rebuilt = load_dimension_index( path ), DimensionIndex( frame )
+    assert index.n_rows == rebuilt.n_rows and index.levels == rebuilt.levels
+    for dim in rebuilt.codes:
+        assert np.array_equal( index.codes[dim], rebuilt.codes[dim] )
+        assert all( np.array_equal( index.bitmaps[dim][value], bitmap ) for value, bitmap in rebuilt.bitmaps[dim].items() )
+
+    print( 'ok  frame mapeado do store combinado, DimensionIndex estendido igual ao reconstruido' )
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--rows', type=int, default=100_000 )
+    args = parser.parse_args()
+
+    source = os.path.join( tempfile.gettempdir(), 'curry_bench', f'train_{args.rows}.csv' )
+    os.makedirs( os.path.dirname( source ), exist_ok=True )
+    if not os.path.exists( source ):
+        write_csv( source, args.rows )
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths, n_batches = split_dataset( source, folder )
+        expected_in_order = reports( PandasBackend( paths['in_order'], distinct='exact' ) )
+        expected = reports( PandasBackend( paths['all'], distinct='exact' ) )
+
+        # cache aquecido e SQLite gerado antes dos lotes
+        pandas_backend = PandasBackend( paths['base'], distinct='exact' )
+        sqlite_backend = SqliteBackend( paths['base'] )
+        reports( pandas_backend )
+
+        timings = []
+        for i in range( n_batches - 1 ):
+            start = time.perf_counter()
+            append_batch( paths[f'batch_{i}'], paths['base'] )
+            pandas_backend.query()
+            timings.append( time.perf_counter() - start )
+
+        assert_same_reports( expected_in_order, reports( pandas_backend ), 'pandas, cache aquecido, lotes em ordem' )
+        assert_shared_frame( paths['base'] )
+        assert_same_reports( expected_in_order, reports( sqlite_backend ), 'sqlite, linhas no fim da tabela' )
+
+        append_batch( paths[f'batch_{n_batches - 1}'], paths['base'] )
+        assert_same_reports( expected, reports( pandas_backend ), 'pandas, cache aquecido, lote fora de ordem' )
+        assert_shared_frame( paths['base'] )
+        assert_same_reports( expected, reports( sqlite_backend ), 'sqlite, lote fora de ordem' )
+
+        version = dataset_version( paths['base'] )
+        assert append_batch( paths['batch_0'], paths['base'] ) == [] and dataset_version( paths['base'] ) == version
+        print( f'ok  lote repetido ignorado ( {len( read_manifest( paths["base"] ) )} particoes )' )
+
+        clear_cache()
+        assert_same_reports( expected, reports( PandasBackend( paths['base'], distinct='exact' ) ),
+                             'pandas, processo novo' )
+        # tabelas por entregador com a data limite da ingestao: um passe por data
+        streamed = {}
+        for date_limit in dict.fromkeys( key[0] for key in expected ):
+            aggregates = stream_aggregates( paths['base'], distinct='exact', date_limit=date_limit )
+            streamed.update( { key: report( StreamQuery( aggregates, key[0], key[1] ) )
+                               for key in expected if key[0] == date_limit } )
+        assert_same_reports( expected, streamed, 'ingestao em pedacos' )
+
+        # fluxo antigo: CSV trocado, tudo relido e limpo ( sem o cache Arrow )
+        clear_cache()
+        os.remove( cache_path( paths['all'] ) )
+        start = time.perf_counter()
+        PandasBackend( paths['all'], distinct='exact' ).query()
+        full = time.perf_counter() - start
+
+    print( f'append de um lote + primeira consulta: {min( timings ):.2f} s a {max( timings ):.2f} s | '
+           f'CSV inteiro reprocessado + primeira consulta: {full:.2f} s' )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+    Confere os percentis do tempo de entrega ( curry.quantiles ) contra
+    numpy.percentile nas linhas filtradas:
+
+        - para cada erro pedido ( --errors ), varias datas limite e filtros
+          de transito, p50 / p90 / p99 por City x Road_traffic_density x
+          Festival com erro relativo <= erro contra method='lower' ( o valor
+          de posicao floor( q * ( n - 1 ) ), que o sketch estima )
+        - erro relativo contra a interpolacao linear padrao, so reportado
+          ( entre dois valores vizinhos a interpolacao pode cair no meio )
+        - sketches montados por append, em lotes de datas, iguais aos
+          montados de uma vez
+
+    E mede memoria dos sketches e tempo dos percentis: groupby( ... ).quantile
+    nas linhas x soma dos buckets das celulas.
+
+    Uso:
+        python -m benchmarks.check_quantiles --dataset dataset/train.csv
+        python -m benchmarks.check_quantiles --rows 1000000 --errors 0.02 0.01 0.005
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_csv
+from curry.cube import cube_cells
+from curry.data import load_data
+from curry.quantiles import QUANTILE_DIMENSIONS, QUANTILES, QuantileSketches
+
+BY = ['City', 'Road_traffic_density', 'Festival']
+
+TRAFFIC = [None, ['Low', 'Jam'], ['High'], ['Medium', 'High']]
+
+
+def filtered( df, date_limit, traffic ):
+    df1 = df.loc[df['Order_Date'] < date_limit]
+    if traffic is not None:
+        df1 = df1.loc[df1['Road_traffic_density'].isin( traffic )]
+
+    return df1
+
+
+def exact( df1, method ):
+    """ Percentis por BY direto das linhas ( numpy.percentile ). """
+    groups = df1.groupby( BY, sort=True, observed=True )['Time_taken(min)']
+    df_aux = groups.agg( [( name, lambda x, q=q: np.percentile( x, q * 100, method=method ) )
+                          for name, q in QUANTILES.items()] )
+
+    return df_aux.reset_index()
+
+
+def align( expected, result ):
+    """ Percentis exatos e do sketch lado a lado, pelas celulas BY ( categorias x texto ). """
+    keys = lambda df: df.loc[:, BY].astype( str )  # noqa: E731
+    merged = pd.merge( pd.concat( [keys( expected ), expected.drop( columns=BY )], axis=1 ),
+                       pd.concat( [keys( result ), result.drop( columns=BY )], axis=1 ),
+                       how='left', on=BY, suffixes=( '', '_sketch' ) )
+    assert len( merged ) == len( expected ) and merged['n'].notna().all()
+
+    return merged
+
+
+def relative_errors( df, sketches, states, method ):
+    errors = []
+    for date_limit, traffic in states:
+        result = sketches.quantiles( cube_cells( sketches.cells, date_limit, traffic ), BY )
+        expected = exact( filtered( df, date_limit, traffic ), method )
+        merged = align( expected, result )
+
+        for name in QUANTILES:
+            errors.append( np.abs( merged[f'{name}_sketch'] - merged[name] ) / merged[name] )
+
+    return np.concatenate( errors )
+
+
+def check_append( df, error, n_batches=7 ):
+    """ Append em lotes de datas ( como chegam arquivos novos ) == sketches de uma vez. """
+    whole = QuantileSketches( df, error=error )
+    incremental = QuantileSketches( error=error )
+    for batch in np.array_split( np.arange( len( df ) ), n_batches ):
+        incremental.append( df.iloc[batch] )
+
+    pd.testing.assert_frame_equal( whole.cells, incremental.cells, check_categorical=False )
+    assert np.array_equal( whole.counts, incremental.counts ) and np.array_equal( whole.keys, incremental.keys )
+
+    print( f'ok  append em {n_batches} lotes == sketches de uma vez' )
+
+
+def best_of( func, repeat=5 ):
+    best = float( 'inf' )
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        func()
+        best = min( best, time.perf_counter() - start )
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--dataset', default=None )
+    parser.add_argument( '--rows', type=int, default=100_000 )
+    parser.add_argument( '--errors', type=float, nargs='+', default=[0.02, 0.01, 0.005] )
+    args = parser.parse_args()
+
+    path = args.dataset
+    if path is None:
+        path = os.path.join( tempfile.gettempdir(), 'curry_bench', f'train_{args.rows}.csv' )
+        os.makedirs( os.path.dirname( path ), exist_ok=True )
+        if not os.path.exists( path ):
+            write_csv( path, args.rows )
+
+    df = load_data( path ).loc[:, QUANTILE_DIMENSIONS + ['Time_taken(min)']]
+    days = pd.date_range( df['Order_Date'].min() + pd.Timedelta( days=1 ), df['Order_Date'].max() + pd.Timedelta( days=1 ) )
+    states = [( date_limit, traffic ) for date_limit in days[::5] for traffic in TRAFFIC]
+
+    check_append( df, args.errors[0] )
+
+    print( f'{"erro pedido":>11} | {"buckets":>7} | {"erro max lower":>14} | {"erro max linear":>15} | {"KB":>7}' )
+    for error in args.errors:
+        sketches = QuantileSketches( df, error=error )
+        lower = relative_errors( df, sketches, states, 'lower' )
+        linear = relative_errors( df, sketches, states, 'linear' )
+        print( f'{error:>11.3f} | {len( sketches.keys ):>7} | {lower.max():>14.4f} | {linear.max():>15.4f} | '
+               f'{sketches.counts.nbytes / 1024:>7.1f}' )
+        assert lower.max() <= error * ( 1 + 1e-9 ), error
+
+    print( f'ok  {len( states )} filtros x {len( QUANTILES )} percentis dentro do erro pedido ( method=lower )' )
+
+    date_limit, traffic = pd.Timestamp( '2022-03-20' ), ['Low', 'Jam']
+    t_rows = best_of( lambda: filtered( df, date_limit, traffic ).groupby( BY, observed=True )['Time_taken(min)']
+                                                              .quantile( list( QUANTILES.values() ) ) )
+    t_sketch = best_of( lambda: sketches.quantiles( cube_cells( sketches.cells, date_limit, traffic ), BY ) )
+    print( f'p50 / p90 / p99 por City x transito x Festival: quantile nas linhas {t_rows * 1000:.2f} ms | '
+           f'sketches {t_sketch * 1000:.2f} ms' )
+
+
+if __name__ == '__main__':
+    main()
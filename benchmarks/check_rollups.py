@@ -0,0 +1,114 @@
+"""
+    Confere os rollups de tempo ( curry.timeline.TimeRollups ):
+
+        - para cada resolucao ( dia, semana ISO, mes ), cada data limite
+          do periodo ( inclusive com hora, no meio do dia ) e alguns
+          filtros de transito, pedidos e medias por bucket iguais a um
+          groupby direto nas linhas filtradas
+        - rollups montados por append, em lotes de datas, iguais aos
+          montados de uma vez
+
+    E mede a consulta semanal: groupby com strftime( '%U' ) nas linhas
+    x celulas dos rollups.
+
+    Uso:
+        python -m benchmarks.check_rollups --dataset dataset/train.csv
+        python -m benchmarks.check_rollups --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_csv
+from curry.cube import rollup
+from curry.data import TIME_KEYS, load_data
+from curry.timeline import ROLLUP_COLUMNS, TimeRollups, load_time_rollups
+
+TRAFFIC = [None, ['Low', 'Jam'], ['High'], []]
+
+
+def expected( df1, key, date_limit, traffic ):
+    """ Pedidos e tempo medio por bucket direto das linhas. """
+    df1 = df1.loc[df1['Order_Date'] < date_limit]
+    if traffic is not None:
+        df1 = df1.loc[df1['Road_traffic_density'].isin( traffic )]
+
+    df_aux = df1.groupby( key )['Time_taken(min)'].agg( ['count', 'mean', 'std'] )
+    df_aux.columns = ['n', 'time_mean', 'time_std']
+
+    return df_aux
+
+
+def check_filters( df, rollups ):
+    days = pd.date_range( df['Order_Date'].min(), df['Order_Date'].max() + pd.Timedelta( days=1 ) )
+    limits = list( days ) + [day + pd.Timedelta( hours=12 ) for day in days[::7]]
+
+    for resolution, key in TIME_KEYS.items():
+        for date_limit in limits:
+            for traffic in TRAFFIC:
+                result = rollup( rollups.cells( resolution, date_limit, traffic ), key, ['time'] )
+                pd.testing.assert_frame_equal( result, expected( df, key, date_limit, traffic ), check_exact=False,
+                                               rtol=1e-9, check_dtype=False, check_index_type=False )
+
+        print( f'ok  {resolution:<6} {len( limits )} datas limite x {len( TRAFFIC )} filtros de transito' )
+
+
+def check_append( df, rollups, n_batches=7 ):
+    """ Append em lotes de datas ( como chegam arquivos novos ) == rollups de uma vez. """
+    incremental = TimeRollups()
+    dates = df['Order_Date'].to_numpy()
+    cuts = np.searchsorted( dates, np.quantile( dates.astype( np.int64 ), np.linspace( 0, 1, n_batches + 1 )[1:-1] )
+                                    .astype( 'datetime64[ns]' ) )
+    for batch in np.split( np.arange( len( df ) ), cuts ):
+        incremental.append( df.iloc[batch] )
+
+    for resolution in TIME_KEYS:
+        pd.testing.assert_frame_equal( incremental.tables[resolution], rollups.tables[resolution],
+                                       check_exact=False, rtol=1e-12, check_index_type=False,
+                                       check_categorical=False )
+
+    print( f'ok  append em {n_batches} lotes == rollups de uma vez' )
+
+
+def best_of( func, repeat=5 ):
+    best = float( 'inf' )
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        func()
+        best = min( best, time.perf_counter() - start )
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--dataset', default=None )
+    parser.add_argument( '--rows', type=int, default=100_000 )
+    args = parser.parse_args()
+
+    path = args.dataset
+    if path is None:
+        path = os.path.join( tempfile.gettempdir(), 'curry_bench', f'train_{args.rows}.csv' )
+        os.makedirs( os.path.dirname( path ), exist_ok=True )
+        if not os.path.exists( path ):
+            write_csv( path, args.rows )
+
+    df = load_data( path ).loc[:, ROLLUP_COLUMNS + ['Order_Date', 'ID']]
+    rollups = load_time_rollups( path )
+
+    check_filters( df, rollups )
+    check_append( df, rollups )
+
+    t_rows = best_of( lambda: df.loc[:, ['ID']].groupby( df['Order_Date'].dt.strftime( '%U' ) ).count() )
+    t_cells = best_of( lambda: rollup( rollups.cells( 'week', pd.Timestamp( '2022-03-20' ), ['Low', 'Jam'] ),
+                                       'week_key' ) )
+    print( f'pedidos por semana: strftime nas linhas {t_rows * 1000:.2f} ms | rollups {t_cells * 1000:.2f} ms' )
+
+
+if __name__ == '__main__':
+    main()
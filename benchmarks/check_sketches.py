@@ -0,0 +1,191 @@
+"""
+    Confere os sketches de entregadores distintos ( curry.sketches ):
+
+        - modo 'exact': para cada data limite do periodo e alguns filtros
+          de transito, total e contagem por semana iguais ao nunique das
+          linhas filtradas
+        - modo 'hll': erro relativo das mesmas contagens para cada erro
+          pedido ( --errors ); o erro medio precisa ficar dentro do erro
+          padrao e o maximo dentro de max_error_bound erros padrao ( cresce
+          com o numero de contagens conferidas )
+        - append em lotes de datas == sketches montados de uma vez
+        - modo 'auto': exato enquanto os entregadores cabem nos
+          registradores; com erro grande ( poucos registradores ) passa
+          para HLL no meio dos lotes e fica com os mesmos registradores
+          do modo 'hll'
+
+    E mede memoria dos sketches e tempo da contagem: nunique nas linhas
+    filtradas x uniao das celulas.
+
+    Uso:
+        python -m benchmarks.check_sketches --dataset dataset/train.csv
+        python -m benchmarks.check_sketches --rows 1000000 --errors 0.05 0.02 0.01
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_csv
+from curry.data import load_data
+from curry.sketches import SKETCH_DIMENSIONS, CourierSketches
+
+TRAFFIC = [None, ['Low', 'Jam'], ['High'], ['Medium', 'High']]
+
+# chance aceita de o erro maximo passar do limite com os sketches corretos
+FAILURE_PROBABILITY = 0.01
+
+
+def exact_counts( df, date_limit, traffic ):
+    """ ( total, Series por week_key ) de entregadores distintos direto das linhas. """
+    df1 = df.loc[df['Order_Date'] < date_limit]
+    if traffic is not None:
+        df1 = df1.loc[df1['Road_traffic_density'].isin( traffic )]
+
+    return df1['Delivery_person_ID'].nunique(), df1.groupby( 'week_key' )['Delivery_person_ID'].nunique()
+
+
+def sketch_counts( sketches, date_limit, traffic ):
+    mask = sketches.select( date_limit, traffic )
+    weekly = sketches.count_by( 'week_key', mask ).set_index( 'week_key' )['Delivery_person_ID']
+
+    return sketches.count( mask ), weekly
+
+
+def filter_states( df ):
+    days = pd.date_range( df['Order_Date'].min() + pd.Timedelta( days=1 ), df['Order_Date'].max() + pd.Timedelta( days=1 ) )
+    return [( date_limit, traffic ) for date_limit in days for traffic in TRAFFIC]
+
+
+def max_error_bound( n_estimates, failure=FAILURE_PROBABILITY ):
+    """
+        Limite do maior erro relativo, em erros padrao, para n_estimates
+        contagens: com o erro de cada uma ~ normal, P( |erro| > z ) <=
+        2 exp( -z^2 / 2 ) e, pela uniao, o maximo passa de z com chance
+        <= failure quando z = sqrt( 2 ln( 2 n / failure ) ).
+    """
+    return float( np.sqrt( 2 * np.log( 2 * max( n_estimates, 1 ) / failure ) ) )
+
+
+def relative_errors( df, sketches, states ):
+    errors = []
+    for date_limit, traffic in states:
+        total, weekly = exact_counts( df, date_limit, traffic )
+        sketch_total, sketch_weekly = sketch_counts( sketches, date_limit, traffic )
+        if total:
+            errors.append( abs( sketch_total - total ) / total )
+        weekly = weekly.loc[weekly > 0]
+        errors.extend( np.abs( sketch_weekly.reindex( weekly.index ).to_numpy() - weekly.to_numpy() ) / weekly.to_numpy() )
+
+    return np.array( errors )
+
+
+def check_exact( df, states ):
+    sketches = CourierSketches( df, mode='exact' )
+    for date_limit, traffic in states:
+        total, weekly = exact_counts( df, date_limit, traffic )
+        sketch_total, sketch_weekly = sketch_counts( sketches, date_limit, traffic )
+        assert sketch_total == total, ( date_limit, traffic, sketch_total, total )
+        pd.testing.assert_series_equal( sketch_weekly, weekly.loc[weekly > 0], check_dtype=False,
+                                        check_index_type=False, check_names=False )
+
+    print( f'ok  exact  {len( states )} filtros: total e semanas iguais ao nunique' )
+
+
+def order( sketches ):
+    # as celulas podem sair em outra ordem: compara por chave
+    return sketches.cells.astype( str ).sort_values( SKETCH_DIMENSIONS ).index
+
+
+def check_append( df, mode, error, n_batches=7 ):
+    """ Append em lotes de datas ( como chegam arquivos novos ) == sketches de uma vez. """
+    whole = CourierSketches( df, mode, error )
+    incremental = CourierSketches( mode=mode, error=error )
+    for batch in np.array_split( np.arange( len( df ) ), n_batches ):
+        incremental.append( df.iloc[batch] )
+
+    assert np.array_equal( whole.cells.astype( str ).loc[order( whole )].to_numpy(),
+                           incremental.cells.astype( str ).loc[order( incremental )].to_numpy() )
+    if whole.mode == 'hll':
+        assert np.array_equal( whole.registers[order( whole )], incremental.registers[order( incremental )] )
+    assert whole.count() == incremental.count()
+
+    print( f'ok  {mode:<6} append em {n_batches} lotes == sketches de uma vez' )
+
+    return incremental
+
+
+def check_auto( df, error ):
+    """ 'auto': exato enquanto cabe, e na troca os mesmos registradores do 'hll'. """
+    sketches = CourierSketches( df, 'auto', error )
+    couriers = df['Delivery_person_ID'].nunique()
+    assert sketches.mode == ( 'exact' if couriers <= 2 ** sketches.precision else 'hll' ), ( error, sketches.mode )
+    if sketches.mode == 'exact':
+        assert sketches.count() == couriers
+
+    hll = CourierSketches( df, 'hll', error )
+    # erro grande: menos registradores que entregadores, a troca acontece no meio dos lotes
+    switched = check_append( df, 'auto', 0.3 )
+    reference = CourierSketches( df, 'hll', 0.3 )
+    assert switched.mode == 'hll' and switched.error == reference.error
+    assert np.array_equal( switched.registers[order( switched )], reference.registers[order( reference )] )
+
+    print( f'ok  auto   {couriers} entregadores x {2 ** sketches.precision} registradores: {sketches.mode} '
+           f'( hll {hll.registers.nbytes / 2**20:.2f} MB, auto {sketches.registers.nbytes / 2**20:.2f} MB )' )
+
+
+def best_of( func, repeat=5 ):
+    best = float( 'inf' )
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        func()
+        best = min( best, time.perf_counter() - start )
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--dataset', default=None )
+    parser.add_argument( '--rows', type=int, default=100_000 )
+    parser.add_argument( '--errors', type=float, nargs='+', default=[0.05, 0.02, 0.01] )
+    args = parser.parse_args()
+
+    path = args.dataset
+    if path is None:
+        path = os.path.join( tempfile.gettempdir(), 'curry_bench', f'train_{args.rows}.csv' )
+        os.makedirs( os.path.dirname( path ), exist_ok=True )
+        if not os.path.exists( path ):
+            write_csv( path, args.rows )
+
+    df = load_data( path ).loc[:, SKETCH_DIMENSIONS + ['Order_Date', 'Delivery_person_ID']]
+    states = filter_states( df )
+
+    check_exact( df, states )
+    check_append( df, 'exact', args.errors[0] )
+    check_append( df, 'hll', args.errors[0] )
+    check_auto( df, args.errors[-1] )
+
+    print( f'{"erro pedido":>11} | {"p":>2} | {"erro padrao":>11} | {"erro medio":>10} | {"erro max":>8} | {"MB":>6}' )
+    for error in args.errors:
+        sketches = CourierSketches( df, 'hll', error )
+        errors = relative_errors( df, sketches, states )
+        print( f'{error:>11.3f} | {sketches.precision:>2} | {sketches.error:>11.4f} | {errors.mean():>10.4f} | '
+               f'{errors.max():>8.4f} | {sketches.registers.nbytes / 2**20:>6.2f}' )
+        assert errors.mean() <= sketches.error and errors.max() <= max_error_bound( len( errors ) ) * sketches.error, error
+
+    date_limit, traffic = pd.Timestamp( '2022-03-20' ), ['Low', 'Jam']
+    t_rows = best_of( lambda: exact_counts( df, date_limit, traffic ) )
+    t_sketch = best_of( lambda: sketch_counts( sketches, date_limit, traffic ) )
+    auto = CourierSketches( df, 'auto', args.errors[-1] )
+    t_auto = best_of( lambda: sketch_counts( auto, date_limit, traffic ) )
+    print( f'entregadores distintos ( total + semanas ): nunique nas linhas {t_rows * 1000:.2f} ms | '
+           f'sketches hll {t_sketch * 1000:.2f} ms | auto ( {auto.mode} ) {t_auto * 1000:.2f} ms' )
+
+
+if __name__ == '__main__':
+    main()
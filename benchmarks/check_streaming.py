@@ -0,0 +1,107 @@
+"""
+    Confere e mede a ingestao em pedacos ( curry.streaming ):
+
+        - para cada tamanho de pedaco ( --chunk-rows ) e cada estado de
+          filtro de check_backends, todos os KPIs e tabelas iguais aos do
+          backend pandas ( entregadores distintos no modo exato )
+        - pico de memoria ( tracemalloc ) da carga inteira ( read_csv +
+          clean_code ) x da ingestao em pedacos, e o tamanho dos agregados;
+          com pedacos menores que o CSV o pico tem que ficar abaixo do da
+          carga inteira
+
+    Cada estado de filtro e um passe pelo CSV: as tabelas por entregador
+    usam a data limite da ingestao ( StreamAggregates.date_limit ).
+
+    Uso:
+        python -m benchmarks.check_streaming --dataset dataset/train.csv
+        python -m benchmarks.check_streaming --rows 1000000 --chunk-rows 20000 100000
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.check_backends import FILTERS, assert_same_report
+from benchmarks.synthetic import write_csv
+from curry.backends import PandasBackend, report
+from curry.data import USE_COLUMNS, add_derived_columns, clean_code
+from curry.streaming import StreamQuery, stream_aggregates
+
+
+def peak( func ):
+    """ ( resultado, segundos, pico de memoria em MB ) de func(). """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, seconds, peak_bytes / 2**20
+
+
+def aggregates_mb( aggregates ):
+    """ Memoria dos agregados ( cubo, estatisticas online, rollups e sketches ). """
+    frames = [aggregates.cube, aggregates.kpis.table, aggregates.couriers_stats.table, aggregates.couriers_stats.cells,
+              aggregates.couriers_stats.first, aggregates.couriers.cells, aggregates.quantiles.cells]
+    frames += [table for table in aggregates.rollups.tables.values() if table is not None]
+    arrays = [aggregates.couriers.registers, aggregates.quantiles.counts]
+
+    total = sum( pd.Series( frame.memory_usage( deep=True ) ).sum() for frame in frames ) + sum( a.nbytes for a in arrays )
+
+    return total / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--dataset', default=None )
+    parser.add_argument( '--rows', type=int, default=200_000 )
+    parser.add_argument( '--chunk-rows', type=int, nargs='+', default=[10_000, 50_000] )
+    args = parser.parse_args()
+
+    path = args.dataset
+    if path is None:
+        path = os.path.join( tempfile.gettempdir(), 'curry_bench', f'train_{args.rows}.csv' )
+        os.makedirs( os.path.dirname( path ), exist_ok=True )
+        if not os.path.exists( path ):
+            write_csv( path, args.rows )
+
+    backend = PandasBackend( path, distinct='exact' )
+    expected = { ( date_limit, None if traffic is None else tuple( traffic ) ): report( backend.query( date_limit, traffic ) )
+                 for date_limit, traffic in FILTERS }
+
+    df1, seconds, full_mb = peak( lambda: add_derived_columns( clean_code( pd.read_csv( path, usecols=USE_COLUMNS ) ) ) )
+    n_rows = len( df1 )
+    del df1
+    print( f'{"modo":<22} | {"tempo s":>8} | {"pico MB":>8} | {"agregados MB":>12}' )
+    print( f'{"carga inteira":<22} | {seconds:>8.2f} | {full_mb:>8.1f} | {"-":>12}' )
+
+    for chunk_rows in args.chunk_rows:
+        passes = []
+        for date_limit, traffic in FILTERS:
+            aggregates, seconds, stream_mb = peak( lambda: stream_aggregates( path, chunk_rows, distinct='exact',
+                                                                              date_limit=date_limit ) )
+            passes.append( ( seconds, stream_mb ) )
+
+            key = ( date_limit, None if traffic is None else tuple( traffic ) )
+            assert_same_report( expected[key], report( StreamQuery( aggregates, date_limit, traffic ) ),
+                                f'{chunk_rows} linhas por pedaco, {date_limit}, {traffic}' )
+
+        seconds, stream_mb = max( passes, key=lambda item: item[1] )
+        print( f'{f"pedacos de {chunk_rows:,}":<22} | {seconds:>8.2f} | {stream_mb:>8.1f} | '
+               f'{aggregates_mb( aggregates ):>12.1f}' )
+        if chunk_rows < n_rows and stream_mb >= full_mb:
+            raise AssertionError( f'pico da ingestao em pedacos de {chunk_rows:,} linhas ( {stream_mb:.1f} MB ) '
+                                  f'nao fica abaixo do da carga inteira ( {full_mb:.1f} MB )' )
+
+    print( f'ok  {len( args.chunk_rows )} tamanhos de pedaco x {len( FILTERS )} filtros iguais ao backend pandas' )
+
+
+if __name__ == '__main__':
+    main()
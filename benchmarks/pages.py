@@ -0,0 +1,38 @@
+"""
+    Carrega as funcoes das paginas do Streamlit sem executar a pagina.
+
+    Os scripts em pages/ chamam st.set_page_config, montam a barra
+    lateral e leem o dataset no nivel do modulo, entao nao podem ser
+    importados fora de uma sessao. Aqui so os imports ( exceto streamlit
+    e PIL ) e as definicoes de funcao de cada arquivo sao executados.
+"""
+
+import ast
+import os
+import types
+
+PAGES_DIR = os.path.join( os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ), 'pages' )
+
+SKIPPED_MODULES = ( 'streamlit', 'PIL' )
+
+
+def _skipped( node ):
+    names = [alias.name for alias in node.names] if isinstance( node, ast.Import ) else [node.module or '']
+    return any( name.split( '.' )[0].startswith( SKIPPED_MODULES ) for name in names )
+
+
+def load_page( filename ):
+    """ Retorna um modulo com os imports e as funcoes de pages/<filename>. """
+    path = os.path.join( PAGES_DIR, filename )
+    with open( path, encoding='utf-8' ) as f:
+        tree = ast.parse( f.read(), path )
+
+    body = [node for node in tree.body
+            if isinstance( node, ( ast.FunctionDef, ast.ClassDef ) )
+            or ( isinstance( node, ( ast.Import, ast.ImportFrom ) ) and not _skipped( node ) )]
+
+    module = types.ModuleType( os.path.splitext( filename )[0] )
+    module.__file__ = path
+    exec( compile( ast.Module( body, type_ignores=[] ), path, 'exec' ), module.__dict__ )
+
+    return module
@@ -0,0 +1,143 @@
+"""
+    Gerador deterministico de um train.csv sintetico com o mesmo schema
+    bruto ( e as mesmas manias ) que o clean_code espera:
+
+        - 'NaN ' ( com espaco ) como valor ausente nas colunas de texto
+        - strings com espaco no final ( ID, cidade, transito, ... )
+        - 'conditions Sunny' / 'conditions NaN' no clima
+        - '(min) NN' no tempo de entrega
+        - datas dd-mm-aaaa entre 11-02-2022 e 06-04-2022
+        - as tres cidades 'Metropolitian', 'Urban' e 'Semi-Urban'
+
+    Uso:
+        python -m benchmarks.synthetic --rows 1000000 --out /tmp/train_1m.csv
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# prefixo do Delivery_person_ID -> centro ( lat, lon ) dos restaurantes
+CITY_CODES = { 'INDO': ( 22.72, 75.86 ), 'BANG': ( 12.97, 77.59 ), 'COIMB': ( 11.02, 76.96 ),
+               'CHEN': ( 13.08, 80.27 ), 'HYD': ( 17.39, 78.49 ), 'RANCHI': ( 23.34, 85.31 ),
+               'MYS': ( 12.30, 76.64 ), 'DEH': ( 30.32, 78.03 ), 'KOC': ( 9.93, 76.27 ),
+               'PUNE': ( 18.52, 73.86 ), 'LUDH': ( 30.90, 75.86 ), 'KNP': ( 26.45, 80.33 ),
+               'MUM': ( 19.08, 72.88 ), 'KOL': ( 22.57, 88.36 ), 'JAP': ( 26.91, 75.79 ),
+               'SUR': ( 21.17, 72.83 ), 'GOA': ( 15.30, 74.12 ), 'AURG': ( 19.88, 75.34 ),
+               'AGR': ( 27.18, 78.01 ), 'VAD': ( 22.31, 73.18 ), 'ALH': ( 25.44, 81.85 ),
+               'BHP': ( 23.26, 77.41 ) }
+
+CITIES = ['Metropolitian ', 'Urban ', 'Semi-Urban ']
+TRAFFIC = ['Low ', 'Medium ', 'High ', 'Jam ']
+WEATHER = ['Sunny', 'Stormy', 'Sandstorms', 'Cloudy', 'Fog', 'Windy']
+ORDERS = ['Snack ', 'Meal ', 'Drinks ', 'Buffet ']
+VEHICLES = ['motorcycle ', 'scooter ', 'electric_scooter ']
+
+FIRST_DAY = pd.Timestamp( 2022, 2, 11 )
+N_DAYS = 55
+
+# fracao de valores ausentes ( 'NaN ' ) por coluna, proxima do dataset real
+NAN_RATE = { 'Delivery_person_Age': 0.04, 'Road_traffic_density': 0.01, 'City': 0.03,
+             'Festival': 0.005, 'multiple_deliveries': 0.02, 'Time_Orderd': 0.04,
+             'Weatherconditions': 0.01 }  # clima ausente vira 'conditions NaN'
+
+
+def _with_nan( rng, values, column ):
+    values = np.asarray( values, dtype=object )
+    values[rng.random( len( values ) ) < NAN_RATE[column]] = 'NaN '
+
+    return values
+
+
+def generate( n_rows, seed=42, start=0 ):
+    """
+        Gera n_rows linhas brutas. O mesmo ( seed, start ) gera sempre o
+        mesmo bloco, entao arquivos grandes podem ser escritos em partes.
+    """
+    rng = np.random.default_rng( [seed, start] )
+    row_id = np.arange( start, start + n_rows )
+
+    codes = np.array( list( CITY_CODES ) )
+    centers = np.array( list( CITY_CODES.values() ) )
+    city_code = rng.integers( 0, len( codes ), n_rows )
+    restaurant = rng.integers( 1, 21, n_rows )
+    deliverer = rng.integers( 1, 4, n_rows )
+
+    rest_lat = centers[city_code, 0] + rng.normal( 0, 0.05, n_rows )
+    rest_lon = centers[city_code, 1] + rng.normal( 0, 0.05, n_rows )
+    # ~1% dos restaurantes com coordenada zerada, como no dataset real
+    zero = rng.random( n_rows ) < 0.01
+    rest_lat[zero] = 0.0
+    rest_lon[zero] = 0.0
+    deliv_lat = np.abs( rest_lat ) + rng.uniform( 0.01, 0.12, n_rows )
+    deliv_lon = np.abs( rest_lon ) + rng.uniform( 0.01, 0.12, n_rows )
+
+    traffic = rng.choice( len( TRAFFIC ), n_rows, p=[0.34, 0.24, 0.10, 0.32] )
+    city = rng.choice( len( CITIES ), n_rows, p=[0.75, 0.22, 0.03] )
+    festival = rng.random( n_rows ) < 0.02
+    multiple = rng.choice( 4, n_rows, p=[0.31, 0.62, 0.05, 0.02] )
+    age = rng.integers( 20, 40, n_rows )
+    rating = np.clip( np.round( rng.normal( 4.6, 0.3, n_rows ), 1 ), 1.0, 5.0 )
+    day = rng.integers( 0, N_DAYS, n_rows )
+    hour = rng.integers( 8, 24, n_rows )
+    minute = rng.choice( [0, 15, 25, 30, 35, 40, 45, 50, 55], n_rows )
+
+    time_taken = np.clip( 15 + 4 * traffic + 8 * festival + 3 * multiple
+                          + rng.normal( 8, 6, n_rows ), 10, 54 ).astype( int )
+
+    age_text = _with_nan( rng, age.astype( str ), 'Delivery_person_Age' )
+    rating_text = rating.astype( str ).astype( object )
+    # no dataset real a avaliacao falta junto com a idade
+    rating_text[age_text == 'NaN '] = 'NaN '
+
+    order_time = pd.Series( hour ).map( '{:02d}'.format ) + ':' + pd.Series( minute ).map( '{:02d}'.format ) + ':00'
+    picked_time = pd.Series( np.minimum( hour, 23 ) ).map( '{:02d}'.format ) + ':' + pd.Series( ( minute + 10 ) % 60 ).map( '{:02d}'.format ) + ':00'
+
+    return pd.DataFrame( {
+        'ID': pd.Series( row_id ).map( '0x{:x} '.format ),
+        'Delivery_person_ID': ( pd.Series( codes[city_code] ) + 'RES' + pd.Series( restaurant ).map( '{:02d}'.format )
+                                + 'DEL' + pd.Series( deliverer ).map( '{:02d}'.format ) + ' ' ),
+        'Delivery_person_Age': age_text,
+        'Delivery_person_Ratings': rating_text,
+        'Restaurant_latitude': rest_lat.round( 6 ),
+        'Restaurant_longitude': rest_lon.round( 6 ),
+        'Delivery_location_latitude': deliv_lat.round( 6 ),
+        'Delivery_location_longitude': deliv_lon.round( 6 ),
+        'Order_Date': ( FIRST_DAY + pd.to_timedelta( day, unit='D' ) ).strftime( '%d-%m-%Y' ),
+        'Time_Orderd': _with_nan( rng, order_time, 'Time_Orderd' ),
+        'Time_Order_picked': picked_time,
+        'Weatherconditions': 'conditions ' + np.where( rng.random( n_rows ) < NAN_RATE['Weatherconditions'], 'NaN',
+                                                       np.array( WEATHER )[rng.integers( 0, len( WEATHER ), n_rows )] ).astype( object ),
+        'Road_traffic_density': _with_nan( rng, np.array( TRAFFIC )[traffic], 'Road_traffic_density' ),
+        'Vehicle_condition': rng.integers( 0, 4, n_rows ),
+        'Type_of_order': np.array( ORDERS )[rng.integers( 0, len( ORDERS ), n_rows )],
+        'Type_of_vehicle': np.array( VEHICLES )[rng.choice( len( VEHICLES ), n_rows, p=[0.58, 0.33, 0.09] )],
+        'multiple_deliveries': _with_nan( rng, multiple.astype( str ), 'multiple_deliveries' ),
+        'Festival': _with_nan( rng, np.where( festival, 'Yes ', 'No ' ), 'Festival' ),
+        'City': _with_nan( rng, np.array( CITIES )[city], 'City' ),
+        'Time_taken(min)': pd.Series( time_taken ).map( '(min) {}'.format ),
+    } )
+
+
+def write_csv( path, n_rows, seed=42, chunk_size=1_000_000 ):
+    """ Escreve o CSV em blocos de chunk_size linhas ( memoria limitada ). """
+    for start in range( 0, n_rows, chunk_size ):
+        chunk = generate( min( chunk_size, n_rows - start ), seed=seed, start=start )
+        chunk.to_csv( path, mode='w' if start == 0 else 'a', header=start == 0, index=False )
+
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--rows', type=int, required=True )
+    parser.add_argument( '--out', required=True )
+    parser.add_argument( '--seed', type=int, default=42 )
+    args = parser.parse_args()
+
+    write_csv( args.out, args.rows, args.seed )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+"""
+    Curry Company - modulos compartilhados pelas paginas do dashboard.
+"""
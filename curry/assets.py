@@ -0,0 +1,47 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import io
+import threading
+
+LOGO_PATH = 'logo.PNG'
+
+# largura do logo na barra lateral de todas as paginas
+LOGO_WIDTH = 120
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+_LOCK = threading.Lock()
+_LOGOS = {}
+
+# ==================================== ::
+
+def logo_png( path=LOGO_PATH, width=LOGO_WIDTH ):
+    """
+        PNG do logo ja reduzido para width pixels, decodificado uma unica
+        vez por processo ( por caminho e largura ).
+
+        As paginas passam os bytes para st.sidebar.image( ..., width=width ):
+        a imagem ja tem a largura pedida, entao o Streamlit so le o
+        cabecalho e nao decodifica nem redimensiona de novo a cada execucao.
+    """
+    key = ( path, width )
+    with _LOCK:
+        if key not in _LOGOS:
+            # Pillow so e importado na primeira chamada
+            from PIL import Image
+
+            with Image.open( path ) as image:
+                if image.width > width:
+                    # mesma reducao que o st.image faria
+                    image = image.resize( ( width, int( image.height * width / image.width ) ),
+                                          resample=Image.BILINEAR )
+                buffer = io.BytesIO()
+                image.save( buffer, format='PNG' )
+
+            _LOGOS[key] = buffer.getvalue()
+
+        return _LOGOS[key]
@@ -0,0 +1,599 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import dataclasses
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from curry import metrics
+from curry.cube import MEASURES, cube_cells, load_cube
+from curry.data import (CLEAN_SCHEMA_VERSION, DATASET_PATH, build_combined, build_frame, combined_version,
+                        dataset_version, date_position, file_hash, file_stat, load_data, load_partitions,
+                        manifest_path, read_manifest)
+from curry.dimensions import select_positions
+from curry.kpi import (COLUMN_KPIS, FESTIVAL_KPIS, KPIS, KpiResult, _as_number, compute_kpis,
+                       index_kpis)
+from curry.quantiles import QUANTILE_ERROR, QuantileSketches, load_time_quantiles
+from curry.sketches import DISTINCT_ERROR, DISTINCT_MODE, load_courier_sketches
+from curry.timeline import ROLLUP_COLUMNS, TimeRollups, load_date_index, load_time_rollups
+
+# backend usado pelas paginas e pela CLI quando nenhum e pedido
+DEFAULT_BACKEND = os.environ.get( 'CURRY_BACKEND', 'pandas' )
+
+# tabelas que toda consulta sabe montar ( as mesmas das paginas )
+TABLES = ['order_metric', 'traffic_order_share', 'traffic_order_city', 'order_by_week',
+          'order_by_month', 'order_share_by_week', 'rating_by_courier', 'rating_by_traffic',
+          'rating_by_weather', 'top_fastest', 'top_slowest', 'time_by_city', 'time_by_city_order',
+          'time_by_city_traffic', 'time_quantiles', 'distance_by_city']
+
+# colunas gravadas no SQLite: tudo que as metricas e os mapas usam
+SQLITE_COLUMNS = ['ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings',
+                  'Restaurant_latitude', 'Restaurant_longitude',
+                  'Delivery_location_latitude', 'Delivery_location_longitude',
+                  'Order_Date', 'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition',
+                  'Type_of_order', 'Type_of_vehicle', 'Festival', 'City', 'Time_taken(min)', 'distance_km',
+                  'day_key', 'week_key', 'month_key']
+
+SQLITE_INDEXES = ['Order_Date', 'City', 'Road_traffic_density']
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def _q( col ):
+    # identificador SQL ( 'Time_taken(min)' precisa de aspas )
+    return f'"{col}"'
+
+# ==================================== ::
+
+def report( query, k=10 ):
+    """
+        Conjunto completo de metricas das tres paginas para um estado
+        de filtros, em qualquer backend.
+
+        Output:
+            - ( KpiResult com todos os KPIS, dict nome -> Dataframe )
+    """
+    return query.kpis( KPIS ), { name: query.table( name, k ) for name in TABLES }
+
+# ==================================== ::
+
+class PandasQuery:
+    """
+        Filtros da barra lateral aplicados ao dataset em memoria, sem
+        copiar as linhas: a consulta guarda o frame e o cubo compartilhados
+        do processo e so as posicoes selecionadas em cada um.
+
+            - selection: linhas do frame; None ( todas ), uma fatia ( so a
+              data limite ) ou posicoes int32 ( data limite + transito )
+            - cells: celulas do cubo, no mesmo formato ( curry.cube.cube_cells )
+            - sketches: entregadores distintos por celula ( curry.sketches );
+              sem eles, unique_couriers e a tabela semanal usam as linhas
+            - quantiles: percentis do tempo por celula ( curry.quantiles );
+              sem eles, sao montados das linhas filtradas
+            - date_index: acumulados por dia ( curry.timeline.DateIndex );
+              com ele, os KPIs de coluna nao leem as linhas
+
+        Cada tabela le so as colunas de que precisa ( columns ) e o cubo
+        filtrado ( cube1 ): views quando a selecao e uma fatia, senao um
+        take descartado ao fim do calculo.
+    """
+
+    def __init__( self, frame, cube, selection=None, cells=None, rollups=None, date_limit=None, traffic=None,
+                  sketches=None, quantiles=None, date_index=None ):
+        self.frame = frame
+        self.cube = cube
+        self.selection = slice( None ) if selection is None else selection
+        self.cells = slice( None ) if cells is None else cells
+        self.rollups = rollups
+        self.date_limit = date_limit
+        self.traffic = traffic
+        self.sketches = sketches
+        self.quantiles = quantiles
+        self.date_index = date_index
+        self._top = {}
+
+    @property
+    def cube1( self ):
+        """ Cubo filtrado, como o de slice_cube. """
+        return self.cube.iloc[self.cells]
+
+    def buckets( self, resolution ):
+        """ Celulas de tempo ( curry.timeline.TimeRollups ) com os filtros da consulta. """
+        if self.rollups is None:
+            # sem rollups do dataset: agrega as linhas ja filtradas
+            return TimeRollups( self.columns( ROLLUP_COLUMNS ) ).cells( resolution )
+
+        return self.rollups.cells( resolution, self.date_limit, self.traffic )
+
+    def couriers_by_week( self ):
+        """ Entregadores distintos por week_key, da uniao dos sketches das celulas filtradas. """
+        if self.sketches is None:
+            return metrics.couriers_by_week( self.columns( ['week_key', 'Delivery_person_ID'] ) )
+
+        return self.sketches.count_by( 'week_key', self.sketches.select( self.date_limit, self.traffic ) )
+
+    def time_quantiles( self ):
+        """ Percentis do tempo de entrega, das celulas dos sketches que passam nos filtros. """
+        if self.quantiles is None:
+            sketches = QuantileSketches( self.columns( ['City', 'Road_traffic_density', 'Festival', 'Time_taken(min)'] ),
+                                         ['City', 'Road_traffic_density', 'Festival'] )
+            return metrics.time_quantiles( sketches )
+
+        return metrics.time_quantiles( self.quantiles, cube_cells( self.quantiles.cells, self.date_limit, self.traffic ) )
+
+    def columns( self, columns ):
+        """ Linhas filtradas, so com as colunas pedidas, na ordem do dataset. """
+        return pd.DataFrame( { col: self.frame[col].iloc[self.selection] for col in columns }, copy=False )
+
+    def _top_delivers( self, k ):
+        if k not in self._top:
+            self._top[k] = metrics.top_delivers( self.columns( ['Delivery_person_ID', 'City', 'Time_taken(min)'] ), k )
+        return self._top[k]
+
+    def table( self, name, k=10 ):
+        columns = self.columns
+        builders = {
+            'order_metric': lambda: metrics.order_metric( self.cube1 ),
+            'traffic_order_share': lambda: metrics.traffic_order_share( self.cube1 ),
+            'traffic_order_city': lambda: metrics.traffic_order_city( self.cube1 ),
+            'order_by_week': lambda: metrics.order_by_week( self.buckets( 'week' ) ),
+            'order_by_month': lambda: metrics.order_by_month( self.buckets( 'month' ) ),
+            'order_share_by_week': lambda: metrics.order_share_by_week( self.buckets( 'week' ), self.couriers_by_week() ),
+            'rating_by_courier': lambda: metrics.rating_by_courier(
+                columns( ['Order_Date', 'Delivery_person_ID', 'Delivery_person_Ratings'] ) ),
+            'rating_by_traffic': lambda: metrics.rating_by( self.cube1, 'Road_traffic_density' ).reset_index(),
+            'rating_by_weather': lambda: metrics.rating_by( self.cube1, 'Weatherconditions' ).reset_index(),
+            'top_fastest': lambda: self._top_delivers( k )[0],
+            'top_slowest': lambda: self._top_delivers( k )[1],
+            'time_by_city': lambda: metrics.avg_std_time( self.cube1, 'City' ),
+            'time_by_city_order': lambda: metrics.avg_std_time( self.cube1, ['City', 'Type_of_order'] ),
+            'time_by_city_traffic': lambda: metrics.avg_std_time( self.cube1, ['City', 'Road_traffic_density'] ),
+            'time_quantiles': self.time_quantiles,
+            'distance_by_city': lambda: metrics.distance( self.cube1, 'City' ) }
+
+        if name not in builders:
+            raise ValueError( f'tabela desconhecida: {name}' )
+
+        return builders[name]()
+
+    def kpis( self, names ):
+        names = set( names )
+        couriers = 'unique_couriers' in names and self.sketches is not None
+        if couriers:
+            names.discard( 'unique_couriers' )
+
+        indexed = {}
+        if self.date_index is not None:
+            # so data limite + transito: os KPIs de coluna saem dos acumulados por dia
+            indexed = index_kpis( self.date_index, names, self.date_limit, self.traffic )
+            names -= set( indexed )
+
+        cols = { COLUMN_KPIS[name][0] for name in names if name in COLUMN_KPIS }
+        if 'unique_couriers' in names:
+            cols.add( 'Delivery_person_ID' )
+
+        result = compute_kpis( self.columns( sorted( cols ) ), names, self.cube1 )
+        if couriers:
+            mask = self.sketches.select( self.date_limit, self.traffic )
+            result = dataclasses.replace( result, unique_couriers=self.sketches.count( mask ) )
+
+        return dataclasses.replace( result, **indexed )
+
+    def rows( self, columns ):
+        """ Linhas filtradas, so com as colunas pedidas ( mapas ). """
+        return self.columns( columns )
+
+# ==================================== ::
+
+class PandasBackend:
+    """
+        Backend padrao: dataset limpo em memoria, cubo e indices ( curry.data
+        / cube / dimensions ).
+
+        Entregadores distintos saem dos sketches por celula ( curry.sketches ):
+        distinct='auto' ( padrao, CURRY_DISTINCT: exato enquanto os
+        entregadores cabem nos registradores do HLL ), 'hll' com erro padrao
+        relativo ate error, ou 'exact' para validar contra as linhas / o SQLite.
+    """
+
+    name = 'pandas'
+
+    def __init__( self, path=DATASET_PATH, distinct=DISTINCT_MODE, error=DISTINCT_ERROR ):
+        self.path = path
+        self.distinct = distinct
+        self.error = error
+
+    def version( self ):
+        return dataset_version( self.path )
+
+    def query( self, date_limit=None, traffic=None ):
+        # um lote novo ( curry.ingest ) pode trocar a versao entre duas leituras:
+        # a consulta so sai quando frame, cubo e sketches sao da mesma versao
+        while True:
+            version = self.version()
+            query = self._query( date_limit, traffic )
+            if self.version() == version:
+                return query
+
+    def _query( self, date_limit, traffic ):
+        # frame e cubo sao os mesmos para todas as sessoes do processo; a consulta so guarda posicoes
+        frame = load_data( self.path )
+        cube = load_cube( self.path )
+
+        # dataset ordenado por data: busca binaria, as linhas sao um prefixo
+        selection = slice( 0, len( frame ) if date_limit is None else date_position( frame, date_limit ) )
+        if traffic is not None:
+            # OU dos bitmaps pre-calculados de cada nivel de transito
+            positions = select_positions( selection.stop, {'Road_traffic_density': traffic}, self.path )
+            if len( positions ) < selection.stop:
+                selection = positions
+
+        return PandasQuery( frame, cube, selection, cube_cells( cube, date_limit, traffic ),
+                            load_time_rollups( self.path ), date_limit, traffic,
+                            load_courier_sketches( self.path, self.distinct, self.error ),
+                            load_time_quantiles( self.path ), load_date_index( self.path ) )
+
+# ==================================== ::
+
+def sqlite_path( csv_path ):
+    """ dataset/train.csv -> dataset/train.clean.sqlite """
+    root, _ = os.path.splitext( csv_path )
+    return root + '.clean.sqlite'
+
+# ==================================== ::
+
+def _orders( df ):
+    orders = df.loc[:, SQLITE_COLUMNS]
+    orders['Order_Date'] = orders['Order_Date'].dt.strftime( '%Y-%m-%d' )
+
+    return orders
+
+# ==================================== ::
+
+def build_database( df, db_path, key, partitions=() ):
+    """
+        Grava o dataset limpo na tabela orders de um arquivo SQLite, com
+        indices em Order_Date, City e Road_traffic_density, a chave
+        ( hash do CSV + versao da limpeza ) na tabela meta e as particoes
+        ja incluidas ( curry.data.read_manifest ) na tabela partitions.
+
+        As linhas entram na ordem do frame ( ordenado por Order_Date ),
+        entao o rowid segue a mesma ordem de load_data. O arquivo e
+        montado ao lado e trocado de uma vez ( os.replace ).
+    """
+    tmp_path = f'{db_path}.{os.getpid()}.tmp'
+    if os.path.exists( tmp_path ):
+        os.remove( tmp_path )
+
+    conn = sqlite3.connect( tmp_path )
+    try:
+        _orders( df ).to_sql( 'orders', conn, index=False, chunksize=100_000 )
+        for col in SQLITE_INDEXES:
+            conn.execute( f'CREATE INDEX idx_orders_{col.lower()} ON orders ( {_q( col )} )' )
+        conn.execute( 'CREATE TABLE meta ( key TEXT )' )
+        conn.execute( 'INSERT INTO meta VALUES ( ? )', ( key, ) )
+        conn.execute( 'CREATE TABLE partitions ( file TEXT, hash TEXT, batch TEXT )' )
+        conn.executemany( 'INSERT INTO partitions VALUES ( ?, ?, ? )',
+                          [( p['file'], p['hash'], p['batch'] ) for p in partitions] )
+        conn.commit()
+        conn.execute( 'ANALYZE' )
+    finally:
+        conn.close()
+
+    os.replace( tmp_path, db_path )
+
+# ==================================== ::
+
+def database_key( db_path ):
+    """ Chave gravada no arquivo SQLite ( None se nao existe ou esta incompleto ). """
+    if not os.path.exists( db_path ):
+        return None
+
+    try:
+        conn = sqlite3.connect( f'file:{db_path}?mode=ro', uri=True )
+        try:
+            return conn.execute( 'SELECT key FROM meta' ).fetchone()[0]
+        finally:
+            conn.close()
+    except ( sqlite3.Error, TypeError ):
+        return None
+
+# ==================================== ::
+
+def database_partitions( db_path ):
+    """ Particoes ja gravadas no arquivo SQLite, em ordem ( None se o arquivo nao as registra ). """
+    try:
+        conn = sqlite3.connect( f'file:{db_path}?mode=ro', uri=True )
+        try:
+            rows = conn.execute( 'SELECT file, hash, batch FROM partitions ORDER BY rowid' ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+    return [{ 'file': file, 'hash': digest, 'batch': batch } for file, digest, batch in rows]
+
+# ==================================== ::
+
+def append_database( df, db_path, applied, partitions ):
+    """
+        Acrescenta as linhas limpas das particoes novas ao fim da tabela
+        orders, em uma unica transacao: as conexoes de leitura veem o
+        arquivo antigo ou o novo inteiro.
+
+        Input:
+            - df: linhas limpas de partitions, na ordem de load_data
+            - applied: particoes que o arquivo tinha quando df foi montado;
+              outro processo que ja gravou as mesmas particoes nao as duplica
+        Output:
+            - False ( nada gravado ) se o arquivo mudou de outro jeito ou se
+              df traz um dia anterior ao ultimo gravado ( o rowid precisa
+              seguir a ordem de load_data ): o arquivo deve ser regerado
+    """
+    orders = _orders( df )
+    columns = ', '.join( _q( col ) for col in orders.columns )
+
+    # autocommit + BEGIN IMMEDIATE: uma transacao so, com a escrita reservada desde a conferencia
+    conn = sqlite3.connect( db_path, isolation_level=None )
+    try:
+        conn.execute( 'BEGIN IMMEDIATE' )
+        current = conn.execute( 'SELECT file, hash, batch FROM partitions ORDER BY rowid' ).fetchall()
+        current = [{ 'file': file, 'hash': digest, 'batch': batch } for file, digest, batch in current]
+        if current == applied + partitions:
+            conn.execute( 'ROLLBACK' )
+            return True
+
+        last_day = conn.execute( 'SELECT MAX( Order_Date ) FROM orders' ).fetchone()[0]
+        if current != applied or ( last_day is not None and len( orders ) and orders['Order_Date'].min() < last_day ):
+            conn.execute( 'ROLLBACK' )
+            return False
+
+        # astype( object ): tipos do Python ( o sqlite3 nao aceita escalares do numpy ), NaN vira NULL
+        conn.executemany( f'INSERT INTO orders ( {columns} ) VALUES ( {", ".join( "?" * len( orders.columns ) )} )',
+                          orders.astype( object ).where( orders.notna(), None ).itertuples( index=False, name=None ) )
+        conn.executemany( 'INSERT INTO partitions VALUES ( ?, ?, ? )',
+                          [( p['file'], p['hash'], p['batch'] ) for p in partitions] )
+        conn.execute( 'COMMIT' )
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute( 'ROLLBACK' )
+        raise
+    finally:
+        conn.close()
+
+    return True
+
+# ==================================== ::
+
+class SqliteQuery:
+    """
+        Os mesmos filtros, empurrados para o WHERE das consultas SQL.
+
+        As agregacoes por dimensao pedem ao SQLite um cubo so com as
+        dimensoes necessarias ( contagem, soma e soma dos quadrados de
+        cada medida ) e reaproveitam as funcoes de curry.metrics sobre
+        ele; as que dependem das linhas ( entregadores ) sao
+        consultas proprias.
+    """
+
+    def __init__( self, backend, date_limit, traffic ):
+        self.backend = backend
+        clauses, params = [], []
+
+        if date_limit is not None:
+            # Order_Date e so o dia: um limite no meio do dia inclui o dia todo, como no pandas
+            # ( Order_Date < date_limit ), em TimeRollups.cells e em CourierSketches.select
+            clauses.append( 'Order_Date < ?' )
+            params.append( pd.Timestamp( date_limit ).ceil( 'D' ).strftime( '%Y-%m-%d' ) )
+        if traffic is not None:
+            traffic = list( traffic )
+            clauses.append( f'Road_traffic_density IN ( {", ".join( "?" * len( traffic ) )} )' if traffic else '0' )
+            params.extend( traffic )
+
+        self.where = ( 'WHERE ' + ' AND '.join( clauses ) ) if clauses else ''
+        self.params = params
+        self._top = {}
+
+    def _read( self, sql ):
+        return pd.read_sql_query( sql, self.backend.connection(), params=self.params )
+
+    def cube( self, by ):
+        """ Cubo agregado so pelas dimensoes em by, no formato de curry.cube. """
+        by = [by] if isinstance( by, str ) else list( by )
+        dims = ', '.join( _q( col ) for col in by )
+        stats = ', '.join( f'COUNT( {_q( col )} ) AS {m}_n, TOTAL( {_q( col )} ) AS {m}_sum, '
+                           f'TOTAL( {_q( col )} * {_q( col )} ) AS {m}_sumsq'
+                           for m, col in MEASURES.items() )
+
+        cube = self._read( f'SELECT {dims}, COUNT( * ) AS n, {stats} FROM orders {self.where} '
+                           f'GROUP BY {dims} ORDER BY {dims}' )
+        if 'Order_Date' in by:
+            cube['Order_Date'] = pd.to_datetime( cube['Order_Date'] )
+
+        return cube
+
+    def time_quantiles( self ):
+        """ Percentis do tempo: contagens por valor no SQLite, sketches montados a partir delas. """
+        dims = ['City', 'Road_traffic_density', 'Festival']
+        counts = self._read( f'SELECT {", ".join( dims )}, {_q( "Time_taken(min)" )}, COUNT( * ) AS n FROM orders '
+                             f'{self.where} GROUP BY {", ".join( dims )}, {_q( "Time_taken(min)" )}' )
+
+        return metrics.time_quantiles( QuantileSketches( counts, dims, error=QUANTILE_ERROR, weights='n' ) )
+
+    def _top_delivers( self, k ):
+        if k not in self._top:
+            # ordem da primeira aparicao ( menor rowid ), como o groupby( sort=False )
+            df2 = self._read( f'SELECT City, Delivery_person_ID, MAX( {_q( "Time_taken(min)" )} ) AS {_q( "Time_taken(min)" )} '
+                              f'FROM orders {self.where} GROUP BY City, Delivery_person_ID ORDER BY MIN( rowid )' )
+            self._top[k] = metrics.top_by_city( df2, k )
+        return self._top[k]
+
+    def table( self, name, k=10 ):
+        builders = {
+            'order_metric': lambda: metrics.order_metric( self.cube( 'Order_Date' ) ),
+            'traffic_order_share': lambda: metrics.traffic_order_share( self.cube( 'Road_traffic_density' ) ),
+            'traffic_order_city': lambda: metrics.traffic_order_city( self.cube( ['City', 'Road_traffic_density'] ) ),
+            'order_by_week': lambda: metrics.order_by_week( self.cube( 'week_key' ) ),
+            'order_by_month': lambda: metrics.order_by_month( self.cube( 'month_key' ) ),
+            'order_share_by_week': lambda: metrics.order_share_by_week(
+                self.cube( 'week_key' ),
+                self._read( 'SELECT week_key, COUNT( DISTINCT Delivery_person_ID ) AS Delivery_person_ID '
+                            f'FROM orders {self.where} GROUP BY week_key ORDER BY week_key' ) ),
+            'rating_by_courier': lambda: self._read( 'SELECT Delivery_person_ID, AVG( Delivery_person_Ratings ) AS Delivery_person_Ratings '
+                                                     f'FROM orders {self.where} GROUP BY Delivery_person_ID ORDER BY Delivery_person_ID' ),
+            'rating_by_traffic': lambda: metrics.rating_by( self.cube( 'Road_traffic_density' ), 'Road_traffic_density' ).reset_index(),
+            'rating_by_weather': lambda: metrics.rating_by( self.cube( 'Weatherconditions' ), 'Weatherconditions' ).reset_index(),
+            'top_fastest': lambda: self._top_delivers( k )[0],
+            'top_slowest': lambda: self._top_delivers( k )[1],
+            'time_by_city': lambda: metrics.avg_std_time( self.cube( 'City' ), 'City' ),
+            'time_by_city_order': lambda: metrics.avg_std_time( self.cube( ['City', 'Type_of_order'] ), ['City', 'Type_of_order'] ),
+            'time_by_city_traffic': lambda: metrics.avg_std_time( self.cube( ['City', 'Road_traffic_density'] ),
+                                                                  ['City', 'Road_traffic_density'] ),
+            'time_quantiles': self.time_quantiles,
+            'distance_by_city': lambda: metrics.distance( self.cube( 'City' ), 'City' ) }
+
+        if name not in builders:
+            raise ValueError( f'tabela desconhecida: {name}' )
+
+        return builders[name]()
+
+    def kpis( self, names ):
+        """ Mesmos valores de compute_kpis: colunas e entregadores em um SELECT, Festival pelo cubo. """
+        names = set( names )
+        unknown = names - KPIS
+        if unknown:
+            raise ValueError( f'KPIs desconhecidos: {sorted( unknown )}' )
+
+        sql_funcs = { 'mean': 'AVG', 'max': 'MAX', 'min': 'MIN' }
+        exprs = { m: f'{sql_funcs[func]}( {_q( col )} )' for m, ( col, func ) in COLUMN_KPIS.items() if m in names }
+        if 'unique_couriers' in names:
+            exprs['unique_couriers'] = 'COUNT( DISTINCT Delivery_person_ID )'
+
+        values = {}
+        if exprs:
+            row = self._read( f'SELECT {", ".join( f"{e} AS {m}" for m, e in exprs.items() )} FROM orders {self.where}' ).iloc[0]
+            for m in exprs:
+                digits = 2 if m in COLUMN_KPIS and COLUMN_KPIS[m][1] == 'mean' else None
+                values[m] = _as_number( row[m], digits )
+
+        festival = names & set( FESTIVAL_KPIS )
+        if festival:
+            festival_kpis = compute_kpis( None, festival, self.cube( 'Festival' ) )
+            values.update( { m: getattr( festival_kpis, m ) for m in festival } )
+
+        return KpiResult( **values )
+
+    def rows( self, columns ):
+        """ Linhas filtradas, so com as colunas pedidas, na ordem de load_data. """
+        return self._read( f'SELECT {", ".join( _q( col ) for col in columns )} FROM orders {self.where} ORDER BY rowid' )
+
+# ==================================== ::
+
+class SqliteBackend:
+    """
+        Backend para datasets grandes demais para ficar inteiros na
+        memoria de cada processo: as linhas ficam em um arquivo SQLite
+        ao lado do CSV ( sqlite_path ) e so o resultado das consultas
+        chega ao pandas.
+
+        O arquivo e (re)gerado quando nao existe ou quando a chave nao
+        confere com o CSV; particoes novas ( curry.ingest ) entram no fim
+        da tabela, limpando so as linhas delas. As consultas usam uma
+        conexao somente leitura por thread.
+    """
+
+    name = 'sqlite'
+
+    def __init__( self, path=DATASET_PATH, db_path=None ):
+        self.path = path
+        self.db_path = db_path or sqlite_path( path )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stat_key = None
+        self._digest = None
+        self._version = None
+        self._refresh()
+
+    def _refresh( self ):
+        # mesma validacao do cache em memoria: ( mtime, tamanho ) do CSV e do manifesto e, se o CSV mudou, o hash
+        stat_key = ( file_stat( self.path ), file_stat( manifest_path( self.path ) ) )
+
+        with self._lock:
+            if stat_key == self._stat_key:
+                return
+
+            digest = self._digest
+            if self._stat_key is None or stat_key[0] != self._stat_key[0]:
+                digest = file_hash( self.path )
+            key = f'{digest}:{CLEAN_SCHEMA_VERSION}'
+
+            partitions = read_manifest( self.path )
+            applied = database_partitions( self.db_path ) if database_key( self.db_path ) == key else None
+            new = None if applied is None or partitions[:len( applied )] != applied else partitions[len( applied ):]
+
+            if new:
+                # so as particoes novas sao limpas; as linhas delas entram na ordem de load_data
+                rows = pd.concat( load_partitions( self.path, new ) ).sort_values( 'Order_Date', kind='stable' )
+                if not append_database( rows, self.db_path, applied, new ):
+                    new = None
+            if new is None:
+                # build_frame nao guarda o frame no cache do processo: sai da memoria depois de gravado
+                frame = build_frame( self.path, digest )
+                if partitions:
+                    frame = build_combined( self.path, frame, digest, partitions, partitions )
+                build_database( frame, self.db_path, key, partitions )
+
+            self._stat_key = stat_key
+            self._digest = digest
+            self._version = combined_version( digest, partitions )
+
+    def connection( self ):
+        # o arquivo pode ter sido trocado ( os.replace ): reabre se o inode mudou
+        inode = os.stat( self.db_path ).st_ino
+        conn = getattr( self._local, 'conn', None )
+        if conn is None or self._local.inode != inode:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect( f'file:{self.db_path}?mode=ro', uri=True )
+            self._local.conn = conn
+            self._local.inode = inode
+
+        return conn
+
+    def version( self ):
+        self._refresh()
+        return self._version
+
+    def query( self, date_limit=None, traffic=None ):
+        self._refresh()
+        return SqliteQuery( self, date_limit, traffic )
+
+# ==================================== ::
+
+BACKENDS = { 'pandas': PandasBackend, 'sqlite': SqliteBackend }
+
+_BACKENDS = {}
+_LOCK = threading.Lock()
+
+# ==================================== ::
+
+def get_backend( name=None, path=DATASET_PATH ):
+    """
+        Backend compartilhado do processo ( um por nome + dataset ).
+        name=None usa CURRY_BACKEND ( padrao 'pandas' ).
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError( f'backend desconhecido: {name}' )
+
+    with _LOCK:
+        key = ( name, os.path.abspath( path ) )
+        if key not in _BACKENDS:
+            _BACKENDS[key] = BACKENDS[name]( path )
+
+        return _BACKENDS[key]
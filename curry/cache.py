@@ -0,0 +1,158 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import functools
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from curry.data import DATASET_PATH, dataset_version
+
+# orcamento de memoria do cache de figuras ( MB ), configuravel por ambiente
+FIGURE_CACHE_MB = float( os.environ.get( 'CURRY_FIGURE_CACHE_MB', 64 ) )
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+class LruCache:
+    """
+        Cache LRU com orcamento em bytes, compartilhado entre as sessoes
+        do processo ( thread-safe ).
+
+        sizeof( valor ) estima o tamanho de cada item; quando a soma passa
+        de max_bytes os itens menos usados recentemente sao descartados.
+        Um item maior que o orcamento inteiro nao e guardado.
+    """
+
+    def __init__( self, max_bytes, sizeof ):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get_or_build( self, key, build ):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end( key )
+                self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+
+        value = build()
+        size = self.sizeof( value )
+
+        with self._lock:
+            if size <= self.max_bytes and key not in self._items:
+                self._items[key] = ( value, size )
+                self.used_bytes += size
+                while self.used_bytes > self.max_bytes:
+                    _, ( _, evicted ) = self._items.popitem( last=False )
+                    self.used_bytes -= evicted
+
+        return value
+
+    def __len__( self ):
+        return len( self._items )
+
+    def clear( self ):
+        with self._lock:
+            self._items.clear()
+            self.used_bytes = 0
+
+# ==================================== ::
+
+@functools.lru_cache( maxsize=None )
+def _serialized_figure_class():
+    """
+        Classe SerializedFigure, criada no primeiro miss do cache: so ai o
+        plotly e importado ( as paginas importam curry.cache no load e
+        deixam o plotly para dentro das funcoes dos graficos ).
+    """
+    import plotly.graph_objects as go
+
+    class SerializedFigure( go.Figure ):
+        """
+            Figura serializada uma unica vez ( fig.to_json(), no miss do cache ).
+
+            to_json / to_dict devolvem o JSON guardado e o dict lido dele: o
+            tamanho no cache e o len desse JSON e o st.plotly_chart so faz um
+            json.dumps de tipos simples, sem copiar e converter os arrays da
+            figura de novo a cada execucao da pagina. Somente leitura: os
+            update_* da figura nao mudam o que e desenhado.
+        """
+
+        def __init__( self, fig ):
+            super().__init__()
+            self._json = fig.to_json()
+            self._spec = json.loads( self._json )
+
+        def to_json( self, *args, **kwargs ):
+            return self._json
+
+        def to_dict( self ):
+            return self._spec
+
+        def to_plotly_json( self ):
+            return self._spec
+
+    SerializedFigure.__module__ = __name__
+    SerializedFigure.__qualname__ = 'SerializedFigure'
+
+    return SerializedFigure
+
+
+def __getattr__( name ):
+    # curry.cache.SerializedFigure continua acessivel, importando o plotly so quando pedido
+    if name == 'SerializedFigure':
+        return _serialized_figure_class()
+
+    raise AttributeError( f'module {__name__!r} has no attribute {name!r}' )
+
+# ==================================== ::
+
+def _figure_size( fig ):
+    # tamanho do JSON que o st.plotly_chart envia ao navegador ( ja serializado )
+    return len( fig.to_json() )
+
+
+figure_cache = LruCache( int( FIGURE_CACHE_MB * 1024 * 1024 ), _figure_size )
+
+# ==================================== ::
+
+def filter_key( date_limit, traffic, path=DATASET_PATH, version=None ):
+    """
+        Estado dos filtros da barra lateral + versao do dataset, como chave de cache.
+        version: versao ja conhecida ( backend.version() ); None usa a do cache em memoria.
+    """
+    if version is None:
+        version = dataset_version( path )
+
+    return ( version, date_limit, tuple( sorted( traffic ) ) )
+
+# ==================================== ::
+
+def cached_figure( func, data, key, *args ):
+    """
+        Retorna func( data, *args ) como SerializedFigure, reaproveitando a
+        figura ja montada e serializada quando a mesma funcao foi chamada
+        com o mesmo estado de filtros.
+
+        Input:
+            - func: funcao da pagina que monta a figura
+            - data: consulta ( curry.backends ), dataset ou cubo ja filtrado
+            - key: filter_key( ... ) do estado que gerou data
+            - args: demais argumentos de func ( entram na chave )
+
+        O Streamlit recria as funcoes da pagina a cada execucao, entao a
+        identidade da funcao na chave e ( arquivo, nome ).
+    """
+    func_id = ( func.__code__.co_filename, func.__qualname__ )
+
+    return figure_cache.get_or_build( ( func_id, tuple( key ), args ),
+                                      lambda: _serialized_figure_class()( func( data, *args ) ) )
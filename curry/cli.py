@@ -0,0 +1,117 @@
+"""
+    Calcula o conjunto completo de KPIs e tabelas das paginas para uma
+    data limite e uma selecao de transito, sem abrir o Streamlit.
+
+    Uso:
+        python -m curry.cli --date 2022-03-20 --traffic Low Jam --out kpis.json
+        python -m curry.cli --date 2022-03-20 --format parquet --out kpis/
+        python -m curry.cli --date 2022-03-20 --backend sqlite --out kpis.json
+        python -m curry.cli --date 2022-03-20 --stream --chunk-rows 200000 --out kpis.json
+
+    --stream le o CSV em pedacos e monta so agregados ( curry.streaming ):
+    a memoria nao depende do tamanho do arquivo.
+
+    JSON: um unico arquivo com os filtros, a versao do dataset, os KPIs
+    e cada tabela como lista de registros.
+    Parquet: um diretorio com kpis.parquet ( uma linha ) e um arquivo
+    por tabela.
+"""
+
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import argparse
+import dataclasses
+import datetime
+import json
+import os
+
+import pandas as pd
+
+from curry.backends import BACKENDS, get_backend, report
+from curry.data import DATASET_PATH, combined_version, file_hash, read_manifest
+from curry.streaming import CHUNK_ROWS, StreamQuery, stream_aggregates
+
+TRAFFIC = ['Low', 'Medium', 'High', 'Jam']
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def compute( date_limit, traffic=TRAFFIC, path=DATASET_PATH, k=10, backend=None ):
+    """
+        Aplica os mesmos filtros das paginas e devolve ( KpiResult, tabelas ).
+        backend: 'pandas' ( caches do processo, como as paginas ) ou
+        'sqlite' ( consultas no arquivo SQLite ); None usa CURRY_BACKEND.
+    """
+    return report( get_backend( backend, path ).query( date_limit, traffic ), k )
+
+# ==================================== ::
+
+def compute_stream( date_limit, traffic=TRAFFIC, path=DATASET_PATH, k=10, chunk_rows=CHUNK_ROWS ):
+    """ Mesmo resultado de compute, em um passe pelo CSV em pedacos de chunk_rows linhas. """
+    aggregates = stream_aggregates( path, chunk_rows, date_limit=date_limit )
+
+    return report( StreamQuery( aggregates, date_limit, traffic ), k )
+
+# ==================================== ::
+
+def write_json( out, params, kpis, tables ):
+    payload = { **params,
+                'kpis': dataclasses.asdict( kpis ),
+                'tables': { name: json.loads( df.to_json( orient='records', date_format='iso' ) )
+                            for name, df in tables.items() } }
+
+    with open( out, 'w', encoding='utf-8' ) as f:
+        json.dump( payload, f, indent=2, ensure_ascii=False )
+
+# ==================================== ::
+
+def write_parquet( out, params, kpis, tables ):
+    os.makedirs( out, exist_ok=True )
+
+    kpi_row = pd.DataFrame( [{ **params, 'traffic': ','.join( params['traffic'] ), **dataclasses.asdict( kpis ) }] )
+    kpi_row.to_parquet( os.path.join( out, 'kpis.parquet' ), index=False )
+
+    for name, df in tables.items():
+        df.to_parquet( os.path.join( out, f'{name}.parquet' ), index=False )
+
+# ==================================== ::
+
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--date', required=True, type=datetime.date.fromisoformat,
+                         help='data limite ( AAAA-MM-DD ), exclusiva como no slider das paginas' )
+    parser.add_argument( '--traffic', nargs='+', default=TRAFFIC, choices=TRAFFIC )
+    parser.add_argument( '--dataset', default=DATASET_PATH )
+    parser.add_argument( '--top', type=int, default=10, help='tamanho dos rankings de entregadores' )
+    parser.add_argument( '--backend', choices=sorted( BACKENDS ), default=None,
+                         help='padrao: CURRY_BACKEND ou pandas' )
+    parser.add_argument( '--stream', action='store_true',
+                         help='le o CSV em pedacos, sem carregar o dataset inteiro ( ignora --backend )' )
+    parser.add_argument( '--chunk-rows', type=int, default=CHUNK_ROWS, help='linhas por pedaco com --stream' )
+    parser.add_argument( '--format', choices=['json', 'parquet'], default='json' )
+    parser.add_argument( '--out', required=True )
+    args = parser.parse_args( argv )
+
+    date_limit = datetime.datetime.combine( args.date, datetime.time() )
+    if args.stream:
+        kpis, tables = compute_stream( date_limit, args.traffic, args.dataset, args.top, args.chunk_rows )
+        version = combined_version( file_hash( args.dataset ), read_manifest( args.dataset ) )
+    else:
+        kpis, tables = compute( date_limit, args.traffic, args.dataset, args.top, args.backend )
+        version = get_backend( args.backend, args.dataset ).version()
+
+    params = { 'date_limit': args.date.isoformat(),
+               'traffic': list( args.traffic ),
+               'dataset_version': version }
+
+    if args.format == 'json':
+        write_json( args.out, params, kpis, tables )
+    else:
+        write_parquet( args.out, params, kpis, tables )
+
+
+if __name__ == '__main__':
+    main()
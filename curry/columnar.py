@@ -0,0 +1,405 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pyarrow e opcional
+    pa = None
+
+# metadado gravado no schema do arquivo Arrow
+CACHE_KEY = b'curry_cache_key'
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def available():
+    """ O cache colunar so existe quando o pyarrow esta instalado. """
+    return pa is not None
+
+# ==================================== ::
+
+def cache_path( csv_path ):
+    """ dataset/train.csv -> dataset/train.clean.arrow """
+    root, _ = os.path.splitext( csv_path )
+    return root + '.clean.arrow'
+
+# ==================================== ::
+
+def _arrow_strings( arrow_type ):
+    # types_mapper do to_pandas: texto -> pd.ArrowDtype ( zero copia ), o resto segue o padrao
+    if arrow_type in ( pa.string(), pa.large_string() ):
+        return pd.ArrowDtype( arrow_type )
+
+    return None
+
+# ==================================== ::
+
+def read_cache( path, key ):
+    """
+        Le o dataset limpo do arquivo Arrow ( Feather v2, sem compressao )
+        via memory map. Retorna None se o arquivo nao existe ou se a
+        chave gravada ( hash do CSV + versao da limpeza ) nao bate com key.
+    """
+    if not available() or not os.path.exists( path ):
+        return None
+
+    try:
+        reader = pa.ipc.open_file( pa.memory_map( path, 'r' ) )
+        metadata = reader.schema.metadata or {}
+        if metadata.get( CACHE_KEY ) != key.encode():
+            return None
+        if reader.num_record_batches > 1:
+            # gravado antes do batch unico ( write_cache ): regrava para voltar a mapear sem copia
+            return None
+
+        # split_blocks evita consolidar as colunas numericas em um bloco
+        # novo; elas saem direto do mapa de memoria, sem copia. Colunas de
+        # texto ( ID ) ficam em Arrow em vez de virar objetos Python: o
+        # frame inteiro aponta para o arquivo e e somente leitura
+        return reader.read_all().to_pandas( split_blocks=True, types_mapper=_arrow_strings )
+
+    except ( OSError, pa.ArrowInvalid ) as exc:
+        warnings.warn( f'cache colunar ignorado ( {path} ): {exc}' )
+        return None
+
+# ==================================== ::
+
+def write_cache( df, path, key ):
+    """
+        Grava o frame limpo em Arrow sem compressao ( requisito para ler
+        com memory map ). A escrita e atomica: arquivo temporario + rename.
+
+        Um unico record batch: com varios, o to_pandas de read_cache junta
+        os pedacos de cada coluna em memoria privada em vez de apontar
+        para o mapa do arquivo.
+    """
+    if not available():
+        return
+
+    # colunas vindas de outro cache ( ex.: ID ) podem chegar em varios pedacos
+    table = pa.Table.from_pandas( df, preserve_index=True ).combine_chunks()
+    metadata = dict( table.schema.metadata or {} )
+    metadata[CACHE_KEY] = key.encode()
+    table = table.replace_schema_metadata( metadata )
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        feather.write_feather( table, tmp_path, compression='uncompressed', chunksize=max( len( df ), 1 ) )
+        os.replace( tmp_path, path )
+
+    except OSError as exc:
+        warnings.warn( f'nao foi possivel gravar o cache colunar ( {path} ): {exc}' )
+        if os.path.exists( tmp_path ):
+            os.remove( tmp_path )
+
+# ==================================== ::
+
+def store_meta_path( folder, name ):
+    return os.path.join( folder, f'meta-{name}.json' )
+
+# ==================================== ::
+
+def _read_meta( folder, name, key ):
+    try:
+        with open( store_meta_path( folder, name ), encoding='utf-8' ) as f:
+            meta = json.load( f )
+    except ( FileNotFoundError, ValueError ):
+        return None
+
+    return meta if meta.get( 'key' ) == key else None
+
+# ==================================== ::
+
+def _write_meta( folder, name, meta ):
+    # temporario + rename: a versao so existe depois que todos os arquivos foram gravados
+    target = store_meta_path( folder, name )
+    tmp_path = f'{target}.{os.getpid()}.tmp'
+    with open( tmp_path, 'w', encoding='utf-8' ) as f:
+        json.dump( meta, f )
+    os.replace( tmp_path, target )
+
+# ==================================== ::
+
+def _string_buffers( values ):
+    """ ( offsets int32 a partir de 0, bytes ) de uma coluna de texto sem nulos. """
+    array = pa.array( values, type=pa.string() )
+    if isinstance( array, pa.ChunkedArray ):
+        array = array.combine_chunks()
+    if array.null_count:
+        raise ValueError( 'coluna de texto com nulos nao cabe no store colunar' )
+
+    offsets = np.frombuffer( array.buffers()[1], dtype=np.int32 )[array.offset:array.offset + len( array ) + 1]
+    data = array.buffers()[2]
+    data = b'' if data is None else data.to_pybytes()[offsets[0]:offsets[-1]]
+
+    return offsets - offsets[0], data
+
+# ==================================== ::
+
+def _column_data( series, spec ):
+    """ Bytes de cada arquivo da coluna no formato de spec ( dtype e categorias ja decididos ). """
+    if spec['kind'] == 'category':
+        codes = pd.Categorical( series, categories=spec['categories'] ).codes
+        return { 'file': codes.astype( spec['dtype'] ).tobytes() }
+    if spec['kind'] == 'string':
+        offsets, data = _string_buffers( series )
+        return { 'offsets': offsets.tobytes(), 'file': data }
+
+    return { 'file': series.to_numpy().astype( spec['dtype'] ).tobytes() }
+
+# ==================================== ::
+
+def _column_spec( series, file ):
+    """ Formato de uma coluna nova: categoria ( codigos + categorias ), texto ( offsets + bytes ) ou numerico. """
+    if isinstance( series.dtype, pd.CategoricalDtype ):
+        return { 'kind': 'category', 'categories': list( series.cat.categories ),
+                 'dtype': series.cat.codes.dtype.str, 'file': file }
+    if isinstance( series.dtype, pd.ArrowDtype ) or series.dtype == object:
+        return { 'kind': 'string', 'file': file, 'offsets': f'{file}.offsets' }
+
+    return { 'kind': 'values', 'dtype': series.dtype.str, 'file': file }
+
+# ==================================== ::
+
+def _file_sizes( spec, n_rows, folder ):
+    """ Tamanho em bytes de cada arquivo da coluna com n_rows linhas. """
+    if spec['kind'] == 'string':
+        offsets = _map( folder, spec['offsets'], ( n_rows + 1 ) * 4 )
+        return { 'offsets': ( n_rows + 1 ) * 4, 'file': int( np.frombuffer( offsets, dtype=np.int32 )[-1] ) }
+
+    return { 'file': n_rows * np.dtype( spec['dtype'] ).itemsize }
+
+# ==================================== ::
+
+def _map( folder, file, nbytes ):
+    """ Primeiros nbytes do arquivo via memory map ( sem copia ). """
+    if nbytes == 0:
+        return pa.py_buffer( b'' )
+
+    return pa.memory_map( os.path.join( folder, file ), 'r' ).read_buffer( nbytes )
+
+# ==================================== ::
+
+def _arrow_column( folder, spec, n_rows ):
+    sizes = _file_sizes( spec, n_rows, folder )
+    if spec['kind'] == 'string':
+        return pa.Array.from_buffers( pa.string(), n_rows, [None, _map( folder, spec['offsets'], sizes['offsets'] ),
+                                                            _map( folder, spec['file'], sizes['file'] )] )
+
+    values = pa.Array.from_buffers( pa.from_numpy_dtype( np.dtype( spec['dtype'] ) ), n_rows,
+                                    [None, _map( folder, spec['file'], sizes['file'] )] )
+    if spec['kind'] == 'category':
+        return pa.DictionaryArray.from_arrays( values, pa.array( spec['categories'] ) )
+
+    return values
+
+# ==================================== ::
+
+def read_store( folder, name, key ):
+    """
+        Frame do store colunar ( write_store / append_store ) via memory
+        map: cada coluna aponta para o seu arquivo, sem copia, como em
+        read_cache. None se a versao name nao existe ou a chave nao bate.
+    """
+    if not available():
+        return None
+
+    meta = _read_meta( folder, name, key )
+    if meta is None:
+        return None
+
+    try:
+        n_rows = meta['n_rows']
+        table = pa.Table.from_arrays( [_arrow_column( folder, spec, n_rows ) for spec in meta['columns']],
+                                      names=[spec['name'] for spec in meta['columns']] )
+        frame = table.to_pandas( split_blocks=True, types_mapper=_arrow_strings )
+        index = _arrow_column( folder, meta['index'], n_rows ).to_numpy( zero_copy_only=True )
+
+    except ( OSError, pa.ArrowInvalid ) as exc:
+        warnings.warn( f'store colunar ignorado ( {folder}, {name} ): {exc}' )
+        return None
+
+    frame.index = pd.Index( index, name=meta['index']['name'], copy=False )
+
+    return frame
+
+# ==================================== ::
+
+def _write_files( folder, spec, data, mode ):
+    for role, content in data.items():
+        with open( os.path.join( folder, spec[role] ), mode ) as f:
+            f.write( content )
+
+# ==================================== ::
+
+def write_store( df, folder, name, key ):
+    """
+        Grava df no store colunar: um arquivo por coluna ( dados crus,
+        sem cabecalho ) e o meta-<name>.json com os formatos e o numero
+        de linhas da versao, gravado por ultimo. Diferente do Arrow, as
+        linhas de um lote novo entram no fim dos arquivos ( append_store ).
+
+        Output:
+            - frame lido de volta ( read_store ), None sem o pyarrow
+    """
+    if not available():
+        return None
+
+    os.makedirs( folder, exist_ok=True )
+    token = f'{name}.{os.getpid()}'
+    meta = { 'key': key, 'n_rows': len( df ), 'columns': [] }
+
+    for i, col in enumerate( df.columns ):
+        spec = dict( _column_spec( df[col], f'c{i}.{token}.bin' ), name=col )
+        _write_files( folder, spec, _column_data( df[col], spec ), 'wb' )
+        meta['columns'].append( spec )
+
+    index = pd.Series( df.index.to_numpy() )
+    meta['index'] = dict( _column_spec( index, f'index.{token}.bin' ), name=df.index.name )
+    _write_files( folder, meta['index'], _column_data( index, meta['index'] ), 'wb' )
+
+    _write_meta( folder, name, meta )
+
+    return read_store( folder, name, key )
+
+# ==================================== ::
+
+def _rewrite_file( spec, token ):
+    # c3.<versao antiga>.bin -> c3.<versao nova>.bin
+    return f'{spec["file"].split( "." )[0]}.{token}.bin'
+
+# ==================================== ::
+
+def _append_spec( folder, spec, n_rows, values, token ):
+    """
+        Formato da coluna depois do append: o mesmo ( linhas novas no fim
+        do arquivo ) ou, se os valores novos nao cabem nele ( categoria
+        nova fora da ordem, inteiro maior ), um arquivo novo com a coluna
+        inteira recodificada.
+
+        Output:
+            - ( spec, reescrita? )
+    """
+    if spec['kind'] == 'category':
+        new = pd.Index( spec['categories'] ).union( pd.Index( values.dropna().unique() ).astype( object ) )
+        if list( new ) == spec['categories']:
+            return spec, False
+
+        old_codes = np.frombuffer( _map( folder, spec['file'], n_rows * np.dtype( spec['dtype'] ).itemsize ),
+                                   dtype=spec['dtype'] )
+        remap = np.append( new.get_indexer( spec['categories'] ), -1 )
+        codes = pd.Categorical.from_codes( remap[old_codes], categories=new ).codes
+        rewritten = dict( spec, categories=list( new ), dtype=codes.dtype.str, file=_rewrite_file( spec, token ) )
+        _write_files( folder, rewritten, { 'file': codes.tobytes() }, 'wb' )
+
+        return rewritten, True
+
+    if spec['kind'] == 'values':
+        dtype = np.dtype( spec['dtype'] )
+        array = values.to_numpy()
+        fits = np.can_cast( array.dtype, dtype ) or ( array.dtype.kind in 'iu' and dtype.kind in 'iu' and len( array )
+                                                      and np.iinfo( dtype ).min <= array.min()
+                                                      and array.max() <= np.iinfo( dtype ).max )
+        if fits:
+            return spec, False
+
+        old = np.frombuffer( _map( folder, spec['file'], n_rows * dtype.itemsize ), dtype=dtype )
+        widened = np.result_type( dtype, array.dtype )
+        rewritten = dict( spec, dtype=widened.str, file=_rewrite_file( spec, token ) )
+        _write_files( folder, rewritten, { 'file': old.astype( widened ).tobytes() }, 'wb' )
+
+        return rewritten, True
+
+    return spec, False
+
+# ==================================== ::
+
+def append_store( folder, previous, name, rows, key, previous_key ):
+    """
+        Versao name do store = versao previous + rows no fim, gravando so
+        as linhas novas no fim de cada arquivo ( uma coluna so e regravada
+        inteira quando os valores novos mudam o formato dela ). Os leitores
+        da versao anterior mapeiam so os bytes dela e nao sao afetados.
+
+        Input:
+            - rows: linhas novas, ja na posicao final ( depois da ultima
+              linha de previous, indice continuando a numeracao )
+        Output:
+            - False ( nada gravado ) se previous nao existe ou se os
+              arquivos tem bytes alem do gravado ( append interrompido ):
+              a versao deve ser regravada com write_store
+    """
+    if not available():
+        return False
+
+    meta = _read_meta( folder, previous, previous_key )
+    if meta is None:
+        return False
+
+    n_rows = meta['n_rows']
+    specs = meta['columns'] + [meta['index']]
+    try:
+        for spec in specs:
+            sizes = _file_sizes( spec, n_rows, folder )
+            if any( os.path.getsize( os.path.join( folder, spec[role] ) ) != size for role, size in sizes.items() ):
+                return False
+    except ( OSError, pa.ArrowInvalid ):
+        return False
+
+    token = f'{name}.{os.getpid()}'
+    columns = {}
+    for spec in specs:
+        values = pd.Series( rows.index.to_numpy() ) if spec is meta['index'] else rows[spec['name']]
+        spec, rewritten = _append_spec( folder, spec, n_rows, values, token )
+        data = _column_data( values, spec )
+
+        if spec['kind'] == 'string':
+            # offsets das linhas novas continuam do fim dos bytes ja gravados
+            total = _file_sizes( spec, n_rows, folder )['file']
+            offsets = np.frombuffer( data['offsets'], dtype=np.int32 ).astype( np.int64 )[1:] + total
+            if len( offsets ) and offsets[-1] > np.iinfo( np.int32 ).max:
+                raise OverflowError( 'coluna de texto passou de 2 GB no store colunar' )
+            data['offsets'] = offsets.astype( np.int32 ).tobytes()
+
+        _write_files( folder, spec, data, 'ab' )
+        columns[spec['name']] = spec
+
+    meta = dict( meta, key=key, n_rows=n_rows + len( rows ),
+                 columns=[columns[spec['name']] for spec in meta['columns']], index=columns[meta['index']['name']] )
+    _write_meta( folder, name, meta )
+
+    return True
+
+# ==================================== ::
+
+def remove_store( folder, keep ):
+    """ Apaga as versoes do store fora de keep e os arquivos que nenhuma delas usa ( mapas abertos continuam validos ). """
+    if not os.path.isdir( folder ):
+        return
+
+    used = set()
+    for name in os.listdir( folder ):
+        if not name.startswith( 'meta-' ) or not name.endswith( '.json' ):
+            continue
+        if name[len( 'meta-' ):-len( '.json' )] not in keep:
+            os.remove( os.path.join( folder, name ) )
+            continue
+        with open( os.path.join( folder, name ), encoding='utf-8' ) as f:
+            meta = json.load( f )
+        for spec in meta['columns'] + [meta['index']]:
+            used.update( spec[role] for role in ( 'file', 'offsets' ) if role in spec )
+
+    for name in os.listdir( folder ):
+        if name.endswith( '.bin' ) or name.endswith( '.offsets' ):
+            if name not in used:
+                os.remove( os.path.join( folder, name ) )
@@ -0,0 +1,150 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import numpy as np
+import pandas as pd
+
+from curry.data import DATASET_PATH, date_position, load_derived
+from curry.parallel import partials
+
+# dimensoes do cubo: toda metrica das paginas agrupa por um subconjunto delas
+DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density', 'Weatherconditions',
+              'Festival', 'Type_of_order', 'Type_of_vehicle']
+
+# medidas: para cada uma o cubo guarda contagem, soma e soma dos quadrados
+MEASURES = { 'time': 'Time_taken(min)',
+             'rating': 'Delivery_person_Ratings',
+             'distance': 'distance_km' }
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def cell_sums( df1, dims ):
+    """
+        Soma as medidas de df1 por combinacao existente de dims.
+
+        Colunas de saida:
+            - dims
+            - n: quantidade de pedidos na celula
+            - <medida>_n, <medida>_sum, <medida>_sumsq: contagem de valores
+              nao nulos, soma e soma dos quadrados de cada medida
+
+        Celulas de particoes diferentes do dataset se somam coluna a
+        coluna ( ver TimeRollups.append em curry.timeline ).
+    """
+    values = df1.loc[:, dims]
+    values['n'] = 1
+
+    for name, col in MEASURES.items():
+        x = df1[col].astype( float )
+        values[f'{name}_n'] = x.notna().astype( int )
+        values[f'{name}_sum'] = x
+        values[f'{name}_sumsq'] = x * x
+
+    # soma por celula em paralelo para datasets grandes ( curry.parallel ); as
+    # particoes sao faixas de Order_Date, entao cada dia sai de uma so
+    cube = partials( values, dims, list( values.columns[len( dims ):] ), stats=( 'sum', ) )
+    cube.columns = cube.columns.droplevel( 1 )
+    cube = cube.reset_index()
+
+    return cube
+
+# ==================================== ::
+
+def build_cube( df1 ):
+    """
+        Agrega o dataset limpo em um cubo com uma linha por combinacao
+        existente das DIMENSIONS ( colunas de cell_sums ).
+
+        Com essas somas a media e o desvio padrao de qualquer recorte
+        sao reconstruidos exatamente ( ver rollup ).
+    """
+    return cell_sums( df1, DIMENSIONS )
+
+# ==================================== ::
+
+def append_cube( cube, df1 ):
+    """
+        Cubo com as linhas novas df1 somadas: so df1 e agregado
+        ( cell_sums ) e as celulas que ja existiam ( o mesmo dia em dois
+        lotes ) sao somadas, sem reagregar o historico. cube nao e alterado.
+    """
+    part = cell_sums( df1, DIMENSIONS )
+
+    # concat + groupby mantem as contagens inteiras e o cubo ordenado por Order_Date
+    return ( pd.concat( [cube, part], ignore_index=True )
+               .groupby( DIMENSIONS, sort=True, observed=True )
+               .sum()
+               .reset_index() )
+
+# ==================================== ::
+
+def load_cube( path=DATASET_PATH ):
+    """ Cubo do dataset em cache, construido uma vez por versao do dataset ( e somado a cada lote novo ). """
+    return load_derived( 'cube', build_cube, path, append_cube )
+
+# ==================================== ::
+
+def cube_cells( cube, date_limit=None, traffic=None ):
+    """
+        Celulas do cubo que passam nos filtros da barra lateral, sem
+        copiar o cubo:
+            - date_limit: mantem Order_Date < date_limit
+            - traffic: lista de Road_traffic_density selecionados
+
+        Output:
+            - fatia ( so a data limite, ou todos os transitos escolhidos )
+              ou posicoes int32 das celulas
+    """
+    # o cubo sai do groupby ordenado por Order_Date ( primeira dimensao )
+    stop = len( cube ) if date_limit is None else date_position( cube, date_limit )
+    if traffic is None:
+        return slice( 0, stop )
+
+    linhas_selecionadas = cube['Road_traffic_density'].iloc[:stop].isin( traffic ).to_numpy()
+    if linhas_selecionadas.all():
+        return slice( 0, stop )
+
+    return np.flatnonzero( linhas_selecionadas ).astype( np.int32 )
+
+# ==================================== ::
+
+def slice_cube( cube, date_limit=None, traffic=None ):
+    """ Recorte do cubo com os filtros da barra lateral ( ver cube_cells ). """
+    return cube.iloc[cube_cells( cube, date_limit, traffic )]
+
+# ==================================== ::
+
+def rollup( cube, by=None, measures=() ):
+    """
+        Agrega as celulas do cubo pelas dimensoes em by.
+
+        Input:
+            - cube: cubo ( ou recorte de slice_cube )
+            - by: dimensao ou lista de dimensoes; None agrega tudo em uma linha
+            - measures: medidas ( chaves de MEASURES ) com media e desvio
+        Output:
+            - Dataframe indexado por by com a coluna n e, para cada medida,
+              <medida>_mean e <medida>_std ( ddof=1, igual ao pandas )
+    """
+    cols = ['n'] + [f'{m}_{stat}' for m in measures for stat in ( 'n', 'sum', 'sumsq' )]
+
+    if by is None:
+        counts = { col: int for col in cols if col == 'n' or col.endswith( '_n' ) }
+        sums = cube.loc[:, cols].sum().to_frame().T.astype( counts )
+    else:
+        # observed=True: dimensoes categoricas ( curry.data ) so com os grupos presentes
+        sums = cube.groupby( by, sort=True, observed=True )[cols].sum()
+
+    df_aux = sums.loc[:, ['n']]
+    for m in measures:
+        n = sums[f'{m}_n']
+        total = sums[f'{m}_sum']
+        var = ( ( sums[f'{m}_sumsq'] - total * total / n ) / ( n - 1 ) ).clip( lower=0 )
+
+        df_aux[f'{m}_mean'] = total / n
+        df_aux[f'{m}_std'] = np.sqrt( var.where( n > 1 ) )
+
+    return df_aux
@@ -0,0 +1,657 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import copy
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from curry import columnar
+
+DATASET_PATH = 'dataset/train.csv'
+
+# lotes acrescentados por curry.ingest: dataset/train.partitions/, um CSV
+# por dia e lote, listados em ordem de chegada no manifesto
+PARTITIONS_SUFFIX = '.partitions'
+MANIFEST_NAME = 'manifest.json'
+
+# frame limpo do CSV base + particoes: store colunar anexavel, uma versao por manifesto
+COMBINED_NAME = 'combined'
+
+# versao das regras de limpeza: incremente sempre que clean_code ( ou o
+# schema compacto ) mudar o resultado, para invalidar os caches ja gravados
+CLEAN_SCHEMA_VERSION = 5
+
+# mesmo raio medio usado pelo pacote haversine
+EARTH_RADIUS_KM = 6371.0088
+
+# valor usado no CSV bruto para dado ausente ( com espaco no final )
+NAN_SENTINEL = 'NaN '
+NAN_COLUMNS = ['Delivery_person_Age', 'Road_traffic_density', 'City', 'Festival', 'multiple_deliveries']
+STRIP_COLUMNS = ['Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'Festival']
+
+# colunas lidas do CSV ( usecols ): Time_Orderd e Time_Order_picked nao sao
+# usadas por nenhuma pagina e nem chegam a ser carregadas
+USE_COLUMNS = ['ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings',
+               'Restaurant_latitude', 'Restaurant_longitude',
+               'Delivery_location_latitude', 'Delivery_location_longitude',
+               'Order_Date', 'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition',
+               'Type_of_order', 'Type_of_vehicle', 'multiple_deliveries', 'Festival', 'City',
+               'Time_taken(min)']
+
+# schema compacto ( compact_frame ):
+# - dimensoes com poucos valores: categoricas ( codigo inteiro + dicionario )
+# - inteiros pequenos: menor tipo inteiro que comporta os valores
+# - coordenadas: float32 ( ~7 digitos, < 1 m no grau de latitude ); a
+#   distancia e calculada antes, em float64
+CATEGORY_COLUMNS = ['Delivery_person_ID', 'Weatherconditions', 'Road_traffic_density',
+                    'Type_of_order', 'Type_of_vehicle', 'Festival', 'City']
+INTEGER_COLUMNS = ['Delivery_person_Age', 'Vehicle_condition', 'multiple_deliveries', 'Time_taken(min)']
+FLOAT32_COLUMNS = ['Restaurant_latitude', 'Restaurant_longitude',
+                   'Delivery_location_latitude', 'Delivery_location_longitude']
+
+# chaves inteiras ( int32 ) de tempo de cada pedido, por resolucao:
+# dia AAAAMMDD, semana ISO AAAASS ( ano ISO ) e mes AAAAMM
+TIME_KEYS = { 'day': 'day_key', 'week': 'week_key', 'month': 'month_key' }
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def _by_unique( series, func ):
+    """
+        Aplica func apenas nos valores unicos da coluna e espalha o
+        resultado de volta pelos codigos do factorize. As colunas de
+        texto do dataset tem poucos valores distintos, entao o trabalho
+        cai de O(linhas) chamadas de string para O(valores unicos).
+    """
+    codes, uniques = pd.factorize( series, use_na_sentinel=False )
+    values = np.asarray( func( pd.Series( uniques, dtype=series.dtype ) ) )
+
+    return pd.Series( values[codes], index=series.index, name=series.name )
+
+# ==================================== ::
+
+def clean_code( df1 ):
+    """ Esta funcao tem a responsabilidade de limpar o data frame
+
+        TIpos de limpeza:
+        1. removeção dos dados NaN ( uma unica mascara, uma unica copia )
+        2. Mudança do tipo da coluna de dados
+        3. Removação dos espaços das variaveis de texto
+        4. Formatação da coluna de datas
+        5. Limpeza da coluna de tempo ( remoção do texto da variavel númerica )
+
+        Imput: Dataframe
+        Output: Dataframe
+
+    """
+    # 1. Limpeza de 'NaN ' das colunas selecionadas - todas de uma vez
+    linhas_selecionadas = np.logical_and.reduce(
+        [ ( df1[col] != NAN_SENTINEL ).to_numpy() for col in NAN_COLUMNS ] )
+    df1 = df1.take( np.flatnonzero( linhas_selecionadas ) )
+
+    # 2. convertendo idade, avaliacao e 'multiple_deliveries' de texto para numero
+    df1['Delivery_person_Age'] = _by_unique( df1['Delivery_person_Age'], lambda s: s.astype( int ) )
+    df1['Delivery_person_Ratings'] = _by_unique( df1['Delivery_person_Ratings'], lambda s: s.astype( float ) )
+    df1['multiple_deliveries'] = _by_unique( df1['multiple_deliveries'], lambda s: s.astype( int ) )
+
+    # 3. convertendo a coluna 'Order_Date' de texto para data
+    df1['Order_Date'] = pd.to_datetime( df1['Order_Date'], format='%d-%m-%Y' )
+
+    # 4. Removendo os espacos dentro de strings/texto/object
+    df1['ID'] = df1['ID'].str.strip()
+    for col in STRIP_COLUMNS:
+        df1[col] = _by_unique( df1[col], lambda s: s.str.strip() )
+
+    # 5. Limpando a coluna de time taken
+    df1['Time_taken(min)'] = _by_unique( df1['Time_taken(min)'],
+                                         lambda s: s.str.split( '(min) ', n=1, regex=False ).str[1].astype( int ) )
+
+    return df1
+
+# ==================================== ::
+
+def haversine_km( lat1, lon1, lat2, lon2 ):
+    """
+        Distancia de grande circulo em km, vetorizada em NumPy.
+        Mesma formula do pacote haversine, mas em uma unica operacao
+        sobre os arrays em vez de uma chamada Python por linha.
+    """
+    lat1, lon1, lat2, lon2 = ( np.radians( np.asarray( x, dtype=np.float64 ) ) for x in ( lat1, lon1, lat2, lon2 ) )
+
+    d = ( np.sin( ( lat2 - lat1 ) * 0.5 ) ** 2
+          + np.cos( lat1 ) * np.cos( lat2 ) * np.sin( ( lon2 - lon1 ) * 0.5 ) ** 2 )
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin( np.sqrt( d ) )
+
+# ==================================== ::
+
+def time_keys( dates ):
+    """
+        Chaves inteiras de TIME_KEYS para cada data.
+
+        Input:
+            - dates: Series / array de datas ( datetime64 )
+        Output:
+            - dict { coluna: array int32 }, na ordem de dates
+    """
+    days, codes = np.unique( np.asarray( dates, dtype='datetime64[D]' ), return_inverse=True )
+
+    # calendario calculado so nos dias distintos e espalhado pelos codigos
+    calendar = pd.DatetimeIndex( days )
+    iso = calendar.isocalendar()
+    keys = { 'day_key': calendar.year * 10000 + calendar.month * 100 + calendar.day,
+             'week_key': iso['year'].to_numpy( dtype=np.int64 ) * 100 + iso['week'].to_numpy( dtype=np.int64 ),
+             'month_key': calendar.year * 100 + calendar.month }
+
+    return { col: np.asarray( values, dtype=np.int32 )[codes] for col, values in keys.items() }
+
+# ==================================== ::
+
+def add_derived_columns( df1 ):
+    """
+        Colunas calculadas uma unica vez na carga do dataset, para que
+        as paginas apenas agreguem:
+        - distance_km: distancia restaurante -> local de entrega
+        - day_key, week_key, month_key: chaves inteiras de tempo ( time_keys ),
+          para agrupar por semana ou mes sem strftime
+    """
+    df1['distance_km'] = haversine_km( df1['Restaurant_latitude'], df1['Restaurant_longitude'],
+                                       df1['Delivery_location_latitude'], df1['Delivery_location_longitude'] )
+
+    for col, values in time_keys( df1['Order_Date'] ).items():
+        df1[col] = values
+
+    return df1
+
+# ==================================== ::
+
+def compact_frame( df1 ):
+    """
+        Converte o frame limpo para o schema compacto ( ver CATEGORY_COLUMNS,
+        INTEGER_COLUMNS e FLOAT32_COLUMNS ). Os valores exibidos nao mudam;
+        as categorias ficam em ordem alfabetica, entao groupby( observed=True )
+        devolve os grupos na mesma ordem das strings.
+    """
+    for col in CATEGORY_COLUMNS:
+        df1[col] = df1[col].astype( 'category' )
+    for col in INTEGER_COLUMNS:
+        df1[col] = pd.to_numeric( df1[col], downcast='integer' )
+    for col in FLOAT32_COLUMNS:
+        df1[col] = df1[col].astype( np.float32 )
+
+    return df1
+
+# ==================================== ::
+
+def memory_report( df1 ):
+    """
+        Memoria do frame por coluna ( deep, inclui as strings ).
+
+        Output:
+            - Dataframe com dtype, bytes e bytes_per_row por coluna, mais
+              a linha 'total'
+    """
+    usage = df1.memory_usage( deep=True, index=True )
+    report = pd.DataFrame( { 'dtype': [str( df1.index.dtype )] + [str( t ) for t in df1.dtypes],
+                             'bytes': usage.to_numpy() },
+                           index=usage.index )
+    report.loc['total'] = ['', usage.sum()]
+    report['bytes_per_row'] = ( report['bytes'] / max( len( df1 ), 1 ) ).round( 1 )
+
+    return report
+
+# ==================================== ::
+
+def date_position( df1, date_limit ):
+    """ Quantidade de linhas com Order_Date < date_limit ( frame ordenado por data ). """
+    return int( df1['Order_Date'].searchsorted( pd.Timestamp( date_limit ), side='left' ) )
+
+# ==================================== ::
+
+def filter_date_limit( df1, date_limit ):
+    """
+        Equivalente a df1.loc[df1['Order_Date'] < date_limit, :] para um
+        frame ordenado por Order_Date ( como o de load_data ). Uma busca
+        binaria acha o corte e a fatia posicional devolve uma view, sem
+        varrer nem copiar as linhas.
+    """
+    return df1.iloc[:date_position( df1, date_limit )]
+
+# ==================================== ::
+
+def file_hash( path, chunk_size=1 << 20 ):
+    """
+        Calcula o sha256 do arquivo lendo em blocos, sem carregar
+        o arquivo inteiro na memoria.
+    """
+    digest = hashlib.sha256()
+    with open( path, 'rb' ) as f:
+        for chunk in iter( lambda: f.read( chunk_size ), b'' ):
+            digest.update( chunk )
+
+    return digest.hexdigest()
+
+# ==================================== ::
+
+def build_frame( path, digest ):
+    """
+        Monta o dataset limpo: usa o cache colunar ao lado do CSV quando
+        a chave ( hash do CSV + versao da limpeza ) confere; caso
+        contrario le o CSV, limpa e regrava o cache.
+
+        O frame sai ordenado por Order_Date, o que transforma o filtro de
+        data limite em um searchsorted + fatia ( ver filter_date_limit ).
+
+        Com o pyarrow o frame devolvido e sempre o lido do cache ( mesmo
+        logo depois de grava-lo ): as colunas apontam para o mapa de
+        memoria do arquivo, sao somente leitura e as paginas do arquivo
+        sao compartilhadas pelo sistema entre os processos do servidor.
+    """
+    key = f'{digest}:{CLEAN_SCHEMA_VERSION}'
+    arrow_path = columnar.cache_path( path )
+
+    frame = columnar.read_cache( arrow_path, key )
+    if frame is None:
+        frame = add_derived_columns( clean_code( pd.read_csv( path, usecols=USE_COLUMNS ) ) )
+        frame = compact_frame( frame ).sort_values( 'Order_Date', kind='stable' )
+        columnar.write_cache( frame, arrow_path, key )
+
+        mapped = columnar.read_cache( arrow_path, key )
+        if mapped is not None:
+            frame = mapped
+
+    return frame
+
+# ==================================== ::
+
+def partitions_dir( path ):
+    """ dataset/train.csv -> dataset/train.partitions """
+    root, _ = os.path.splitext( path )
+    return root + PARTITIONS_SUFFIX
+
+# ==================================== ::
+
+def manifest_path( path ):
+    return os.path.join( partitions_dir( path ), MANIFEST_NAME )
+
+# ==================================== ::
+
+def read_manifest( path ):
+    """
+        Particoes acrescentadas ao dataset, em ordem de chegada.
+
+        Output:
+            - lista de { 'file': CSV relativo a partitions_dir, 'hash': sha256
+              do CSV, 'batch': sha256 do lote de origem }; vazia sem manifesto
+    """
+    try:
+        with open( manifest_path( path ), encoding='utf-8' ) as f:
+            return json.load( f )['partitions']
+    except FileNotFoundError:
+        return []
+
+# ==================================== ::
+
+def write_manifest( path, partitions, digest=None ):
+    """
+        Grava o manifesto de uma vez ( arquivo temporario + os.replace ).
+        digest: hash do CSV base, guardado com o ( mtime, tamanho ) dele
+        para o proximo append nao reler o CSV inteiro ( base_hash ).
+    """
+    manifest = { 'partitions': partitions }
+    if digest is not None:
+        manifest['base'] = { 'hash': digest, 'stat': file_stat( path ) }
+
+    target = manifest_path( path )
+    os.makedirs( os.path.dirname( target ), exist_ok=True )
+    tmp_path = f'{target}.{os.getpid()}.tmp'
+    with open( tmp_path, 'w', encoding='utf-8' ) as f:
+        json.dump( manifest, f, indent=1 )
+    os.replace( tmp_path, target )
+
+# ==================================== ::
+
+def base_hash( path ):
+    """ Hash do CSV base: o guardado no manifesto se o ( mtime, tamanho ) confere, senao file_hash. """
+    try:
+        with open( manifest_path( path ), encoding='utf-8' ) as f:
+            base = json.load( f ).get( 'base' )
+    except FileNotFoundError:
+        base = None
+
+    if base is not None and file_stat( path ) == tuple( base['stat'] or () ):
+        return base['hash']
+
+    return file_hash( path )
+
+# ==================================== ::
+
+def partition_path( path, partition ):
+    return os.path.join( partitions_dir( path ), partition['file'] )
+
+# ==================================== ::
+
+def combined_version( digest, partitions ):
+    """ Versao do dataset: hash do CSV base, ou hash dele com os das particoes. """
+    if not partitions:
+        return digest
+
+    combined = hashlib.sha256( digest.encode() )
+    for partition in partitions:
+        combined.update( partition['hash'].encode() )
+
+    return combined.hexdigest()
+
+# ==================================== ::
+
+def file_stat( path ):
+    """ ( mtime, tamanho ) do arquivo, None se ele nao existe. """
+    try:
+        stat = os.stat( path )
+    except FileNotFoundError:
+        return None
+
+    return ( stat.st_mtime_ns, stat.st_size )
+
+# ==================================== ::
+
+def load_partitions( path, partitions ):
+    """ Frames limpos das particoes ( build_frame de cada CSV, com o cache Arrow ao lado ). """
+    return [build_frame( partition_path( path, partition ), partition['hash'] ) for partition in partitions]
+
+# ==================================== ::
+
+def continue_index( df1, parts ):
+    """ Linhas das particoes com o indice ( linha do CSV ) continuando o de df1, particao a particao. """
+    start = int( df1.index.max() ) + 1 if len( df1 ) else 0
+    rows = []
+    for part in parts:
+        rows.append( part.set_axis( part.index + start ) )
+        start += int( part.index.max() ) + 1 if len( part ) else 0
+
+    return pd.concat( rows )
+
+# ==================================== ::
+
+def append_rows( df1, parts ):
+    """
+        Junta particoes limpas ao frame limpo como se as linhas delas
+        estivessem no fim do CSV, sem limpar de novo nada do que ja existe:
+
+            - o indice ( linha do CSV ) continua a numeracao, particao a particao
+            - categorias unidas, em ordem alfabetica ( como compact_frame )
+            - ordem ( Order_Date, linha ): as particoes de dias novos so
+              entram no fim; um dia anterior ao ultimo pede um sort estavel
+
+        Input:
+            - df1: frame limpo ( nao e alterado )
+            - parts: lista de frames limpos ( load_partitions )
+        Output:
+            - ( frame com as linhas novas, linhas novas no mesmo schema )
+    """
+    batch = continue_index( df1, parts )
+
+    df1 = df1.copy( deep=False )
+    for col in CATEGORY_COLUMNS:
+        categories = df1[col].cat.categories.union( batch[col].astype( 'category' ).cat.categories )
+        if not categories.equals( df1[col].cat.categories ):
+            df1[col] = df1[col].cat.set_categories( categories )
+        batch[col] = batch[col].astype( pd.CategoricalDtype( categories ) )
+
+    frame = pd.concat( [df1, batch] )
+    if len( df1 ) and len( batch ) and batch['Order_Date'].min() < df1['Order_Date'].iloc[-1]:
+        frame = frame.sort_values( 'Order_Date', kind='stable' )
+
+    return frame, batch
+
+# ==================================== ::
+
+def combined_dir( path ):
+    """ dataset/train.csv -> dataset/train.partitions/combined ( store do frame com as particoes ) """
+    return os.path.join( partitions_dir( path ), COMBINED_NAME )
+
+# ==================================== ::
+
+def _combined_names( digest, partitions ):
+    version = combined_version( digest, partitions )
+    return version[:16], f'{version}:{CLEAN_SCHEMA_VERSION}'
+
+# ==================================== ::
+
+def build_combined( path, df1, digest, partitions, new ):
+    """
+        Frame limpo da versao com todas as particoes, como em build_frame:
+        mapeado do store colunar da versao ( columnar.read_store ) quando
+        ele existe; senao df1 + particoes novas ( append_rows ) e gravado
+        no store, e o frame devolvido e o lido de volta.
+
+        Assim o historico nao vira uma copia privada em cada processo do
+        servidor: todos mapeiam os mesmos arquivos ( normalmente gravados
+        pelo curry.ingest, ver extend_combined ).
+
+        Input:
+            - df1: frame limpo com as particoes anteriores a new
+            - digest: hash do CSV base
+            - partitions: todas as particoes da versao ( manifesto )
+            - new: particoes de partitions que faltam em df1
+    """
+    name, key = _combined_names( digest, partitions )
+
+    frame = columnar.read_store( combined_dir( path ), name, key )
+    if frame is None:
+        frame, _ = append_rows( df1, load_partitions( path, new ) )
+
+        mapped = columnar.write_store( frame, combined_dir( path ), name, key )
+        if mapped is not None:
+            frame = mapped
+
+    return frame
+
+# ==================================== ::
+
+def extend_combined( path, digest, partitions, new ):
+    """
+        Prepara o store da versao partitions + new a partir do da versao
+        partitions ( curry.ingest, antes de publicar o manifesto ).
+
+        Com o store anterior e as linhas novas depois do ultimo dia, so as
+        linhas de new sao gravadas, no fim dos arquivos ( columnar.append_store ).
+        O primeiro lote, um lote com dias antigos ( sort estavel ) ou um
+        store anterior ausente regravam a versao inteira ( build_combined ).
+    """
+    folder = combined_dir( path )
+    previous, previous_key = _combined_names( digest, partitions )
+    name, key = _combined_names( digest, partitions + new )
+
+    df1 = columnar.read_store( folder, previous, previous_key ) if partitions else None
+    if df1 is not None:
+        batch = continue_index( df1, load_partitions( path, new ) )
+        if batch['Order_Date'].min() >= df1['Order_Date'].iloc[-1]:
+            if columnar.append_store( folder, previous, name, batch, key, previous_key ):
+                return
+
+        build_combined( path, df1, digest, partitions + new, new )
+    else:
+        build_combined( path, build_frame( path, digest ), digest, partitions + new, partitions + new )
+
+# ==================================== ::
+
+def remove_combined( path, digest, partitions ):
+    """ Apaga do store as versoes que nao sao a de partitions ( um processo que ainda as mapeia nao e afetado ). """
+    columnar.remove_store( combined_dir( path ), keep={ _combined_names( digest, partitions )[0] } )
+
+# ==================================== ::
+
+def append_copy( structure, df1 ):
+    """
+        Appender padrao de load_derived: structure.append( df1 ) em uma
+        copia rasa. Serve para estruturas cujo append troca os atributos
+        por objetos novos em vez de altera-los, entao a versao anterior
+        continua intacta para as sessoes que ainda a usam.
+    """
+    return copy.copy( structure ).append( df1 )
+
+# ==================================== ::
+
+class _DatasetCache:
+    """
+        Cache do dataset limpo, unico por processo.
+
+        O Streamlit re-executa a pagina inteira a cada interacao; este
+        cache garante que o CSV seja lido e limpo uma unica vez. A
+        validade e conferida pelo (mtime, tamanho) do CSV e do manifesto
+        de particoes a cada chamada:
+
+            - CSV mudou: o hash do conteudo e recalculado e, so se o hash
+              mudou, o dataset e reprocessado
+            - so o manifesto mudou ( curry.ingest ): o frame da versao nova
+              e mapeado do store colunar combinado ( build_combined ), e as
+              estruturas derivadas com appender ( load_derived ) somam so as
+              linhas novas; as demais sao reconstruidas quando pedidas, e as
+              posicionais tambem quando as linhas novas nao ficam no fim
+
+        A versao nova e montada inteira ao lado e trocada de uma vez: as
+        sessoes veem o dataset antigo ou o novo, nunca uma mistura.
+    """
+
+    def __init__( self ):
+        # RLock: construtores de estruturas derivadas podem chamar get()
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._appenders = {}
+        self._positional = set()
+
+    def _base( self, path, digest ):
+        return { 'hash': digest, 'partitions': [], 'frame': build_frame( path, digest ), 'derived': {} }
+
+    def _append( self, path, entry, partitions ):
+        old = entry['frame']
+        frame = build_combined( path, old, entry['hash'], entry['partitions'] + partitions, partitions )
+
+        # linhas novas: indice ( linha do CSV ) depois do ultimo do frame anterior ( append_rows )
+        # no fim quando nenhuma linha nova precisou do sort estavel para dias antigos
+        in_order = len( old ) == 0 or len( frame ) == len( old ) or \
+            frame.index[len( old ):].min() > old.index.max()
+        if in_order:
+            batch = frame.iloc[len( old ):]
+        else:
+            batch = frame.loc[frame.index.to_numpy() > old.index.max()]
+
+        derived = { name: self._appenders[name]( structure, batch )
+                    for name, structure in entry['derived'].items()
+                    if name in self._appenders and ( in_order or name not in self._positional ) }
+
+        return { 'hash': entry['hash'], 'partitions': entry['partitions'] + partitions,
+                 'frame': frame, 'derived': derived }
+
+    def _entry( self, path ):
+        path = os.path.abspath( path )
+        key = ( file_stat( path ), file_stat( manifest_path( path ) ) )
+
+        with self._lock:
+            entry = self._entries.get( path )
+            if entry is not None and entry['stat_key'] == key:
+                return entry
+
+            if entry is None or entry['stat_key'][0] != key[0]:
+                digest = file_hash( path )
+                if entry is None or entry['hash'] != digest:
+                    entry = self._base( path, digest )
+
+            partitions = read_manifest( path )
+            applied = len( entry['partitions'] )
+            if partitions[:applied] != entry['partitions']:
+                # manifesto reescrito ( particoes removidas ): recomeca do CSV base
+                entry, applied = self._base( path, entry['hash'] ), 0
+            if len( partitions ) > applied:
+                entry = self._append( path, entry, partitions[applied:] )
+
+            entry['stat_key'] = key
+            entry['version'] = combined_version( entry['hash'], entry['partitions'] )
+            self._entries[path] = entry
+
+            return entry
+
+    def get( self, path ):
+        return self._entry( path )['frame']
+
+    def version( self, path ):
+        """ Versao ( combined_version ) do dataset atualmente em cache. """
+        return self._entry( path )['version']
+
+    def derived( self, path, name, builder, append=None, positional=False ):
+        """
+            Estrutura calculada a partir do frame limpo ( cubo, indices... ),
+            construida uma vez por versao do dataset e descartada junto com ele.
+            append( estrutura, linhas_novas ): estrutura da versao seguinte,
+            sem alterar a atual ( ver append_copy ). positional: a estrutura
+            guarda posicoes de linha e so aceita linhas novas no fim.
+        """
+        with self._lock:
+            if append is not None:
+                self._appenders[name] = append
+            if positional:
+                self._positional.add( name )
+
+            entry = self._entry( path )
+            if name not in entry['derived']:
+                entry['derived'][name] = builder( entry['frame'] )
+
+            return entry['derived'][name]
+
+    def clear( self ):
+        with self._lock:
+            self._entries.clear()
+
+
+_CACHE = _DatasetCache()
+
+# ==================================== ::
+
+def load_data( path=DATASET_PATH ):
+    """
+        Retorna o dataset limpo para a execucao atual da pagina.
+
+        O DataFrame devolvido e uma copia rasa ( deep=False ) do frame
+        em cache: criar ou sobrescrever colunas nele nao altera o dado
+        compartilhado entre as sessoes. Trate-o como somente leitura
+        ( com o cache Arrow as colunas nem aceitam escrita ); para
+        filtrar sem copiar o frame use PandasBackend.query
+        ( curry.backends ), que guarda so as posicoes das linhas.
+    """
+    return _CACHE.get( path ).copy( deep=False )
+
+# ==================================== ::
+
+def load_derived( name, builder, path=DATASET_PATH, append=None, positional=False ):
+    """
+        Retorna builder( dataset limpo ), calculado uma unica vez por
+        processo e por versao do dataset. O builder recebe o frame em
+        cache ( nao uma copia ) e nao deve altera-lo.
+
+        Com append( estrutura, linhas_novas ) a estrutura acompanha os
+        lotes acrescentados ( curry.ingest ) somando so as linhas novas;
+        sem ele e reconstruida do frame inteiro na primeira chamada
+        depois do lote. positional=True: o append so vale para linhas
+        novas no fim do frame; um lote com dias antigos reconstroi.
+    """
+    return _CACHE.derived( path, name, builder, append, positional )
+
+# ==================================== ::
+
+def dataset_version( path=DATASET_PATH ):
+    """ Identificador ( sha256 ) da versao do dataset em cache, com as particoes acrescentadas. """
+    return _CACHE.version( path )
+
+# ==================================== ::
+
+def clear_cache():
+    """ Descarta o dataset em cache, forçando nova leitura. """
+    _CACHE.clear()
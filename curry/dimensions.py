@@ -0,0 +1,167 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import numpy as np
+import pandas as pd
+
+from curry.data import DATASET_PATH, append_copy, load_derived
+
+# dimensoes de baixa cardinalidade que podem virar filtro na barra lateral
+FILTER_DIMENSIONS = ['Road_traffic_density', 'City', 'Festival',
+                     'Weatherconditions', 'Type_of_order', 'Type_of_vehicle']
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+class DimensionIndex:
+    """
+        Indice de bitmaps das dimensoes de filtro do dataset limpo.
+
+        Cada dimensao e guardada como codigos inteiros ( categorical )
+        e cada valor tem um bitmap ( np.packbits, 1 bit por linha ) com
+        as linhas onde aparece. Um multiselect vira um OU bit a bit dos
+        bitmaps dos valores escolhidos e varios filtros um E entre eles,
+        sem comparar strings linha a linha.
+
+        Linhas novas no fim do dataset ( append ) so estendem os codigos e
+        os bitmaps; o historico nao e fatorado de novo.
+
+        Atributos:
+            - n_rows: linhas do dataset indexado
+            - levels: { dimensao: valores distintos, em ordem }
+            - codes: { dimensao: codigo de cada linha ( int8 ) }
+            - bitmaps: { dimensao: { valor: bitmap empacotado } }
+    """
+
+    def __init__( self, df1 ):
+        self.n_rows = len( df1 )
+        self.levels = {}
+        self.codes = {}
+        self.bitmaps = {}
+
+        for dim in FILTER_DIMENSIONS:
+            codes, levels = pd.factorize( df1[dim], sort=True )
+            self.codes[dim] = codes.astype( np.int8 )
+            self.levels[dim] = list( levels )
+            self.bitmaps[dim] = { value: np.packbits( codes == code )
+                                  for code, value in enumerate( levels ) }
+
+    def append( self, df1 ):
+        """ Indexa as linhas de df1 como as ultimas linhas do dataset. """
+        if len( df1 ) == 0:
+            return self
+
+        # dicts novos: uma copia rasa anterior ao append continua intacta ( append_copy )
+        levels, codes, bitmaps = {}, {}, {}
+        for dim in FILTER_DIMENSIONS:
+            old_levels = self.levels[dim]
+            values = df1[dim]
+            levels[dim] = sorted( set( old_levels ) | set( values.dropna().unique() ) )
+
+            old_codes = self.codes[dim]
+            if levels[dim] != old_levels:
+                # valor novo: os codigos antigos mudam de posicao na ordem alfabetica
+                remap = np.append( pd.Index( levels[dim] ).get_indexer( old_levels ), -1 ).astype( np.int8 )
+                old_codes = remap[old_codes]
+            new_codes = pd.Index( levels[dim] ).get_indexer( values ).astype( np.int8 )
+            codes[dim] = np.concatenate( [old_codes, new_codes] )
+
+            bitmaps[dim] = {}
+            for code, value in enumerate( levels[dim] ):
+                bitmap = self.bitmaps[dim].get( value )
+                if bitmap is None:
+                    bitmap = np.zeros( ( self.n_rows + 7 ) // 8, dtype=np.uint8 )
+                bitmaps[dim][value] = _append_bits( bitmap, self.n_rows, new_codes == code )
+
+        self.n_rows += len( df1 )
+        self.levels, self.codes, self.bitmaps = levels, codes, bitmaps
+
+        return self
+
+    def mask( self, dim, selected ):
+        """ Bitmap empacotado das linhas cujo dim esta em selected. """
+        bitmap = np.zeros( ( self.n_rows + 7 ) // 8, dtype=np.uint8 )
+        for value in selected:
+            if value in self.bitmaps[dim]:
+                bitmap |= self.bitmaps[dim][value]
+
+        return bitmap
+
+    def select( self, filters, n_rows=None ):
+        """
+            Mascara booleana das linhas que passam em todos os filtros.
+
+            Input:
+                - filters: { dimensao: lista de valores aceitos }; None
+                  ou dimensao ausente nao filtra
+                - n_rows: devolve so as primeiras n_rows linhas ( o
+                  prefixo que sobra depois de filter_date_limit )
+            Output:
+                - array bool com n_rows posicoes
+        """
+        n_rows = self.n_rows if n_rows is None else n_rows
+        bitmap = None
+
+        for dim, selected in filters.items():
+            if selected is None:
+                continue
+            dim_mask = self.mask( dim, selected )
+            bitmap = dim_mask if bitmap is None else bitmap & dim_mask
+
+        if bitmap is None:
+            return np.ones( n_rows, dtype=bool )
+
+        return np.unpackbits( bitmap, count=n_rows ).view( bool )
+
+# ==================================== ::
+
+def _append_bits( bitmap, n_rows, bits ):
+    """ Bitmap empacotado de n_rows linhas com bits acrescentados no fim ( so o ultimo byte e refeito ). """
+    full = n_rows // 8
+    tail = np.unpackbits( bitmap[full:], count=n_rows - full * 8 ).view( bool )
+
+    return np.concatenate( [bitmap[:full], np.packbits( np.concatenate( [tail, bits] ) )] )
+
+# ==================================== ::
+
+def load_dimension_index( path=DATASET_PATH ):
+    """ DimensionIndex do dataset em cache, construido uma vez por versao do dataset. """
+    return load_derived( 'dimension_index', DimensionIndex, path, append_copy, positional=True )
+
+# ==================================== ::
+
+def select_positions( n_rows, filters, path=DATASET_PATH ):
+    """
+        Posicoes ( int32 ) das primeiras n_rows linhas do dataset em cache
+        que passam nos filtros: 4 bytes por linha selecionada, em vez de
+        uma copia das linhas.
+    """
+    index = load_dimension_index( path )
+    if n_rows > index.n_rows:
+        raise ValueError( 'n_rows maior que o dataset indexado' )
+
+    return np.flatnonzero( index.select( filters, n_rows ) ).astype( np.int32 )
+
+# ==================================== ::
+
+def filter_dimensions( df1, filters, path=DATASET_PATH ):
+    """
+        Aplica filtros de dimensao usando os bitmaps do DimensionIndex.
+
+        df1 precisa ser um prefixo posicional do frame de load_data (o
+        proprio frame ou o resultado de filter_date_limit), ja que as
+        posicoes das linhas sao as do indice.
+
+        Exemplo:
+            df1 = filter_dimensions( df1, {'Road_traffic_density': traffic_options,
+                                           'City': city_options} )
+    """
+    index = load_dimension_index( path )
+    if len( df1 ) > index.n_rows:
+        raise ValueError( 'df1 nao e um prefixo do dataset indexado' )
+
+    linhas_selecionadas = index.select( filters, len( df1 ) )
+
+    return df1.loc[linhas_selecionadas, :]
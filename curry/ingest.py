@@ -0,0 +1,134 @@
+"""
+    Acrescenta lotes de pedidos novos ao dataset, sem reprocessar o
+    historico:
+
+        python -m curry.ingest novos_pedidos.csv
+        python -m curry.ingest lote_1.csv lote_2.csv --dataset dataset/train.csv
+
+    Cada lote ( mesmo schema bruto do dataset/train.csv ) vira uma
+    particao por dia em dataset/train.partitions/order_date=AAAA-MM-DD/,
+    limpa uma unica vez ( cache Arrow ao lado ). O manifesto e trocado por
+    ultimo, de uma vez: os processos do dashboard acrescentam so as linhas
+    novas aos dados e agregados em memoria na proxima consulta e passam
+    para a versao nova inteira ( curry.data ), mapeando o frame combinado
+    ( CSV base + particoes ) que o append ja deixa gravado em Arrow.
+
+    Os appends devem ser feitos um de cada vez ( ex.: um job diario ).
+"""
+
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import argparse
+import os
+
+import pandas as pd
+
+from curry.data import (DATASET_PATH, USE_COLUMNS, base_hash, build_frame, extend_combined, file_hash,
+                        partitions_dir, read_manifest, remove_combined, write_manifest)
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def read_batch( batch_path ):
+    """
+        Le o lote bruto como texto: regravado, o CSV de cada dia e lido
+        exatamente como o lote original seria ( valores e 'NaN ' intactos ).
+
+        Raises ValueError se faltam colunas de USE_COLUMNS.
+    """
+    header = pd.read_csv( batch_path, nrows=0 ).columns
+    missing = [col for col in USE_COLUMNS if col not in header]
+    if missing:
+        raise ValueError( f'{batch_path}: colunas ausentes no lote: {missing}' )
+
+    return pd.read_csv( batch_path, usecols=USE_COLUMNS, dtype=str, keep_default_na=False )
+
+# ==================================== ::
+
+def split_by_date( raw ):
+    """
+        Linhas do lote por dia de Order_Date ( formato do CSV bruto ).
+
+        Output:
+            - lista de ( dia, Dataframe ), em ordem de dia
+        Raises ValueError se alguma data nao esta no formato DD-MM-AAAA.
+    """
+    days = pd.to_datetime( raw['Order_Date'], format='%d-%m-%Y' )
+
+    return [( day, rows ) for day, rows in raw.groupby( days, sort=True )]
+
+# ==================================== ::
+
+def _write_csv( df, path ):
+    # temporario + rename: um leitor nunca ve o CSV pela metade
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    df.to_csv( tmp_path, index=False )
+    os.replace( tmp_path, path )
+
+# ==================================== ::
+
+def append_batch( batch_path, path=DATASET_PATH ):
+    """
+        Acrescenta um lote ao dataset como particoes de data.
+
+        1. valida o schema e separa as linhas por dia
+        2. grava cada dia em order_date=AAAA-MM-DD/<hash do lote>.csv
+        3. limpa so essas linhas ( build_frame ) e deixa o cache Arrow
+           pronto; um lote que nao passa na limpeza nao chega ao manifesto
+        4. grava so as linhas novas no fim do store do frame combinado
+           ( extend_combined ), que os processos do dashboard so mapeiam
+        5. troca o manifesto ( os.replace ), o que publica a versao nova,
+           e apaga do store as versoes anteriores
+
+        O hash do CSV base fica no manifesto ( base_hash ): o custo do
+        append acompanha o lote, nao o historico ( salvo o primeiro lote
+        e lotes com dias antigos, que regravam o store ).
+
+        Output:
+            - particoes acrescentadas ( vazio se o lote ja foi acrescentado )
+    """
+    batch = file_hash( batch_path )
+    partitions = read_manifest( path )
+    if any( partition['batch'] == batch for partition in partitions ):
+        return []
+
+    new = []
+    for day, rows in split_by_date( read_batch( batch_path ) ):
+        file = f'order_date={day:%Y-%m-%d}/{batch[:16]}.csv'
+        target = os.path.join( partitions_dir( path ), file )
+        os.makedirs( os.path.dirname( target ), exist_ok=True )
+        _write_csv( rows, target )
+
+        digest = file_hash( target )
+        build_frame( target, digest )
+        new.append( { 'file': file, 'hash': digest, 'batch': batch } )
+
+    if new:
+        digest = base_hash( path )
+        extend_combined( path, digest, partitions, new )
+        write_manifest( path, partitions + new, digest )
+        remove_combined( path, digest, partitions + new )
+
+    return new
+
+# ==================================== ::
+
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( 'batches', nargs='+', help='CSVs com pedidos novos' )
+    parser.add_argument( '--dataset', default=DATASET_PATH )
+    args = parser.parse_args( argv )
+
+    for batch_path in args.batches:
+        partitions = append_batch( batch_path, args.dataset )
+        if not partitions:
+            print( f'{batch_path}: lote ja acrescentado' )
+        for partition in partitions:
+            print( f'{batch_path} -> {partition["file"]}' )
+
+
+if __name__ == '__main__':
+    main()
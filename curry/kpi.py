@@ -0,0 +1,151 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from curry.cube import MEASURES, rollup
+
+# KPI -> ( coluna, agregacao ) resolvidos em um unico df1.agg
+COLUMN_KPIS = { 'avg_distance': ( 'distance_km', 'mean' ),
+                'max_age': ( 'Delivery_person_Age', 'max' ),
+                'min_age': ( 'Delivery_person_Age', 'min' ),
+                'best_vehicle_condition': ( 'Vehicle_condition', 'max' ),
+                'worst_vehicle_condition': ( 'Vehicle_condition', 'min' ) }
+
+# KPI -> ( Festival, estatistica ) resolvidos em um unico groupby('Festival')
+FESTIVAL_KPIS = { 'festival_avg_time': ( 'Yes', 'time_mean' ),
+                  'festival_std_time': ( 'Yes', 'time_std' ),
+                  'no_festival_avg_time': ( 'No', 'time_mean' ),
+                  'no_festival_std_time': ( 'No', 'time_std' ) }
+
+COURIER_KPIS = { 'unique_couriers' }
+
+KPIS = set( COLUMN_KPIS ) | set( FESTIVAL_KPIS ) | COURIER_KPIS
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+@dataclass( frozen=True )
+class KpiResult:
+    """
+        Valores dos cards de metricas. KPIs nao pedidos ficam None;
+        medias e desvios ja vem arredondados em 2 casas.
+    """
+    unique_couriers: Optional[int] = None
+    avg_distance: Optional[float] = None
+    festival_avg_time: Optional[float] = None
+    festival_std_time: Optional[float] = None
+    no_festival_avg_time: Optional[float] = None
+    no_festival_std_time: Optional[float] = None
+    max_age: Optional[int] = None
+    min_age: Optional[int] = None
+    best_vehicle_condition: Optional[int] = None
+    worst_vehicle_condition: Optional[int] = None
+
+# ==================================== ::
+
+def _festival_time( df1, cube1 ):
+    """ Media e desvio do tempo de entrega por Festival, do cubo quando disponivel. """
+    if cube1 is not None:
+        return rollup( cube1, 'Festival', ['time'] )
+
+    df_aux = df1.groupby( 'Festival', observed=True )['Time_taken(min)'].agg( ['mean', 'std'] )
+    df_aux.columns = ['time_mean', 'time_std']
+
+    return df_aux
+
+# ==================================== ::
+
+def _as_number( value, digits=2 ):
+    """ Converte o resultado do pandas para int / float arredondado ( None se vazio ). """
+    if value is None or pd.isna( value ):
+        return None
+    if digits is None:
+        return int( value )
+
+    return round( float( value ), digits )
+
+# ==================================== ::
+
+def compute_kpis( df1, metrics, cube1=None ):
+    """
+        Calcula de uma vez todos os KPIs pedidos sobre o dataset filtrado.
+
+        Cada grupo de KPIs compartilha uma unica agregacao:
+            - COLUMN_KPIS: um df1.agg com todas as colunas/funcoes pedidas
+            - FESTIVAL_KPIS: um groupby('Festival') ( ou rollup do cubo )
+            - unique_couriers: um nunique de Delivery_person_ID
+
+        Input:
+            - df1: dataset filtrado ( data limite + transito )
+            - metrics: nomes de KPIs ( ver KPIS )
+            - cube1: cubo com os mesmos filtros ( curry.cube ), opcional
+        Output:
+            - KpiResult
+    """
+    metrics = set( metrics )
+    unknown = metrics - KPIS
+    if unknown:
+        raise ValueError( f'KPIs desconhecidos: {sorted( unknown )}' )
+
+    values = {}
+
+    column_kpis = { m: COLUMN_KPIS[m] for m in metrics if m in COLUMN_KPIS }
+    if column_kpis:
+        funcs = {}
+        for col, func in column_kpis.values():
+            funcs.setdefault( col, set() ).add( func )
+        stats = df1.agg( { col: sorted( f ) for col, f in funcs.items() } )
+
+        for m, ( col, func ) in column_kpis.items():
+            digits = 2 if func == 'mean' else None
+            values[m] = _as_number( stats.loc[func, col], digits )
+
+    festival_kpis = { m: FESTIVAL_KPIS[m] for m in metrics if m in FESTIVAL_KPIS }
+    if festival_kpis:
+        df_aux = _festival_time( df1, cube1 )
+        for m, ( festival, stat ) in festival_kpis.items():
+            values[m] = _as_number( df_aux[stat].get( festival ) )
+
+    if 'unique_couriers' in metrics:
+        values['unique_couriers'] = int( df1['Delivery_person_ID'].nunique() )
+
+    return KpiResult( **values )
+
+# ==================================== ::
+
+def index_kpis( date_index, metrics, date_limit=None, traffic=None ):
+    """
+        COLUMN_KPIS dos acumulados por dia ( curry.timeline.DateIndex ),
+        sem ler as linhas: medias saem de soma / contagem e minimos e
+        maximos do acumulado ate date_limit.
+
+        Input:
+            - date_index: DateIndex do dataset inteiro
+            - metrics: nomes de KPIs; so os de COLUMN_KPIS sao calculados
+            - date_limit, traffic: filtros da barra lateral
+        Output:
+            - dict { KPI: valor }, no formato de compute_kpis
+    """
+    column_kpis = { m: COLUMN_KPIS[m] for m in metrics if m in COLUMN_KPIS }
+    if not column_kpis:
+        return {}
+
+    measures = { col: name for name, col in MEASURES.items() }
+    totals = date_index.totals( date_limit, traffic, sorted( { measures[col] for col, func in column_kpis.values()
+                                                                if func == 'mean' } ) )
+    extremes = date_index.extremes( date_limit, traffic )
+
+    values = {}
+    for m, ( col, func ) in column_kpis.items():
+        if func == 'mean':
+            values[m] = _as_number( totals[f'{measures[col]}_mean'] )
+        else:
+            values[m] = _as_number( extremes[( col, func )], None )
+
+    return values
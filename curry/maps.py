@@ -0,0 +1,135 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import numpy as np
+import pandas as pd
+
+from curry.cache import LruCache
+
+# o folium ( ~0.5 s para importar ) so e carregado quando um mapa e
+# montado de fato: um HTML ja em cache nem chega a importa-lo
+
+# maximo de pontos enviados ao navegador no modo densidade
+MAX_POINTS = 2000
+
+# orcamento ( MB ) do cache de mapas ja serializados em HTML, por processo
+MAP_CACHE_MB = 32
+
+MAP_MODES = ['Medianas', 'Densidade']
+
+# colunas lidas do backend em cada modo
+MAP_COLUMNS = { 'Medianas': ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude'],
+                'Densidade': ['Delivery_location_latitude', 'Delivery_location_longitude'] }
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def density_grid( lat, lon, max_points=MAX_POINTS, cell_deg=0.005 ):
+    """
+        Agrupa pontos em uma grade regular de cell_deg graus, toda em
+        NumPy. Se sobrarem mais de max_points celulas nao vazias a
+        celula dobra de tamanho ate caber no orcamento.
+
+        Output:
+            - Dataframe com lat, lon ( centroide dos pontos da celula )
+              e count, no maximo max_points linhas
+    """
+    lat = np.asarray( lat, dtype=np.float64 )
+    lon = np.asarray( lon, dtype=np.float64 )
+    valid = np.isfinite( lat ) & np.isfinite( lon )
+    lat, lon = lat[valid], lon[valid]
+
+    if len( lat ) == 0:
+        return pd.DataFrame( { 'lat': [], 'lon': [], 'count': [] } )
+
+    while True:
+        iy = np.floor( lat / cell_deg ).astype( np.int64 )
+        ix = np.floor( lon / cell_deg ).astype( np.int64 )
+        iy -= iy.min()
+        ix -= ix.min()
+
+        cells, inverse = np.unique( iy * ( ix.max() + 1 ) + ix, return_inverse=True )
+        if len( cells ) <= max_points:
+            break
+        cell_deg *= 2
+
+    counts = np.bincount( inverse )
+
+    return pd.DataFrame( { 'lat': np.bincount( inverse, weights=lat ) / counts,
+                           'lon': np.bincount( inverse, weights=lon ) / counts,
+                           'count': counts } )
+
+# ==================================== ::
+
+def median_markers_map( df1 ):
+    """ Mapa original: um marcador na mediana de cada City x Road_traffic_density. """
+    cols = ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude']
+    df_aux = ( df1.loc[:, cols]
+                  .groupby( ['City', 'Road_traffic_density'], observed=True )
+                  .median()
+                  .reset_index() )
+
+    import folium
+
+    map = folium.Map()
+
+    for city, traffic, lat, lon in df_aux.itertuples( index=False ):
+        folium.Marker( [lat, lon], popup=f'{city} - {traffic}' ).add_to( map )
+
+    return map
+
+# ==================================== ::
+
+def density_map( df1, max_points=MAX_POINTS ):
+    """ Mapa de calor dos locais de entrega, com no maximo max_points celulas. """
+    import folium
+    from folium.plugins import HeatMap
+
+    grid = density_grid( df1['Delivery_location_latitude'], df1['Delivery_location_longitude'], max_points )
+
+    if len( grid ):
+        map = folium.Map( location=[grid['lat'].median(), grid['lon'].median()], zoom_start=5 )
+        HeatMap( grid.loc[:, ['lat', 'lon', 'count']].to_numpy().tolist(), radius=12 ).add_to( map )
+    else:
+        map = folium.Map()
+
+    return map
+
+# ==================================== ::
+
+def render_html( map ):
+    """ Serializa o mapa como o folium_static faz ( Map dentro de um Figure ). """
+    import folium
+
+    figure = folium.Figure().add_child( map )
+
+    return figure.render()
+
+# ==================================== ::
+
+_MAP_CACHE = LruCache( MAP_CACHE_MB * 1024 * 1024, len )
+
+# ==================================== ::
+
+def country_map_html( query, mode, filter_key ):
+    """
+        HTML do mapa da Visao Geografica.
+
+        Input:
+            - query: consulta com os filtros da pagina ( curry.backends ); so
+              as colunas do mapa sao lidas, e so quando o HTML nao esta em cache
+            - mode: 'Medianas' ( um marcador por cidade/transito ) ou
+                    'Densidade' ( mapa de calor com orcamento de pontos )
+            - filter_key: tupla hashable com tudo que define a consulta ( versao
+              do dataset, data limite, transito ); mesma chave -> mesmo HTML,
+              sem agregar nem serializar de novo
+    """
+    if mode not in MAP_MODES:
+        raise ValueError( f'modo de mapa desconhecido: {mode}' )
+
+    build = density_map if mode == 'Densidade' else median_markers_map
+
+    return _MAP_CACHE.get_or_build( ( mode, ) + tuple( filter_key ),
+                                    lambda: render_html( build( query.rows( MAP_COLUMNS[mode] ) ) ) )
@@ -0,0 +1,228 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import numpy as np
+import pandas as pd
+
+from curry.cube import rollup
+from curry.data import clean_code  # reexportado: limpeza + metricas sem Streamlit
+from curry.kpi import KPIS, compute_kpis
+from curry.parallel import aggregate
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+#
+# Agregacoes das paginas, sem Streamlit nem plotly: devolvem Dataframes
+# ( ou numeros ) e as paginas so desenham. Podem ser usadas por jobs,
+# pela CLI ( curry.cli ) e pelos benchmarks.
+
+def order_metric( cube1 ):
+    """ Pedidos por dia, somando as celulas do cubo filtrado. """
+    return rollup( cube1, 'Order_Date' ).rename( columns={'n': 'ID'} ).reset_index()
+
+# ==================================== ::
+
+def traffic_order_share( cube1 ):
+    """ Percentual de entregas por tipo de trafego. """
+    df_aux = ( rollup( cube1, 'Road_traffic_density' )
+                  .rename( columns={'n': 'ID'} )
+                  .reset_index() )
+
+    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN', :]
+    df_aux['entregas_perc'] = df_aux['ID'] / df_aux['ID'].sum()
+
+    return df_aux
+
+# ==================================== ::
+
+def traffic_order_city( cube1 ):
+    """ Entregas por City x Road_traffic_density. """
+    return ( rollup( cube1, ['City', 'Road_traffic_density'] )
+                .rename( columns={'n': 'ID'} )
+                .reset_index() )
+
+# ==================================== ::
+
+def week_start( week_key ):
+    """ Segunda-feira de cada semana ISO week_key ( AAAASS ). """
+    week_key = pd.Series( week_key, dtype='int64' )
+    iso = ( week_key // 100 ).astype( str ) + '-' + ( week_key % 100 ).astype( str ).str.zfill( 2 ) + '-1'
+
+    return pd.to_datetime( iso, format='%G-%V-%u' )
+
+# ==================================== ::
+
+def order_by_week( week_cells ):
+    """
+        Quantidade de pedidos por semana ISO, a partir das celulas semanais
+        ( TimeRollups.cells( 'week', ... ), curry.timeline ).
+
+        Output: week_key ( AAAASS ), week_start ( segunda-feira da semana,
+        eixo x dos graficos: continua na virada do ano ), week_of_year
+        ( numero da semana ISO, so como rotulo ) e ID
+    """
+    df_aux = rollup( week_cells, 'week_key' ).rename( columns={'n': 'ID'} ).reset_index()
+    df_aux.insert( 1, 'week_start', week_start( df_aux['week_key'] ) )
+    df_aux.insert( 2, 'week_of_year', df_aux['week_key'] % 100 )
+
+    return df_aux
+
+# ==================================== ::
+
+def order_by_month( month_cells ):
+    """ Quantidade de pedidos por mes ( month_key AAAAMM ), das celulas mensais. """
+    return rollup( month_cells, 'month_key' ).rename( columns={'n': 'ID'} ).reset_index()
+
+# ==================================== ::
+
+def couriers_by_week( df1 ):
+    """ Numero unico de entregadores por semana ISO ( week_key ), das linhas filtradas. """
+    return ( df1.groupby( 'week_key' )['Delivery_person_ID']
+                .nunique()
+                .reset_index() )
+
+# ==================================== ::
+
+def order_share_by_week( week_cells, couriers ):
+    """
+        Quantidade de pedidos por semana / numero unico de entregadores por semana.
+
+        Input:
+            - week_cells: celulas semanais ( pedidos, ver order_by_week )
+            - couriers: entregadores distintos por week_key ( couriers_by_week )
+    """
+    df_aux = pd.merge( order_by_week( week_cells ), couriers, how='inner', on='week_key' )
+    df_aux['order_by_deliver'] = df_aux['ID'] / df_aux['Delivery_person_ID']
+
+    return df_aux
+
+# ==================================== ::
+
+def rating_by_courier( df1 ):
+    """ Avaliacao media por entregador ( em paralelo para datasets grandes, curry.parallel ). """
+    df_aux = aggregate( df1, 'Delivery_person_ID', {'Delivery_person_Ratings': ['mean']} )
+    df_aux.columns = ['Delivery_person_Ratings']
+
+    return df_aux.reset_index()
+
+# ==================================== ::
+
+def rating_by( cube1, dim ):
+    """ Media e desvio da avaliacao por uma dimensao do cubo ( transito, clima, ... ). """
+    df_aux = rollup( cube1, dim, ['rating'] ).loc[:, ['rating_mean', 'rating_std']]
+    df_aux.columns = ['delivery_mean', 'delivery_std']
+
+    return df_aux
+
+# ==================================== ::
+
+def top_delivers( df1, k=10 ):
+    """
+        Esta função recebe um DF e retorna dois DFs com os top k
+        entregadores mais Rapidos e mais Lentos por Cidade.
+
+        Um unico groupby calcula o maior tempo de cada entregador e a
+        selecao por cidade fica em top_by_city.
+
+        Output: ( df_rapidos, df_lentos )
+    """
+    df2 = ( df1.loc[:, ['Delivery_person_ID', 'City', 'Time_taken(min)']]
+               .groupby( ['City', 'Delivery_person_ID'], sort=False, observed=True )
+               .max()
+               .reset_index() )
+
+    return top_by_city( df2, k )
+
+# ==================================== ::
+
+def top_by_city( df2, k=10 ):
+    """
+        Top k menores e maiores 'Time_taken(min)' de cada City em df2
+        ( uma linha por City x Delivery_person_ID ).
+
+        Em cada cidade os k menores e os k maiores tempos saem de uma
+        selecao parcial ( np.argpartition ), sem ordenar todos os
+        entregadores; empates ficam na ordem das linhas de df2. As
+        cidades vem dos proprios dados.
+
+        Output: ( df_rapidos, df_lentos )
+    """
+    times = df2['Time_taken(min)'].to_numpy()
+    city_codes, cities = pd.factorize( df2['City'], sort=True )
+
+    fastest, slowest = [], []
+    for code in range( len( cities ) ):
+        rows = np.flatnonzero( city_codes == code )
+        top = min( k, len( rows ) )
+        city_times = times[rows]
+
+        # k menores tempos: seleciona e so depois ordena os k escolhidos
+        part = np.argpartition( city_times, top - 1 )[:top]
+        fastest.append( rows[part[np.argsort( city_times[part], kind='stable' )]] )
+
+        part = np.argpartition( -city_times, top - 1 )[:top]
+        slowest.append( rows[part[np.argsort( -city_times[part], kind='stable' )]] )
+
+    df_fastest = df2.iloc[np.concatenate( fastest or [[]] ).astype( int )].reset_index( drop=True )
+    df_slowest = df2.iloc[np.concatenate( slowest or [[]] ).astype( int )].reset_index( drop=True )
+
+    return df_fastest, df_slowest
+
+# ==================================== ::
+
+def avg_std_time_delivery( cube1, festival, op ):
+    """
+        Esta funcao calcula o tempo médio e o desvio padrão
+        do tempo de entrega, a partir do cubo filtrado.
+        Parametros:
+             Input:
+                 - cube1: cubo com os filtros da pagina ( curry.cube )
+                 - festival: Se está ou não dentro do festival
+                     'Yes': Esta no festival
+                     'No': Não esta no festival
+                 - op: Tipo de operação que precisa ser calculado
+                      'avg_time': Calcula o tempo médio
+                      'std_time': Calcula o desvio padrão do tempo.
+              Output:
+                  - float arredondado em 2 casas ( None se nao houver entregas )
+    """
+    kpi = ( 'no_festival_' if festival == 'No' else 'festival_' ) + op
+    if festival not in ( 'Yes', 'No' ) or kpi not in KPIS:
+        raise ValueError( f'combinacao desconhecida: festival={festival!r}, op={op!r}' )
+
+    return getattr( compute_kpis( None, [kpi], cube1 ), kpi )
+
+# ==================================== ::
+
+def avg_std_time( cube1, by ):
+    """ Media e desvio do tempo de entrega por uma ou mais dimensoes do cubo. """
+    df_aux = rollup( cube1, by, ['time'] ).loc[:, ['time_mean', 'time_std']]
+    df_aux.columns = ['avg_time', 'std_time']
+
+    return df_aux.reset_index()
+
+# ==================================== ::
+
+def time_quantiles( sketches, cells=slice( None ) ):
+    """
+        p50, p90 e p99 do tempo de entrega por City x Road_traffic_density
+        x Festival, combinando os sketches das celulas ( curry.quantiles ).
+    """
+    return sketches.quantiles( cells, ['City', 'Road_traffic_density', 'Festival'] )
+
+# ==================================== ::
+
+def distance( cube1, by=None ):
+    """
+        Distancia media de entrega ( 'distance_km', calculada na carga ).
+
+        Output:
+            - by=None: float arredondado em 2 casas
+            - by='City' ( ou lista de dimensoes ): Dataframe com distance_mean
+    """
+    if by is None:
+        return np.round( rollup( cube1, None, ['distance'] )['distance_mean'].iloc[0], 2 )
+
+    return rollup( cube1, by, ['distance'] ).loc[:, ['distance_mean']].reset_index()
@@ -0,0 +1,246 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# estatisticas parciais: cada particao calcula as suas e o merge e exato
+STATS = ( 'count', 'sum', 'sumsq', 'min', 'max' )
+
+# como combinar cada estatistica parcial entre particoes
+MERGE = { 'count': 'sum', 'sum': 'sum', 'sumsq': 'sum', 'min': 'min', 'max': 'max' }
+
+# estatistica final -> parciais necessarias
+FINAL_STATS = { 'count': ( 'count', ),
+                'sum': ( 'sum', ),
+                'mean': ( 'count', 'sum' ),
+                'var': ( 'count', 'sum', 'sumsq' ),
+                'std': ( 'count', 'sum', 'sumsq' ),
+                'min': ( 'min', ),
+                'max': ( 'max', ) }
+
+# abaixo disso o custo do pool ( serializar as particoes ) domina: roda no processo
+MIN_PARALLEL_ROWS = int( os.environ.get( 'CURRY_PARALLEL_MIN_ROWS', 500_000 ) )
+
+# processos do pool; 1 desliga o paralelismo
+MAX_WORKERS = int( os.environ.get( 'CURRY_WORKERS', os.cpu_count() or 1 ) )
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def _as_list( by ):
+    return [by] if isinstance( by, str ) else list( by )
+
+# ==================================== ::
+
+def _summable( x ):
+    # inteiros somam em int64 ( exato, sem estouro em int8/int16 ); o resto em float64
+    return x.astype( np.int64 ) if pd.api.types.is_integer_dtype( x ) else x.astype( float )
+
+# ==================================== ::
+
+def partial_aggregate( df1, by, columns, stats=STATS ):
+    """
+        Estatisticas parciais de columns por grupo de by em um unico groupby.
+
+        Output:
+            - Dataframe indexado por by, colunas ( coluna, estatistica ),
+              estatisticas em STATS; ordem dos grupos nao garantida
+    """
+    by = _as_list( by )
+    values = df1.loc[:, by]
+    spec = {}
+
+    for i, col in enumerate( columns ):
+        if 'count' in stats or 'min' in stats or 'max' in stats:
+            values[f'v{i}'] = df1[col]
+        if 'sum' in stats or 'sumsq' in stats:
+            x = _summable( df1[col] )
+            values[f's{i}'] = x
+            if 'sumsq' in stats:
+                values[f'q{i}'] = x * x
+
+        for stat in stats:
+            source = { 'sum': f's{i}', 'sumsq': f'q{i}' }.get( stat, f'v{i}' )
+            spec[f'{i}:{stat}'] = ( source, MERGE[stat] if stat == 'sumsq' else stat )
+
+    df_aux = values.groupby( by, sort=False, observed=True ).agg( **spec )
+    df_aux.columns = pd.MultiIndex.from_tuples( [( columns[int( key.split( ':' )[0] )], key.split( ':' )[1] )
+                                                  for key in df_aux.columns] )
+
+    return df_aux
+
+# ==================================== ::
+
+def merge_partials( parts ):
+    """ Combina parciais de particoes diferentes; grupos ordenados como no groupby do pandas. """
+    df_aux = pd.concat( parts ) if len( parts ) > 1 else parts[0]
+
+    if len( parts ) > 1:
+        levels = list( range( df_aux.index.nlevels ) )
+        df_aux = df_aux.groupby( level=levels, sort=False, observed=True ).agg(
+            { col: MERGE[col[1]] for col in df_aux.columns } )
+
+    return df_aux.sort_index()
+
+# ==================================== ::
+
+def finalize( partials, aggs ):
+    """
+        Estatisticas finais a partir das parciais ja combinadas.
+
+        Input:
+            - partials: saida de merge_partials
+            - aggs: { coluna: [estatisticas] }, estatisticas em FINAL_STATS
+        Output:
+            - mesmo formato de df1.groupby( by ).agg( aggs ): colunas
+              ( coluna, estatistica ), var/std com ddof=1
+    """
+    out = {}
+    for col, stats in aggs.items():
+        for stat in stats:
+            if stat in ( 'count', 'sum', 'min', 'max' ):
+                out[( col, stat )] = partials[( col, stat )]
+                continue
+
+            n = partials[( col, 'count' )]
+            total = partials[( col, 'sum' )]
+            if stat == 'mean':
+                out[( col, stat )] = total / n.where( n > 0 )
+                continue
+
+            sumsq = partials[( col, 'sumsq' )]
+            if pd.api.types.is_integer_dtype( total ):
+                # somas inteiras exatas: numerador em inteiros do Python, sem estouro nem cancelamento
+                num = ( n.astype( object ) * sumsq.astype( object ) - total.astype( object ) ** 2 ).astype( float )
+                var = num / ( n * ( n - 1 ) ).where( n > 1 )
+            else:
+                var = ( ( sumsq - total * total / n ) / ( n - 1 ).where( n > 1 ) ).clip( lower=0 )
+
+            out[( col, stat )] = var if stat == 'var' else np.sqrt( var )
+
+    return pd.DataFrame( out, index=partials.index )
+
+# ==================================== ::
+
+def split( df1, n_parts, partition='date' ):
+    """
+        Divide df1 em ate n_parts particoes.
+
+            - 'date': fatias contiguas com corte na troca de dia; com o
+              frame ordenado por Order_Date ( load_data ) cada dia fica
+              em uma unica particao
+            - 'city': uma particao por City
+
+        Qualquer divisao das linhas da o mesmo resultado depois do merge;
+        a escolha so muda o equilibrio entre as particoes.
+    """
+    if partition == 'city':
+        codes, _ = pd.factorize( df1['City'] )
+        return [df1.take( np.flatnonzero( codes == code ) ) for code in range( codes.max() + 1 )]
+
+    if partition != 'date':
+        raise ValueError( f'particionamento desconhecido: {partition}' )
+
+    dates = df1['Order_Date'].to_numpy()
+    cuts = np.linspace( 0, len( df1 ), n_parts + 1 ).astype( int )[1:-1]
+    if len( dates ) and ( dates[1:] >= dates[:-1] ).all():
+        cuts = np.searchsorted( dates, dates[cuts], side='left' )
+    bounds = np.unique( np.concatenate( [[0], cuts, [len( df1 )]] ) )
+
+    return [df1.iloc[start:end] for start, end in zip( bounds[:-1], bounds[1:] )]
+
+# ==================================== ::
+
+class AggregationExecutor:
+    """
+        Agregacoes por grupo em paralelo: o dataset e dividido em
+        particoes ( split ), cada processo do pool calcula as parciais
+        ( partial_aggregate ) e o resultado e combinado ( merge_partials ).
+
+        count, min, max e somas de inteiros saem identicos ao groupby do
+        pandas; somas de floats, media, variancia e desvio diferem no
+        maximo no arredondamento ( a ordem das somas muda entre particoes ).
+
+        Entradas com menos de min_rows linhas ( ou max_workers=1 ) rodam
+        no proprio processo direto no groupby do pandas: parciais e merge
+        so existem para o pool, no processo so custariam. O pool e criado na
+        primeira agregacao grande e reaproveitado; usa 'spawn' porque o
+        servidor do Streamlit tem varias threads ( fork nao e seguro ).
+    """
+
+    def __init__( self, max_workers=MAX_WORKERS, min_rows=MIN_PARALLEL_ROWS ):
+        self.max_workers = max( 1, max_workers )
+        self.min_rows = min_rows
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool( self ):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor( self.max_workers, mp_context=multiprocessing.get_context( 'spawn' ) )
+            return self._pool
+
+    def _in_process( self, df1 ):
+        return len( df1 ) < self.min_rows or self.max_workers == 1
+
+    def partials( self, df1, by, columns, stats=STATS, partition='date' ):
+        """ Parciais combinadas de todas as particoes ( ver partial_aggregate ). """
+        by = _as_list( by )
+
+        if self._in_process( df1 ):
+            if 'sumsq' in stats:
+                return partial_aggregate( df1, by, columns, stats ).sort_index()
+            # sem soma dos quadrados as parciais sao um groupby comum
+            values = df1.loc[:, by + list( columns )].astype( { col: np.int64 for col in columns
+                                                                 if pd.api.types.is_integer_dtype( df1[col] ) } )
+            return values.groupby( by, sort=True, observed=True ).agg( list( stats ) )
+
+        # so as colunas usadas sao serializadas para os processos
+        needed = list( dict.fromkeys( by + list( columns ) + ( ['Order_Date'] if partition == 'date' else ['City'] ) ) )
+        parts = split( df1.loc[:, needed], self.max_workers, partition )
+        futures = [self._get_pool().submit( partial_aggregate, part, by, columns, stats ) for part in parts]
+
+        return merge_partials( [future.result() for future in futures] )
+
+    def aggregate( self, df1, by, aggs, partition='date' ):
+        """ Equivalente a df1.groupby( by ).agg( aggs ), em paralelo para entradas grandes. """
+        unknown = { stat for stats in aggs.values() for stat in stats } - set( FINAL_STATS )
+        if unknown:
+            raise ValueError( f'estatisticas sem merge exato: {sorted( unknown )}' )
+
+        if self._in_process( df1 ):
+            return df1.groupby( by, observed=True ).agg( aggs )
+
+        stats = [s for s in STATS if any( s in FINAL_STATS[f] for fs in aggs.values() for f in fs )]
+
+        return finalize( self.partials( df1, by, list( aggs ), stats, partition ), aggs )
+
+    def shutdown( self ):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+# ==================================== ::
+
+_EXECUTOR = AggregationExecutor()
+
+# ==================================== ::
+
+def aggregate( df1, by, aggs, partition='date' ):
+    """ AggregationExecutor.aggregate com o executor compartilhado do processo. """
+    return _EXECUTOR.aggregate( df1, by, aggs, partition )
+
+# ==================================== ::
+
+def partials( df1, by, columns, stats=STATS, partition='date' ):
+    """ AggregationExecutor.partials com o executor compartilhado do processo. """
+    return _EXECUTOR.partials( df1, by, columns, stats, partition )
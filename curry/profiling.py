@@ -0,0 +1,117 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger( 'curry.stages' )
+
+# CURRY_STAGE_LOG=1 manda as linhas JSON para o stderr sem precisar
+# configurar o logging da aplicacao
+if os.environ.get( 'CURRY_STAGE_LOG' ) and not logger.handlers:
+    _handler = logging.StreamHandler( sys.stderr )
+    _handler.setFormatter( logging.Formatter( '%(message)s' ) )
+    logger.addHandler( _handler )
+    logger.setLevel( logging.INFO )
+
+# etapas medindo memoria agora, em todas as sessoes do processo: o
+# tracemalloc fica ligado so enquanto houver alguma
+_TRACE_LOCK = threading.Lock()
+_TRACE_STAGES = 0
+_TRACE_OWNED = False
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def _start_tracing():
+    global _TRACE_STAGES, _TRACE_OWNED
+    with _TRACE_LOCK:
+        if _TRACE_STAGES == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _TRACE_OWNED = True
+        _TRACE_STAGES += 1
+
+# ==================================== ::
+
+def _stop_tracing():
+    # so desliga o que foi ligado aqui ( quem ja rodava com tracemalloc continua )
+    global _TRACE_STAGES, _TRACE_OWNED
+    with _TRACE_LOCK:
+        _TRACE_STAGES -= 1
+        if _TRACE_STAGES == 0 and _TRACE_OWNED:
+            tracemalloc.stop()
+            _TRACE_OWNED = False
+
+# ==================================== ::
+
+class StageTimer:
+    """
+        Mede cada etapa nomeada de uma execucao da pagina.
+
+        O tempo de parede e sempre medido ( custo de um perf_counter ).
+        O pico de alocacao so e medido com trace_memory=True, via
+        tracemalloc, que tem custo alto e e global ao processo: com
+        varias sessoes simultaneas o pico de uma etapa inclui o que as
+        outras sessoes alocaram no mesmo intervalo. O tracemalloc so
+        fica ligado dentro das etapas ( contagem global das etapas
+        abertas ): uma execucao interrompida ( rerun, st.stop, erro ) sai
+        pelo finally da etapa e nao deixa o processo inteiro rastreado.
+
+        Uso:
+            timer = StageTimer( 'Visao Empresa', trace_memory=debug )
+            with timer.stage( 'load_data' ):
+                df1 = load_data()
+            ...
+            timer.finish()   # uma linha JSON por etapa no logger curry.stages
+    """
+
+    def __init__( self, page, trace_memory=False ):
+        self.page = page
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self.trace_memory = trace_memory
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage( self, name ):
+        if self.trace_memory:
+            _start_tracing()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = { 'stage': name, 'wall_ms': round( ( time.perf_counter() - start ) * 1000, 3 ) }
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                _stop_tracing()
+                record['peak_kb'] = round( max( peak - base, 0 ) / 1024, 1 )
+            self.records.append( record )
+
+    def finish( self ):
+        """ Emite as linhas JSON da execucao e devolve o resumo em um Dataframe. """
+        total_ms = round( ( time.perf_counter() - self._start ) * 1000, 3 )
+
+        for record in self.records:
+            logger.info( json.dumps( { 'event': 'stage', 'page': self.page, 'run_id': self.run_id, **record } ) )
+        logger.info( json.dumps( { 'event': 'run', 'page': self.page, 'run_id': self.run_id,
+                                   'stages': len( self.records ), 'wall_ms': total_ms } ) )
+
+        return self.frame()
+
+    def frame( self ):
+        """ Etapas registradas, na ordem de execucao. """
+        return pd.DataFrame( self.records, columns=['stage', 'wall_ms'] + ( ['peak_kb'] if self.trace_memory else [] ) )
@@ -0,0 +1,155 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from curry.data import DATASET_PATH, append_copy, load_derived
+
+# erro relativo maximo dos percentis ( define a largura dos buckets )
+QUANTILE_ERROR = float( os.environ.get( 'CURRY_QUANTILE_ERROR', 0.01 ) )
+
+# celula dos sketches: o dia entra para que os filtros da barra lateral
+# selecionem celulas como no cubo ( curry.cube.cube_cells )
+QUANTILE_DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density', 'Festival']
+
+# percentis das paginas
+QUANTILES = { 'p50': 0.50, 'p90': 0.90, 'p99': 0.99 }
+
+# menor valor com bucket proprio; tempos <= 0 caem todos nele
+MIN_VALUE = 1e-9
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def bucket_keys( values, gamma ):
+    """ Bucket de cada valor: k com gamma**( k - 1 ) < x <= gamma**k. """
+    x = np.maximum( np.asarray( values, dtype=np.float64 ), MIN_VALUE )
+
+    return np.ceil( np.log( x ) / math.log( gamma ) ).astype( np.int32 )
+
+# ==================================== ::
+
+def histogram_quantiles( counts, keys, gamma, quantiles=QUANTILES ):
+    """
+        Percentis de cada linha de um histograma de buckets.
+
+        Para cada q devolve o bucket do valor de posicao floor( q * ( n - 1 ) )
+        ( numpy.percentile com method='lower' ), estimado pelo ponto do
+        bucket com erro relativo <= ( gamma - 1 ) / ( gamma + 1 ).
+
+        Input:
+            - counts: array ( linhas, buckets ) de contagens
+            - keys: bucket de cada coluna, em ordem crescente
+        Output:
+            - dict { nome: array com um valor por linha ( nan sem contagens ) }
+    """
+    if counts.shape[1] == 0:
+        return { name: np.full( len( counts ), np.nan ) for name in quantiles }
+
+    cum = counts.cumsum( axis=1 )
+    n = cum[:, -1]
+    values = 2 * np.power( gamma, keys.astype( np.float64 ) ) / ( gamma + 1 )
+
+    result = {}
+    for name, q in quantiles.items():
+        rank = np.floor( q * ( n - 1 ) )
+        column = ( cum > rank[:, None] ).argmax( axis=1 )
+        result[name] = np.where( n > 0, values[column], np.nan )
+
+    return result
+
+# ==================================== ::
+
+class QuantileSketches:
+    """
+        Percentis de uma medida por celula das dimensions, em sketches de
+        buckets logaritmicos ( estilo DDSketch ): cada celula guarda
+        quantos valores caem em cada bucket ( gamma**( k - 1 ), gamma**k ].
+
+        Com gamma = ( 1 + error ) / ( 1 - error ) qualquer percentil sai com
+        erro relativo <= error. Os sketches se combinam somando os buckets,
+        entao os percentis de qualquer recorte ( data limite, transito,
+        cidade, Festival ) saem das celulas, sem ordenar as linhas.
+
+        Atributos:
+            - cells: Dataframe com as dimensions de cada celula, em ordem
+            - counts: array ( celulas, buckets ) int64
+            - keys: bucket de cada coluna de counts, crescente
+    """
+
+    def __init__( self, df1=None, dimensions=QUANTILE_DIMENSIONS, column='Time_taken(min)',
+                  error=QUANTILE_ERROR, weights=None ):
+        self.dimensions = list( dimensions )
+        self.column = column
+        self.error = error
+        self.gamma = ( 1 + error ) / ( 1 - error )
+        self._table = None
+
+        if df1 is not None:
+            self.append( df1, weights )
+
+    def append( self, df1, weights=None ):
+        """
+            Soma as linhas de df1 nos sketches ( celulas novas ou ja existentes ).
+            weights: coluna com o numero de linhas que cada linha de df1 representa
+            ( contagens por valor, ex.: GROUP BY do SQLite ).
+        """
+        values = df1.loc[:, self.dimensions]
+        values['bucket'] = bucket_keys( df1[self.column].to_numpy( dtype=np.float64 ), self.gamma )
+        values['n'] = 1 if weights is None else df1[weights].to_numpy()
+        values = values.loc[df1[self.column].notna().to_numpy()]
+
+        table = ( values.groupby( self.dimensions + ['bucket'], sort=True, observed=True )['n']
+                        .sum()
+                        .unstack( 'bucket', fill_value=0 ) )
+
+        if self._table is not None:
+            # mesmas celulas em dois lotes: soma os buckets
+            table = ( pd.concat( [self._table, table] )
+                        .fillna( 0 )
+                        .groupby( level=self.dimensions, sort=True, observed=True )
+                        .sum() )
+
+        self._table = table.sort_index( axis=1 ).astype( np.int64 )
+        self.cells = self._table.index.to_frame( index=False )
+        self.counts = self._table.to_numpy()
+        self.keys = self._table.columns.to_numpy( dtype=np.int32 )
+
+        return self
+
+    def quantiles( self, cells=slice( None ), by=None, quantiles=QUANTILES ):
+        """
+            Percentis das celulas selecionadas, por uma ou mais dimensions.
+
+            Input:
+                - cells: fatia ou posicoes das celulas ( curry.cube.cube_cells )
+                - by: dimensao ou lista de dimensoes; None = um percentil do recorte todo
+            Output:
+                - Dataframe com by, n e uma coluna por percentil
+        """
+        counts = pd.DataFrame( self.counts[cells], columns=self.keys )
+        if by is None:
+            counts = counts.sum().to_frame().T
+        else:
+            by = [by] if isinstance( by, str ) else list( by )
+            counts = counts.groupby( [self.cells[dim].iloc[cells].to_numpy() for dim in by], sort=True ).sum()
+            counts.index.names = by
+
+        df_aux = pd.DataFrame( histogram_quantiles( counts.to_numpy(), self.keys, self.gamma, quantiles ),
+                               index=counts.index )
+        df_aux.insert( 0, 'n', counts.to_numpy().sum( axis=1 ) )
+
+        return df_aux.reset_index( drop=by is None )
+
+# ==================================== ::
+
+def load_time_quantiles( path=DATASET_PATH, error=QUANTILE_ERROR ):
+    """ QuantileSketches de Time_taken(min) do dataset em cache, um por versao do dataset ( e erro ). """
+    return load_derived( f'time_quantiles:{error}', lambda df1: QuantileSketches( df1, error=error ), path,
+                         append_copy )
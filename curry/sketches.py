@@ -0,0 +1,252 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from curry.data import DATASET_PATH, TIME_KEYS, append_copy, load_derived, time_keys
+
+# contagem distinta de entregadores: 'hll' ( HyperLogLog ), 'exact' ( bitmaps
+# exatos, para validar os sketches ) ou 'auto' ( bitmaps enquanto cabem no
+# tamanho dos registradores HLL, depois HLL )
+DISTINCT_MODES = ( 'auto', 'hll', 'exact' )
+DISTINCT_MODE = os.environ.get( 'CURRY_DISTINCT', 'auto' )
+
+# erro padrao relativo maximo aceito no modo 'hll' ( define a precisao )
+DISTINCT_ERROR = float( os.environ.get( 'CURRY_DISTINCT_ERROR', 0.02 ) )
+
+# celula dos sketches: dia ( com a semana e o mes dele ) x City x transito;
+# a contagem de qualquer recorte e a uniao das celulas
+SKETCH_DIMENSIONS = list( TIME_KEYS.values() ) + ['City', 'Road_traffic_density']
+
+MIN_PRECISION, MAX_PRECISION = 4, 18
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def precision_for_error( error ):
+    """
+        Menor precisao p ( 2**p registradores ) com erro padrao
+        1.04 / sqrt( 2**p ) <= error.
+    """
+    p = math.ceil( math.log2( ( 1.04 / error ) ** 2 ) )
+
+    return min( max( p, MIN_PRECISION ), MAX_PRECISION )
+
+# ==================================== ::
+
+def hash_values( values ):
+    """ Hash de 64 bits estavel entre processos ( mesmo valor -> mesmo hash em qualquer lote ). """
+    return pd.util.hash_array( np.asarray( values, dtype=object ) )
+
+# ==================================== ::
+
+def _bit_length( x ):
+    # numero de bits de cada uint64, exato ( sem passar por float )
+    x = x.copy()
+    n = np.zeros( len( x ), dtype=np.uint8 )
+    for shift in ( 32, 16, 8, 4, 2, 1 ):
+        high = x >= ( np.uint64( 1 ) << np.uint64( shift ) )
+        n += high.astype( np.uint8 ) * shift
+        x = np.where( high, x >> np.uint64( shift ), x )
+
+    return n + ( x > 0 )
+
+# ==================================== ::
+
+def hll_update( registers, rows, hashes, p ):
+    """
+        Adiciona hashes aos registradores: registers[rows[i]] recebe hashes[i].
+
+        Os p bits altos escolhem o registrador e o valor e a posicao do
+        primeiro bit 1 nos bits restantes ( zeros a esquerda + 1 ).
+    """
+    width = 64 - p
+    index = ( hashes >> np.uint64( width ) ).astype( np.int64 )
+    rest = hashes & np.uint64( ( 1 << width ) - 1 )
+    rank = ( width + 1 - _bit_length( rest ) ).astype( np.uint8 )
+
+    # maior valor por registrador: ordena por ( registrador, valor ) e fica com o ultimo de cada um
+    flat = np.asarray( rows, dtype=np.int64 ) * registers.shape[1] + index
+    order = np.lexsort( ( rank, flat ) )
+    flat, rank = flat[order], rank[order]
+    last = np.append( flat[1:] != flat[:-1], True )
+
+    view = registers.reshape( -1 )
+    view[flat[last]] = np.maximum( view[flat[last]], rank[last] )
+
+# ==================================== ::
+
+def hll_estimate( registers ):
+    """
+        Estimativa de cardinalidade dos registradores ( ultimo eixo ),
+        com a correcao por contagem linear para cardinalidades pequenas.
+    """
+    m = registers.shape[-1]
+    alpha = { 16: 0.673, 32: 0.697, 64: 0.709 }.get( m, 0.7213 / ( 1 + 1.079 / m ) )
+
+    estimate = alpha * m * m / np.sum( np.ldexp( 1.0, -registers.astype( np.int64 ) ), axis=-1 )
+    zeros = np.count_nonzero( registers == 0, axis=-1 )
+    linear = m * np.log( m / np.maximum( zeros, 1 ) )
+
+    return np.where( ( estimate <= 2.5 * m ) & ( zeros > 0 ), linear, estimate )
+
+# ==================================== ::
+
+class CourierSketches:
+    """
+        Entregadores distintos por celula dia x City x Road_traffic_density,
+        em sketches que se combinam: a contagem de qualquer intervalo de
+        datas ou combinacao de filtros e a uniao das celulas selecionadas.
+
+            - 'hll': um HyperLogLog por celula ( 2**p registradores uint8,
+              p de precision_for_error ); uniao = maximo dos registradores,
+              erro padrao relativo ~ 1.04 / sqrt( 2**p )
+            - 'exact': um bitmap de entregadores por celula; uniao = OU,
+              contagem exata ( validacao dos sketches )
+            - 'auto': comeca em 'exact' e troca os bitmaps por HLL quando
+              os entregadores passam de 2**p ( o bitmap ficaria maior que
+              os registradores ). Com poucos entregadores, como no dataset
+              do painel, a contagem e exata e mais rapida que o HLL; o
+              erro so aparece quando a memoria passaria do HLL
+
+        append( df_novo ) soma linhas novas: celulas novas entram no fim e
+        celulas que ja existiam sao combinadas, sem reler o historico.
+
+        Atributos:
+            - mode: representacao atual, 'hll' ou 'exact'
+            - error: erro padrao relativo da representacao atual ( 0 no 'exact' )
+            - cells: Dataframe com SKETCH_DIMENSIONS de cada celula
+            - registers: array ( celulas, 2**p ) no modo 'hll' ou
+              ( celulas, entregadores ) bool no modo 'exact'
+    """
+
+    def __init__( self, df1=None, mode=DISTINCT_MODE, error=DISTINCT_ERROR ):
+        if mode not in DISTINCT_MODES:
+            raise ValueError( f'modo de contagem distinta desconhecido: {mode}' )
+
+        self.auto = mode == 'auto'
+        self.mode = 'exact' if self.auto else mode
+        self.precision = precision_for_error( error )
+        self.error = 1.04 / math.sqrt( 2 ** self.precision ) if self.mode == 'hll' else 0.0
+        self.couriers = pd.Index( [], dtype=object )  # so no modo 'exact'
+        self.cells = pd.DataFrame( { dim: [] for dim in SKETCH_DIMENSIONS } )
+        self.registers = np.zeros( ( 0, self._width() ), dtype=self._dtype() )
+
+        if df1 is not None:
+            self.append( df1 )
+
+    def _width( self ):
+        return 2 ** self.precision if self.mode == 'hll' else len( self.couriers )
+
+    def _dtype( self ):
+        return np.uint8 if self.mode == 'hll' else bool
+
+    def append( self, df1 ):
+        """ Combina as linhas de df1 ( SKETCH_DIMENSIONS + Delivery_person_ID ) nas celulas. """
+        if len( df1 ) == 0:
+            return self
+
+        # celula de cada linha e pares ( celula, entregador ) distintos
+        cell_codes, cells = pd.MultiIndex.from_frame( df1.loc[:, SKETCH_DIMENSIONS] ).factorize()
+        cells = cells.set_names( SKETCH_DIMENSIONS )
+        courier_codes, couriers = pd.factorize( df1['Delivery_person_ID'] )
+        pairs = np.unique( cell_codes.astype( np.int64 ) * len( couriers ) + courier_codes )
+        rows, courier_rows = pairs // len( couriers ), pairs % len( couriers )
+
+        if self.mode == 'exact':
+            self.couriers = self.couriers.append( pd.Index( couriers, dtype=object ).difference( self.couriers ) )
+            new = np.zeros( ( len( cells ), len( self.couriers ) ), dtype=bool )
+            new[rows, self.couriers.get_indexer( np.asarray( couriers, dtype=object ) )[courier_rows]] = True
+            old = np.zeros( ( len( self.registers ), len( self.couriers ) ), dtype=bool )
+            old[:, :self.registers.shape[1]] = self.registers
+        else:
+            new = np.zeros( ( len( cells ), self._width() ), dtype=np.uint8 )
+            hll_update( new, rows, hash_values( couriers )[courier_rows], self.precision )
+            old = self.registers
+
+        # celulas repetidas ( o mesmo dia em dois lotes ) sao combinadas pelo maximo / OU
+        all_cells = cells.to_frame( index=False )
+        if len( self.cells ):
+            all_cells = pd.concat( [self.cells, all_cells], ignore_index=True )
+        codes, unique_cells = pd.MultiIndex.from_frame( all_cells ).factorize()
+        unique_cells = unique_cells.set_names( SKETCH_DIMENSIONS )
+        # dentro de old e de new as celulas sao distintas: basta um maximo com o que ja existe
+        merged = np.zeros( ( len( unique_cells ), new.shape[1] ), dtype=new.dtype )
+        merged[codes[:len( old )]] = old
+        new_codes = codes[len( old ):]
+        merged[new_codes] = np.maximum( merged[new_codes], new )
+
+        self.cells = unique_cells.to_frame( index=False )
+        self.registers = merged
+
+        if self.auto and self.mode == 'exact' and len( self.couriers ) > 2 ** self.precision:
+            self._to_hll()
+
+        return self
+
+    def _to_hll( self ):
+        """ Troca os bitmaps pelos registradores HLL das mesmas celulas ( iguais aos do modo 'hll' ). """
+        registers = np.zeros( ( len( self.registers ), 2 ** self.precision ), dtype=np.uint8 )
+        rows, courier_rows = np.nonzero( self.registers )
+        hll_update( registers, rows, hash_values( self.couriers )[courier_rows], self.precision )
+
+        self.mode = 'hll'
+        self.error = 1.04 / math.sqrt( 2 ** self.precision )
+        self.couriers = pd.Index( [], dtype=object )
+        self.registers = registers
+
+    def select( self, date_limit=None, traffic=None ):
+        """ Mascara das celulas com Order_Date < date_limit e transito em traffic. """
+        mask = np.ones( len( self.cells ), dtype=bool )
+        if date_limit is not None:
+            # primeiro dia fora do filtro, como em TimeRollups.cells
+            stop = time_keys( [pd.Timestamp( date_limit ).ceil( 'D' )] )['day_key'][0]
+            mask &= self.cells['day_key'].to_numpy() < stop
+        if traffic is not None:
+            mask &= self.cells['Road_traffic_density'].isin( list( traffic ) ).to_numpy()
+
+        return mask
+
+    def _count( self, registers ):
+        if self.mode == 'exact':
+            return int( registers.any( axis=0 ).sum() )
+        if len( registers ) == 0:
+            return 0
+
+        return int( round( float( hll_estimate( registers.max( axis=0 ) ) ) ) )
+
+    def count( self, mask=None ):
+        """ Entregadores distintos na uniao das celulas em mask ( None = todas ). """
+        return self._count( self.registers if mask is None else self.registers[mask] )
+
+    def count_by( self, key, mask=None ):
+        """
+            Entregadores distintos por bucket de tempo.
+
+            Input:
+                - key: 'day_key', 'week_key' ou 'month_key' ( curry.data.TIME_KEYS )
+                - mask: celulas consideradas ( select ); None = todas
+            Output:
+                - Dataframe com key e Delivery_person_ID, em ordem de key
+        """
+        buckets = self.cells[key].to_numpy( dtype=np.int32 )
+        registers = self.registers
+        if mask is not None:
+            buckets, registers = buckets[mask], registers[mask]
+        values = np.unique( buckets )
+
+        return pd.DataFrame( { key: values,
+                               'Delivery_person_ID': [self._count( registers[buckets == b] ) for b in values] } )
+
+# ==================================== ::
+
+def load_courier_sketches( path=DATASET_PATH, mode=DISTINCT_MODE, error=DISTINCT_ERROR ):
+    """ CourierSketches do dataset em cache, construido uma vez por versao do dataset ( e modo / erro ). """
+    return load_derived( f'courier_sketches:{mode}:{error}',
+                         lambda df1: CourierSketches( df1, mode, error ), path, append_copy )
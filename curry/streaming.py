@@ -0,0 +1,435 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import dataclasses
+import os
+
+import numpy as np
+import pandas as pd
+
+from curry import metrics
+from curry.cube import DIMENSIONS, append_cube, cell_sums, cube_cells
+from curry.data import USE_COLUMNS, add_derived_columns, clean_code, partition_path, read_manifest
+from curry.kpi import COLUMN_KPIS, FESTIVAL_KPIS, KPIS, KpiResult, _as_number, compute_kpis
+from curry.quantiles import QUANTILE_ERROR, QuantileSketches
+from curry.sketches import DISTINCT_ERROR, DISTINCT_MODE, CourierSketches
+from curry.timeline import TimeRollups
+
+# linhas do CSV por pedaco: a memoria da ingestao e a de um pedaco mais os agregados
+CHUNK_ROWS = int( os.environ.get( 'CURRY_CHUNK_ROWS', 100_000 ) )
+
+# estatisticas online de cada coluna ( Welford / Chan ): contagem, media,
+# soma dos quadrados dos desvios ( m2 ), minimo e maximo
+ONLINE_STATS = ( 'count', 'mean', 'm2', 'min', 'max' )
+
+# celulas dos KPIs de coluna ( filtros da barra lateral ) e colunas resumidas
+KPI_DIMENSIONS = ['Order_Date', 'Road_traffic_density']
+KPI_COLUMNS = sorted( { col for col, _ in COLUMN_KPIS.values() } )
+
+# celulas por entregador: so o que a avaliacao media e os rankings usam. Sem a
+# data, o numero de celulas acompanha os entregadores, nao as linhas; a data
+# limite dessas tabelas e aplicada na leitura ( StreamAggregates.date_limit )
+COURIER_DIMENSIONS = ['Road_traffic_density', 'City', 'Delivery_person_ID']
+COURIER_COLUMNS = { 'Delivery_person_Ratings': ( 'count', 'mean' ), 'Time_taken(min)': ( 'max', ) }
+
+# bits da linha do CSV na posicao de ordem ( dia << ORDER_ROW_BITS ) + linha
+ORDER_ROW_BITS = 40
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+def read_clean_chunks( path, chunk_rows=CHUNK_ROWS ):
+    """
+        Le o CSV em pedacos de ate chunk_rows linhas e aplica as mesmas
+        regras de limpeza ( clean_code + add_derived_columns ) em cada um.
+
+        O indice de cada pedaco e o numero da linha no CSV, o que
+        preserva a ordem original entre pedacos.
+    """
+    for chunk in pd.read_csv( path, usecols=USE_COLUMNS, chunksize=chunk_rows ):
+        yield add_derived_columns( clean_code( chunk ) )
+
+# ==================================== ::
+
+def order_positions( df1 ):
+    """
+        Posicao de cada linha na ordem do dataset limpo ( Order_Date, linha
+        do CSV ) como um unico int64: o minimo de um grupo e a sua primeira
+        aparicao no frame de load_data.
+    """
+    days = df1['Order_Date'].to_numpy().astype( 'datetime64[D]' ).astype( np.int64 )
+
+    return ( days << ORDER_ROW_BITS ) + df1.index.to_numpy( dtype=np.int64 )
+
+# ==================================== ::
+
+def _stats( columns ):
+    # { coluna: estatisticas }; lista de colunas = todas as ONLINE_STATS
+    if isinstance( columns, dict ):
+        return { col: tuple( stats ) for col, stats in columns.items() }
+
+    return { col: ONLINE_STATS for col in columns }
+
+# ==================================== ::
+
+def online_partials( df1, by, columns ):
+    """
+        Estatisticas online de columns por grupo de by, em um groupby.
+
+        Input:
+            - columns: lista de colunas ( todas as ONLINE_STATS ) ou
+              { coluna: estatisticas }; mean pede count e m2 pede count e mean
+        Output:
+            - Dataframe indexado por by, colunas ( coluna, estatistica )
+    """
+    columns = _stats( columns )
+    funcs = {}
+    for col, stats in columns.items():
+        needed = set( stats ) | ( { 'count', 'mean' } if 'm2' in stats else set() ) | \
+                 ( { 'count' } if 'mean' in stats else set() )
+        funcs[col] = [{ 'm2': 'var' }.get( stat, stat ) for stat in ONLINE_STATS if stat in needed]
+
+    df_aux = df1.groupby( by, sort=False, observed=True ).agg( funcs )
+
+    for col, stats in columns.items():
+        if 'm2' in stats:
+            n = df_aux[( col, 'count' )]
+            df_aux[( col, 'var' )] = ( df_aux[( col, 'var' )] * ( n - 1 ) ).fillna( 0.0 )
+
+    return df_aux.rename( columns={ 'var': 'm2' }, level=1 )
+
+# ==================================== ::
+
+def merge_online( partials, by=None ):
+    """
+        Combina linhas de estatisticas online ( online_partials ) com as
+        mesmas chaves pela formula paralela de Chan ( Welford entre
+        grupos ): media ponderada pelas contagens e m2 somado com a
+        correcao n * ( media - media_total )**2, sem somas de quadrados
+        que perdem precisao em fluxos longos.
+
+        Input:
+            - partials: Dataframe de online_partials ( ou concat de varios )
+            - by: niveis do indice que definem o grupo; None junta tudo em uma linha
+        Output:
+            - Dataframe indexado por by, mesmas colunas, grupos ordenados
+    """
+    if by is None:
+        keys = [np.zeros( len( partials ), dtype=np.int8 )]
+    else:
+        by = [by] if isinstance( by, str ) else list( by )
+        keys = [partials.index.get_level_values( level ) for level in by]
+
+    # um unico agrupamento: codigo do grupo de cada linha e somas por bincount
+    grouped = partials.groupby( keys, sort=True, observed=True )
+    codes = grouped.ngroup().to_numpy()
+    index = grouped.size().index
+
+    out = {}
+    for col, stat in partials.columns:
+        if stat == 'count':
+            n = partials[( col, 'count' )].to_numpy( dtype=np.int64 )
+            out[( col, 'count' )] = np.bincount( codes, weights=n, minlength=len( index ) ).astype( np.int64 )
+
+        elif stat == 'mean':
+            mean = np.where( n > 0, partials[( col, 'mean' )].to_numpy( dtype=np.float64 ), 0.0 )
+            with np.errstate( invalid='ignore', divide='ignore' ):
+                new_mean = np.bincount( codes, weights=n * mean, minlength=len( index ) ) / out[( col, 'count' )]
+            out[( col, 'mean' )] = new_mean
+
+        elif stat == 'm2':
+            # m2 de cada parte mais a distancia da media da parte ate a media do grupo
+            m2 = np.where( n > 0, partials[( col, 'm2' )].to_numpy( dtype=np.float64 )
+                                  + n * ( mean - new_mean[codes] ) ** 2, 0.0 )
+            out[( col, 'm2' )] = np.bincount( codes, weights=m2, minlength=len( index ) )
+
+        else:
+            out[( col, stat )] = grouped[[( col, stat )]].agg( stat ).iloc[:, 0].to_numpy()
+
+    df_aux = pd.DataFrame( out, index=index )
+    df_aux.columns = pd.MultiIndex.from_tuples( df_aux.columns )
+    if by is None:
+        df_aux = df_aux.reset_index( drop=True )
+    else:
+        df_aux.index.names = by
+
+    return df_aux
+
+# ==================================== ::
+
+class OnlineStats:
+    """
+        Estatisticas online ( ONLINE_STATS, ou as pedidas em columns, ver
+        online_partials ) de columns por celula de dimensions: cada pedaco
+        e resumido em um groupby e combinado com o que ja foi visto
+        ( merge_online ), entao a memoria depende so do numero de celulas,
+        nao do numero de linhas.
+
+        Atributos:
+            - table: Dataframe indexado pelas dimensions ( ordenado ),
+              colunas ( coluna, estatistica )
+            - first: primeira aparicao de cada celula ( order_positions )
+            - cells: dimensions de cada celula ( para curry.cube.cube_cells )
+    """
+
+    def __init__( self, dimensions, columns ):
+        self.dimensions = list( dimensions )
+        self.columns = _stats( columns )
+        self.table = None
+        self.first = None
+        self.cells = pd.DataFrame( columns=self.dimensions )
+
+    def update( self, df1 ):
+        if len( df1 ) == 0:
+            return self
+
+        part = online_partials( df1, self.dimensions, self.columns )
+        part[( 'first', '' )] = pd.Series( order_positions( df1 ), index=df1.index ).groupby(
+            [df1[dim] for dim in self.dimensions], sort=False, observed=True ).min()
+
+        if self.table is not None:
+            # estado atual como mais um parcial: celulas repetidas sao combinadas por merge_online
+            state = self.table.assign( **{ 'first': self.first } )
+            state.columns = part.columns
+            part = pd.concat( [state, part] )
+
+        first = part.pop( ( 'first', '' ) )
+        self.table = merge_online( part, self.dimensions )
+        self.first = first.groupby( level=self.dimensions, observed=True ).min().reindex( self.table.index )
+        self.cells = self.table.index.to_frame( index=False )
+
+        return self
+
+    def summary( self, cells=slice( None ), by=None ):
+        """ Estatisticas das celulas selecionadas combinadas por by ( None = uma linha ). """
+        return merge_online( self.table.iloc[cells], by )
+
+# ==================================== ::
+
+def finalize_online( stats, aggs ):
+    """
+        Estatisticas finais ( mean, std, var, min, max, count ) no formato
+        de curry.parallel.finalize, a partir de merge_online.
+    """
+    out = {}
+    for col, names in aggs.items():
+        n = stats[( col, 'count' )]
+        for stat in names:
+            if stat in ( 'var', 'std' ):
+                var = stats[( col, 'm2' )] / ( n - 1 ).where( n > 1 )
+                out[( col, stat )] = var if stat == 'var' else np.sqrt( var )
+            else:
+                out[( col, stat )] = stats[( col, stat )]
+
+    return pd.DataFrame( out, index=stats.index )
+
+# ==================================== ::
+
+class StreamAggregates:
+    """
+        Agregados do dataset montados em um unico passe pelo CSV, pedaco
+        a pedaco ( read_clean_chunks ), sem nunca ter todas as linhas na
+        memoria:
+
+            - cube: somas do cubo ( curry.cube.cell_sums ) por DIMENSIONS
+            - kpis: OnlineStats das colunas dos KPIs por dia x transito
+            - couriers_stats: OnlineStats de avaliacao e tempo por
+              transito x City x entregador ( avaliacao media e rankings
+              de entregadores ), so com as linhas antes de date_limit
+            - rollups, couriers, quantiles: TimeRollups, CourierSketches e
+              QuantileSketches, todos por append
+
+        Os demais agregados sao indexados por celulas que incluem
+        Order_Date e Road_traffic_density, entao os filtros da barra
+        lateral continuam valendo ( StreamQuery ). As celulas por
+        entregador nao guardam a data ( seriam quase uma por linha ): a
+        data limite delas e escolhida na ingestao.
+    """
+
+    def __init__( self, distinct=DISTINCT_MODE, error=DISTINCT_ERROR, quantile_error=QUANTILE_ERROR, date_limit=None ):
+        self.rows = 0
+        self.date_limit = date_limit
+        self.cube = None
+        self.kpis = OnlineStats( KPI_DIMENSIONS, KPI_COLUMNS )
+        self.couriers_stats = OnlineStats( COURIER_DIMENSIONS, COURIER_COLUMNS )
+        self.rollups = TimeRollups()
+        self.couriers = CourierSketches( mode=distinct, error=error )
+        self.quantiles = QuantileSketches( error=quantile_error )
+
+    def update( self, df1 ):
+        """ Soma um pedaco ja limpo em todos os agregados. """
+        self.rows += len( df1 )
+        if len( df1 ) == 0:
+            return self
+
+        # celulas repetidas entre pedacos sao somadas; contagens continuam inteiras
+        part = cell_sums( df1, DIMENSIONS ) if self.cube is None else append_cube( self.cube, df1 )
+        # dimensoes categoricas, como no cubo de load_cube: os textos ficam uma vez so no dicionario
+        part = part.sort_values( DIMENSIONS, kind='stable' ).reset_index( drop=True )
+        self.cube = part.astype( { dim: 'category' for dim in DIMENSIONS if dim != 'Order_Date' } )
+
+        self.kpis.update( df1 )
+        if self.date_limit is None:
+            self.couriers_stats.update( df1 )
+        else:
+            self.couriers_stats.update( df1.loc[df1['Order_Date'] < self.date_limit] )
+        self.rollups.append( df1 )
+        self.couriers.append( df1 )
+        self.quantiles.append( df1 )
+
+        return self
+
+# ==================================== ::
+
+def stream_aggregates( path, chunk_rows=CHUNK_ROWS, **options ):
+    """
+        StreamAggregates do CSV em path e das particoes acrescentadas
+        ( curry.ingest ), lidos em pedacos de chunk_rows linhas ( options:
+        modo e erro dos sketches e date_limit das tabelas por entregador,
+        ver StreamAggregates ).
+    """
+    aggregates = StreamAggregates( **options )
+    start = 0
+    for csv_path in [path] + [partition_path( path, partition ) for partition in read_manifest( path )]:
+        # linhas das particoes continuam a numeracao do CSV, como em curry.data.append_rows
+        offset = start
+        for chunk in read_clean_chunks( csv_path, chunk_rows ):
+            chunk.index += offset
+            if len( chunk ):
+                start = int( chunk.index.max() ) + 1
+            aggregates.update( chunk )
+
+    return aggregates
+
+# ==================================== ::
+
+def _same_limit( a, b ):
+    if a is None or b is None:
+        return a is None and b is None
+
+    return pd.Timestamp( a ) == pd.Timestamp( b )
+
+# ==================================== ::
+
+class StreamQuery:
+    """
+        Filtros da barra lateral sobre os agregados da ingestao em pedacos:
+        mesma interface de consulta dos backends ( table, kpis ), com cada
+        tabela montada so das celulas que passam nos filtros.
+
+        Nao ha linhas guardadas: rows ( mapas ) nao e suportado.
+    """
+
+    def __init__( self, aggregates, date_limit=None, traffic=None ):
+        self.aggregates = aggregates
+        self.date_limit = date_limit
+        self.traffic = traffic
+        self.cube1 = aggregates.cube.iloc[cube_cells( aggregates.cube, date_limit, traffic )]
+        self._top = {}
+
+    def _cells( self, stats ):
+        return cube_cells( stats.cells, self.date_limit, self.traffic )
+
+    def _courier_cells( self ):
+        """ Celulas por entregador do filtro de transito; a data limite tem que ser a da ingestao. """
+        aggregates = self.aggregates
+        if not _same_limit( self.date_limit, aggregates.date_limit ):
+            raise ValueError( 'tabelas por entregador da ingestao em pedacos: use stream_aggregates( ..., '
+                              f'date_limit={self.date_limit!r} ) ( agregados com {aggregates.date_limit!r} )' )
+
+        return aggregates.couriers_stats, cube_cells( aggregates.couriers_stats.cells, None, self.traffic )
+
+    def _courier_rows( self ):
+        """ Uma linha por City x entregador, na ordem da primeira aparicao ( como o groupby das linhas ). """
+        stats, cells = self._courier_cells()
+        df_aux = pd.DataFrame( { 'City': stats.cells['City'].iloc[cells].to_numpy(),
+                                 'Delivery_person_ID': stats.cells['Delivery_person_ID'].iloc[cells].to_numpy(),
+                                 'first': stats.first.iloc[cells].to_numpy(),
+                                 'Time_taken(min)': stats.table[( 'Time_taken(min)', 'max' )].iloc[cells].to_numpy() } )
+
+        # o dataset limpo fica ordenado por ( Order_Date, linha do CSV ): a ordem de order_positions
+        df_aux = df_aux.sort_values( 'first', kind='stable' )
+
+        return ( df_aux.groupby( ['City', 'Delivery_person_ID'], sort=False )['Time_taken(min)']
+                       .max()
+                       .reset_index() )
+
+    def _top_delivers( self, k ):
+        if k not in self._top:
+            self._top[k] = metrics.top_by_city( self._courier_rows(), k )
+        return self._top[k]
+
+    def _rating_by_courier( self ):
+        stats, cells = self._courier_cells()
+        df_aux = stats.summary( cells, 'Delivery_person_ID' )
+        df_aux = finalize_online( df_aux, { 'Delivery_person_Ratings': ['mean'] } )
+        df_aux.columns = ['Delivery_person_Ratings']
+
+        return df_aux.reset_index()
+
+    def _couriers_by_week( self ):
+        sketches = self.aggregates.couriers
+        return sketches.count_by( 'week_key', sketches.select( self.date_limit, self.traffic ) )
+
+    def table( self, name, k=10 ):
+        aggregates = self.aggregates
+        quantiles = aggregates.quantiles
+        builders = {
+            'order_metric': lambda: metrics.order_metric( self.cube1 ),
+            'traffic_order_share': lambda: metrics.traffic_order_share( self.cube1 ),
+            'traffic_order_city': lambda: metrics.traffic_order_city( self.cube1 ),
+            'order_by_week': lambda: metrics.order_by_week( aggregates.rollups.cells( 'week', self.date_limit, self.traffic ) ),
+            'order_by_month': lambda: metrics.order_by_month( aggregates.rollups.cells( 'month', self.date_limit, self.traffic ) ),
+            'order_share_by_week': lambda: metrics.order_share_by_week(
+                aggregates.rollups.cells( 'week', self.date_limit, self.traffic ), self._couriers_by_week() ),
+            'rating_by_courier': self._rating_by_courier,
+            'rating_by_traffic': lambda: metrics.rating_by( self.cube1, 'Road_traffic_density' ).reset_index(),
+            'rating_by_weather': lambda: metrics.rating_by( self.cube1, 'Weatherconditions' ).reset_index(),
+            'top_fastest': lambda: self._top_delivers( k )[0],
+            'top_slowest': lambda: self._top_delivers( k )[1],
+            'time_by_city': lambda: metrics.avg_std_time( self.cube1, 'City' ),
+            'time_by_city_order': lambda: metrics.avg_std_time( self.cube1, ['City', 'Type_of_order'] ),
+            'time_by_city_traffic': lambda: metrics.avg_std_time( self.cube1, ['City', 'Road_traffic_density'] ),
+            'time_quantiles': lambda: metrics.time_quantiles( quantiles, cube_cells( quantiles.cells, self.date_limit,
+                                                                                     self.traffic ) ),
+            'distance_by_city': lambda: metrics.distance( self.cube1, 'City' ) }
+
+        if name not in builders:
+            raise ValueError( f'tabela desconhecida: {name}' )
+
+        return builders[name]()
+
+    def kpis( self, names ):
+        """ KPIs de coluna das estatisticas online, Festival pelo cubo e entregadores pelos sketches. """
+        names = set( names )
+        unknown = names - KPIS
+        if unknown:
+            raise ValueError( f'KPIs desconhecidos: {sorted( unknown )}' )
+
+        values = {}
+        column_kpis = { m: COLUMN_KPIS[m] for m in names if m in COLUMN_KPIS }
+        if column_kpis:
+            stats = self.aggregates.kpis
+            summary = stats.summary( self._cells( stats ) )
+            for m, ( col, func ) in column_kpis.items():
+                digits = 2 if func == 'mean' else None
+                value = summary[( col, func )].iloc[0] if len( summary ) else None
+                values[m] = _as_number( value, digits )
+
+        festival = names & set( FESTIVAL_KPIS )
+        if festival:
+            festival_kpis = compute_kpis( None, festival, self.cube1 )
+            values.update( { m: getattr( festival_kpis, m ) for m in festival } )
+
+        result = KpiResult( **values )
+        if 'unique_couriers' in names:
+            sketches = self.aggregates.couriers
+            result = dataclasses.replace( result, unique_couriers=sketches.count(
+                sketches.select( self.date_limit, self.traffic ) ) )
+
+        return result
+
+    def rows( self, columns ):
+        raise ValueError( 'a ingestao em pedacos guarda so agregados: linhas ( mapas ) precisam de outro backend' )
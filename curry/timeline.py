@@ -0,0 +1,295 @@
+# ================================================================
+# ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
+# ================================================================
+
+import numpy as np
+import pandas as pd
+
+from curry.cube import MEASURES, cell_sums
+from curry.data import DATASET_PATH, TIME_KEYS, append_copy, load_derived, time_keys
+from curry.kpi import COLUMN_KPIS
+
+# dimensao guardada junto com o tempo nos rollups ( filtro da barra lateral )
+ROLLUP_DIMENSIONS = ['Road_traffic_density']
+
+# colunas das linhas que TimeRollups.append le
+ROLLUP_COLUMNS = list( TIME_KEYS.values() ) + ROLLUP_DIMENSIONS + list( MEASURES.values() )
+
+# colunas com minimo / maximo acumulado no DateIndex ( KPIs de idade e veiculo )
+EXTREME_COLUMNS = sorted( { col for col, func in COLUMN_KPIS.values() if func in ( 'min', 'max' ) } )
+
+# ================================================================
+# ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
+# ================================================================
+
+class DateIndex:
+    """
+        Indice por dia do dataset limpo ( ordenado por Order_Date ).
+
+        Guarda, para cada dia, o deslocamento da primeira linha do dia
+        e somas acumuladas ( prefix sums ) de pedidos e de cada medida,
+        mais minimo e maximo acumulados de EXTREME_COLUMNS, separados por
+        Road_traffic_density. Assim "tudo ate a data X" sai de uma busca
+        binaria sobre os dias e uma soma / min / max entre os niveis de
+        transito, sem olhar as linhas ( KPIs de coluna, curry.kpi.index_kpis ).
+
+        Os acumulados sao montados dos totais por dia ( per_day ): um lote
+        novo ( append ) so agrega as linhas novas e junta os dias, mesmo
+        com pedidos atrasados de um dia antigo.
+
+        Atributos:
+            - days: datas distintas, em ordem
+            - offsets: posicao da primeira linha de cada dia ( + total no fim )
+            - traffic: niveis de transito, na ordem das colunas dos acumulados
+            - per_day: { 'n' | '<medida>_n' | '<medida>_sum' | ( coluna, 'min' | 'max' ): array ( dias, niveis ) }
+            - prefix: { 'n' | '<medida>_n' | '<medida>_sum': array ( dias + 1, niveis ) }
+            - lows / highs: { coluna: array ( dias + 1, niveis ) }, +inf / -inf sem linhas
+    """
+
+    def __init__( self, df1 ):
+        self.days, self.traffic, self.per_day = self._aggregate( df1 )
+        self._accumulate()
+
+    @staticmethod
+    def _aggregate( df1 ):
+        """ Dias, niveis de transito e totais por ( dia, transito ) das linhas de df1. """
+        days, day_codes = np.unique( df1['Order_Date'].to_numpy(), return_inverse=True )
+        traffic_codes, traffic = pd.factorize( df1['Road_traffic_density'], sort=True )
+        traffic = np.asarray( traffic, dtype=object )
+
+        # celula ( dia, transito ) achatada para um unico bincount
+        shape = ( len( days ), len( traffic ) )
+        cells = day_codes * len( traffic ) + traffic_codes
+
+        per_day = { 'n': np.bincount( cells, minlength=shape[0] * shape[1] ) }
+        for name, col in MEASURES.items():
+            x = df1[col].to_numpy( dtype=np.float64 )
+            valid = ~np.isnan( x )
+            per_day[f'{name}_n'] = np.bincount( cells, weights=valid, minlength=shape[0] * shape[1] )
+            per_day[f'{name}_sum'] = np.bincount( cells, weights=np.where( valid, x, 0.0 ), minlength=shape[0] * shape[1] )
+
+        for col in EXTREME_COLUMNS:
+            groups = pd.Series( df1[col].to_numpy( dtype=np.float64 ) ).groupby( cells )
+            for func, empty in ( ( 'min', np.inf ), ( 'max', -np.inf ) ):
+                per_cell = getattr( groups, func )().dropna()
+                values = np.full( shape[0] * shape[1], empty )
+                values[per_cell.index.to_numpy()] = per_cell.to_numpy()
+                per_day[( col, func )] = values
+
+        return days, traffic, { key: values.reshape( shape ) for key, values in per_day.items() }
+
+    def _accumulate( self ):
+        """ Deslocamentos e acumulados a partir de per_day. """
+        n_levels = len( self.traffic )
+        self.prefix = {}
+        for key, values in self.per_day.items():
+            if isinstance( key, str ):
+                zeros = np.zeros( ( 1, n_levels ), dtype=values.dtype )
+                self.prefix[key] = np.concatenate( [zeros, values.cumsum( axis=0 )] )
+
+        # linha 0 vazia: acumulado de "nenhum dia", como nas somas
+        self.lows, self.highs = {}, {}
+        for col in EXTREME_COLUMNS:
+            self.lows[col] = np.fmin.accumulate( np.concatenate( [np.full( ( 1, n_levels ), np.inf ),
+                                                                  self.per_day[( col, 'min' )]] ), axis=0 )
+            self.highs[col] = np.fmax.accumulate( np.concatenate( [np.full( ( 1, n_levels ), -np.inf ),
+                                                                   self.per_day[( col, 'max' )]] ), axis=0 )
+
+        # dataset ordenado por data: a primeira linha de cada dia e o total dos dias anteriores
+        self.offsets = self.prefix['n'].sum( axis=1 )
+
+    def append( self, df1 ):
+        """ Junta os totais por dia das linhas de df1 ( em qualquer ordem de data ) aos do indice. """
+        if len( df1 ) == 0:
+            return self
+
+        days, traffic, per_day = self._aggregate( df1 )
+        all_days = np.union1d( self.days, days )
+        all_traffic = np.array( sorted( set( self.traffic ) | set( traffic ) ), dtype=object )
+
+        # posicoes de cada parte nos dias e niveis unidos
+        parts = [( np.searchsorted( all_days, d ), np.searchsorted( all_traffic, t ), values )
+                 for d, t, values in ( ( self.days, self.traffic, self.per_day ), ( days, traffic, per_day ) )]
+
+        merged = {}
+        for key, values in self.per_day.items():
+            func = key[1] if isinstance( key, tuple ) else 'sum'
+            empty, combine = { 'sum': ( 0, np.add ), 'min': ( np.inf, np.fmin ), 'max': ( -np.inf, np.fmax ) }[func]
+            merged[key] = np.full( ( len( all_days ), len( all_traffic ) ), empty, dtype=values.dtype )
+            for rows, cols, part in parts:
+                target = np.ix_( rows, cols )
+                merged[key][target] = combine( merged[key][target], part[key] )
+
+        # atributos novos: uma copia rasa anterior ao append continua intacta ( append_copy )
+        self.days, self.traffic, self.per_day = all_days, all_traffic, merged
+        self._accumulate()
+
+        return self
+
+    def day_position( self, date_limit ):
+        """ Quantidade de dias com Order_Date < date_limit ( None = todos ). """
+        if date_limit is None:
+            return len( self.days )
+
+        return int( np.searchsorted( self.days, np.datetime64( pd.Timestamp( date_limit ) ), side='left' ) )
+
+    def _levels( self, traffic ):
+        if traffic is None:
+            return slice( None )
+
+        return np.flatnonzero( np.isin( self.traffic, list( traffic ) ) )
+
+    def row_position( self, date_limit ):
+        """ Quantidade de linhas com Order_Date < date_limit. """
+        return int( self.offsets[self.day_position( date_limit )] )
+
+    def totals( self, date_limit, traffic=None, measures=() ):
+        """
+            Totais de todos os pedidos com Order_Date < date_limit.
+
+            Input:
+                - date_limit: data limite ( exclusiva, como o slider )
+                - traffic: lista de Road_traffic_density; None considera todos
+                - measures: medidas ( chaves de MEASURES ) com media
+            Output:
+                - dict com 'n' e, para cada medida, '<medida>_sum' e '<medida>_mean'
+        """
+        position = self.day_position( date_limit )
+        levels = self._levels( traffic )
+
+        result = { 'n': int( self.prefix['n'][position, levels].sum() ) }
+        for m in measures:
+            n = self.prefix[f'{m}_n'][position, levels].sum()
+            total = self.prefix[f'{m}_sum'][position, levels].sum()
+            result[f'{m}_sum'] = total
+            result[f'{m}_mean'] = total / n if n else np.nan
+
+        return result
+
+    def extremes( self, date_limit, traffic=None ):
+        """
+            Minimo e maximo de EXTREME_COLUMNS nos pedidos com Order_Date < date_limit.
+
+            Output:
+                - dict { ( coluna, 'min' | 'max' ): valor }, nan sem pedidos
+        """
+        position = self.day_position( date_limit )
+        levels = self._levels( traffic )
+
+        result = {}
+        for col in EXTREME_COLUMNS:
+            low = self.lows[col][position, levels].min( initial=np.inf )
+            high = self.highs[col][position, levels].max( initial=-np.inf )
+            result[( col, 'min' )] = low if np.isfinite( low ) else np.nan
+            result[( col, 'max' )] = high if np.isfinite( high ) else np.nan
+
+        return result
+
+# ==================================== ::
+
+def load_date_index( path=DATASET_PATH ):
+    """ DateIndex do dataset em cache, construido uma vez por versao do dataset. """
+    return load_derived( 'date_index', DateIndex, path, append_copy )
+
+# ==================================== ::
+
+class TimeRollups:
+    """
+        Rollups por bucket de tempo x Road_traffic_density em tres
+        resolucoes: dia, semana ISO e mes ( chaves de TIME_KEYS ). Cada
+        bucket guarda as somas de curry.cube.cell_sums ( n e contagem,
+        soma e soma dos quadrados de cada medida ).
+
+        Como sao somas, os rollups crescem por append: so as linhas novas
+        sao agregadas e o resultado e somado nos buckets que ja existem
+        ( o dia, a semana e o mes correntes ) ou entra como bucket novo,
+        sem reagregar o historico.
+
+        Atributos:
+            - tables: { resolucao: Dataframe indexado por ( chave, transito ) }
+    """
+
+    def __init__( self, df1=None ):
+        self.tables = { resolution: None for resolution in TIME_KEYS }
+        if df1 is not None:
+            self.append( df1 )
+
+    def append( self, df1 ):
+        """ Soma as linhas de df1 ( ao menos ROLLUP_COLUMNS ) nos buckets. """
+        if len( df1 ) == 0:
+            return self
+
+        # dict novo: uma copia rasa anterior ao append continua com as tabelas antigas ( append_copy )
+        tables = dict( self.tables )
+        for resolution, key in TIME_KEYS.items():
+            dims = [key] + ROLLUP_DIMENSIONS
+            part = cell_sums( df1, dims ).set_index( dims )
+            current = tables[resolution]
+
+            if current is None:
+                tables[resolution] = part.sort_index()
+            else:
+                # buckets repetidos sao somados; concat + groupby mantem as contagens inteiras
+                tables[resolution] = pd.concat( [current, part] ).groupby( level=dims, observed=True ).sum()
+
+        self.tables = tables
+
+        return self
+
+    def _partial_bucket( self, resolution, limit ):
+        """ Bucket que contem limit, remontado com os dias anteriores a limit. """
+        key = TIME_KEYS[resolution]
+        days = self.tables['day']
+        day_keys = days.index.get_level_values( 0 ).to_numpy()
+
+        # nenhum bucket passa de 31 dias: so esses dias podem cair no bucket de limit
+        first, stop = time_keys( [limit - pd.Timedelta( days=31 ), limit] )['day_key']
+        recent = days.loc[( day_keys >= first ) & ( day_keys < stop )]
+
+        dates = pd.to_datetime( recent.index.get_level_values( 0 ).astype( str ), format='%Y%m%d' )
+        buckets = time_keys( dates )[key]
+        bucket = time_keys( [limit] )[key][0]
+
+        recent = recent.loc[buckets == bucket]
+        recent.index = pd.MultiIndex.from_arrays( [np.full( len( recent ), bucket, dtype=np.int32 ),
+                                                   recent.index.get_level_values( 1 )], names=[key] + ROLLUP_DIMENSIONS )
+
+        return recent.groupby( level=[key] + ROLLUP_DIMENSIONS, observed=True ).sum()
+
+    def cells( self, resolution, date_limit=None, traffic=None ):
+        """
+            Celulas ( bucket, transito ) com os filtros da barra lateral,
+            no formato do cubo ( para curry.cube.rollup ).
+
+            Input:
+                - resolution: 'day', 'week' ou 'month'
+                - date_limit: mantem Order_Date < date_limit; um limite no
+                  meio de uma semana ou mes corta o bucket, que e remontado
+                  com os dias anteriores ao limite
+                - traffic: lista de Road_traffic_density selecionados
+            Output:
+                - Dataframe com a chave do bucket, Road_traffic_density e as somas
+        """
+        key = TIME_KEYS[resolution]
+        table = self.tables[resolution]
+        if table is None:
+            return pd.DataFrame( columns=[key] + ROLLUP_DIMENSIONS + ['n'] )
+
+        if date_limit is not None:
+            # primeiro dia fora do filtro ( Order_Date < date_limit )
+            limit = pd.Timestamp( date_limit ).ceil( 'D' )
+            bucket = time_keys( [limit] )[key][0]
+            table = table.loc[table.index.get_level_values( 0 ) < bucket]
+            if resolution != 'day':
+                table = pd.concat( [table, self._partial_bucket( resolution, limit )] )
+
+        if traffic is not None:
+            table = table.loc[table.index.get_level_values( 1 ).isin( list( traffic ) )]
+
+        return table.reset_index()
+
+# ==================================== ::
+
+def load_time_rollups( path=DATASET_PATH ):
+    """ TimeRollups do dataset em cache, construido uma vez por versao do dataset. """
+    return load_derived( 'time_rollups', TimeRollups, path, append_copy )
@@ -2,16 +2,17 @@
 # ||||||||||||||| === LIBRARY ** BIBLIOTECAS === |||||||||||||||||
 # ================================================================
 
-import pandas as pd
 import streamlit as st
 import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-import folium
 
-from streamlit_folium import folium_static
-from haversine import haversine
-from PIL import Image
+# plotly ( graficos ) e streamlit.components ( mapa ) sao importados dentro
+# das funcoes: so a secao visivel paga o import, e so na primeira vez
+
+from curry.assets import LOGO_WIDTH, logo_png
+from curry.backends import get_backend
+from curry.cache import cached_figure, filter_key
+from curry.maps import MAP_MODES, country_map_html
+from curry.profiling import StageTimer
 
 st.set_page_config( page_title='Visão Empresa', page_icon='🔎', layout='wide' )
 
@@ -19,70 +20,55 @@ st.set_page_config( page_title='Visão Empresa', page_icon='🔎', layout='wide'
 # |||||||||||||||| === FUNCTIONS ** FUNÇÕES === ||||||||||||||||||
 # ================================================================
 
-def country_maps( df1 ):
-        
-        cols = ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude']
-        df_aux = ( df1.loc[:, cols]
-                      .groupby( ['City', 'Road_traffic_density'] )
-                      .median()
-                      .reset_index() )
- 
-        map = folium.Map()
-    
-        for index, location_info in df_aux.iterrows():
-            folium.Marker( [location_info['Delivery_location_latitude'],
-                            location_info['Delivery_location_longitude']],
-                            popup=location_info[['City', 'Road_traffic_density']] ).add_to( map )
-        
-        folium_static( map, width=1024, height=600 )
+def country_maps( query, mode, filter_key ):
+        """
+            Desenha o mapa da Visao Geografica. O HTML fica em cache pelo
+            estado dos filtros ( curry.maps ): filtros repetidos nao
+            agregam nem serializam o mapa de novo.
+        """
+        import streamlit.components.v1 as components
+
+        html = country_map_html( query, mode, filter_key )
+
+        components.html( html, width=1024, height=610 )
 
 # ______________________________________________________________
 # ______________________________________________________________
 
-def order_share_by_week( df1 ):
+def order_share_by_week( query ):
     # Quantidade de pedidos por semana / Número unico de entregadores por semana
-    df_aux1 = ( df1.loc[:, ['ID', 'week_of_year']]
-                   .groupby('week_of_year')
-                   .count()
-                   .reset_index() )
-    df_aux2 = ( df1.loc[:, ['Delivery_person_ID', 'week_of_year']]
-                   .groupby('week_of_year')
-                   .nunique()
-                   .reset_index() )
-            
-    df_aux = pd.merge( df_aux1, df_aux2, how='inner', on='week_of_year'  )
-    df_aux['order_by_deliver'] = df_aux['ID'] / df_aux['Delivery_person_ID'] 
+    import plotly.express as px
+
+    df_aux = query.table( 'order_share_by_week' )
         
-    fig = px.line( df_aux, x='week_of_year', y='order_by_deliver')
+    # eixo x pela data da semana ( nao volta a 1 na virada do ano ); o numero da semana ISO fica no hover
+    fig = px.line( df_aux, x='week_start', y='order_by_deliver', hover_data=['week_of_year'] )
     return fig
 
 # ______________________________________________________________
 # ______________________________________________________________
 
-def order_by_week( df1 ):
-    # criar coluna da semana
-    df1['week_of_year'] = df1['Order_Date'].dt.strftime( '%U' )
-    df_aux = ( df1.loc[:, ['ID','week_of_year']]
-                  .groupby('week_of_year')
-                  .count()
-                  .reset_index() )
-    fig = px.line( df_aux, x='week_of_year', y='ID' )
+def order_by_week( query ):
+    # pedidos por semana do ano, agregados pelo backend ( curry.backends )
+    import plotly.express as px
+
+    df_aux = query.table( 'order_by_week' )
+    fig = px.line( df_aux, x='week_start', y='ID', hover_data=['week_of_year'] )
     return fig
     
 
 # ______________________________________________________________
 # ______________________________________________________________
 
-def traffic_order_city( df1 ):
+def traffic_order_city( query ):
     """ 
-        Esta função recebe o df e retorna uma fig do percentual
+        Esta função recebe a consulta filtrada e retorna uma fig do percentual
         de entregas por 'City' - Grafico Scatter
 
     """
-    df_aux = ( df1.loc[:, ['ID', 'City', 'Road_traffic_density']]
-                  .groupby(['City', 'Road_traffic_density'])
-                  .count()
-                  .reset_index() )
+    import plotly.express as px
+
+    df_aux = query.table( 'traffic_order_city' )
     
     fig = px.scatter( df_aux, x='City', y='Road_traffic_density', size='ID', color='City' )
 
@@ -91,20 +77,15 @@ def traffic_order_city( df1 ):
 # ______________________________________________________________
 # ______________________________________________________________
 
-def traffic_order_share( df1 ):
+def traffic_order_share( query ):
     """ 
-        Esta função recebe o df e retorna uma fig do percentual
+        Esta função recebe a consulta filtrada e retorna uma fig do percentual
         de entregas por tipo de trafego - Grafico Pizza
 
     """
+    import plotly.express as px
                     
-    df_aux = ( df1.loc[:, ['ID', 'Road_traffic_density']]
-                                  .groupby('Road_traffic_density')
-                                  .count()
-                                  .reset_index() )
-    
-    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN', :]
-    df_aux['entregas_perc'] = df_aux['ID'] / df_aux['ID'].sum()
+    df_aux = query.table( 'traffic_order_share' )
                     
     fig = px.pie( df_aux,
                      values='entregas_perc', 
@@ -115,74 +96,19 @@ def traffic_order_share( df1 ):
 # ______________________________________________________________
 # ______________________________________________________________
 
-def order_metric( df1 ):
-    """ Esta funcao recebe um dataframe, executa, gera uma figura e devolve uma figura
+def order_metric( query ):
+    """ Esta funcao recebe a consulta filtrada, executa, gera uma figura e devolve uma figura
     """
     
-    cols= ['ID', 'Order_Date']
-    # selecao de linhas
-    df_aux = df1.loc[:, cols].groupby('Order_Date').count().reset_index() 
+    # pedidos por dia, somando as celulas do cubo ( curry.metrics )
+    import plotly.express as px
+
+    df_aux = query.table( 'order_metric' )
     # Desenhar Grafico
     fig = px.bar( df_aux, x='Order_Date', y='ID' )
 
     return fig
 
-# ______________________________________________________________
-# ______________________________________________________________
-
-def clean_code( df1 ):
-    """ Esta funcao tem a responsabilidade de limpar o data frame
-    
-        TIpos de limpeza:
-        1. removeção dos dados NaN
-        2. Mudança do tipo da coluna de dados
-        3. Removação dos espaços das variaveis de texto
-        4. Formatação da coluna de datas
-        5. Limpeza da coluna de tempo ( remoção do texto da variavel númerica )
-
-        Imput: Dataframe
-        Output: Dataframe
-    
-    """
-    # 1. Limpeza de 'NaN ' das colunas selecionadas
-    linhas_selecionadas = (df1['Delivery_person_Age'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['Road_traffic_density'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['City'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['Festival'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( int )
-    
-    # 2. convertendo a coluna 'Delivery_person_Ratings' de texto para num decimal
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float)
-    
-    # 3. convertendo a coluna 'Order_Date' de texto para data
-    df1['Order_Date'] = pd.to_datetime( df1['Order_Date'], format='%d-%m-%Y' )
-    
-    # 4. convertendo 'multiple_deliveries' de texto para numero inteiro
-    linhas_selecionadas = (df1['multiple_deliveries'] != 'NaN ' )
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( int )
-    
-    # 6. Removendo os espacos dentro de strings/texto/object
-    df1.loc[ :, 'ID' ] = df1.loc[ :, 'ID' ].str.strip()
-    df1.loc[ :, 'Road_traffic_density'] = df1.loc[ :, 'Road_traffic_density' ].str.strip()
-    df1.loc[ :, 'Type_of_order'] = df1.loc[ :, 'Type_of_order' ].str.strip()
-    df1.loc[ :, 'Type_of_vehicle'] = df1.loc[ :, 'Type_of_vehicle' ].str.strip()
-    df1.loc[ :, 'City' ] = df1.loc[ :, 'City' ].str.strip()
-    df1.loc[ :, 'Festival' ] = df1.loc[ :, 'Festival' ].str.strip()
-    
-    # 7. Limpando a coluna de time taken
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1] )
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype( int )
-
-    return df1
     
 # ***********************************************************************************************************************************************
 # **------------------------------------------------- || INICIO DA ESTRUTURA LÓGICA DO CÓDIGO || ----------------------------------------------**
@@ -190,13 +116,13 @@ def clean_code( df1 ):
 # ------------------ || IMPORT DATASET ||
 # ***************************************
 
-df = pd.read_csv( 'dataset/train.csv' )
-
-# ***************************************
-# --------------- || LIMPANDO OS DADOS ||
-# ***************************************
+# tempo por etapa desta execucao ( curry.profiling ); memoria so com o painel de debug
+timer = StageTimer( 'Visao Empresa', trace_memory=st.session_state.get( 'debug_stages', False ) )
 
-df1 = clean_code( df )
+# backend dos dados ( curry.backends ): 'pandas' em memoria ( padrao ) ou
+# 'sqlite', escolhido por CURRY_BACKEND; compartilhado pelo processo
+with timer.stage( 'backend' ):
+    backend = get_backend()
 
 # ***************************************************--------------------------------------------------------------------------
 # ------------------- || BARRA LATERAL **************--------------------------------------------------------------------------
@@ -204,9 +130,8 @@ df1 = clean_code( df )
 
 st.header( 'Marketplace - Visão Cliente' )
 
-#image_path = '/Users/leona/Documents/repos/jupyterlab/logo.PNG'
-image = Image.open( 'logo.PNG' )
-st.sidebar.image( image, width=120 )
+# logo decodificado uma vez por processo ( curry.assets ), nao a cada execucao
+st.sidebar.image( logo_png(), width=LOGO_WIDTH )
 
 st.sidebar.markdown( '# Cury Company' )
 st.sidebar.markdown( '## Fastest Delivery in Town' )
@@ -232,37 +157,42 @@ traffic_options = st.sidebar.multiselect(
 
 st.sidebar.markdown( """___""" )
 st.sidebar.markdown( '### Powered by Comunidade DS' )
+st.sidebar.checkbox( 'Debug: tempo por etapa', key='debug_stages' )
 
 # -------------------------------------
-# ********** FILTRO DE DATA ***********
+# ***** FILTROS DE DATA E TRANSITO *****
 # -------------------------------------
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
+# pandas: busca binaria na data + bitmaps de transito + recorte do cubo
+# sqlite: os filtros viram o WHERE de cada consulta
+with timer.stage( 'filter' ):
+    query = backend.query( date_slider, traffic_options )
 
-# -------------------------------------
-# ******** FILTRO DE TRANSITO *********
-# -------------------------------------
-
-linhas_selecionadas = df1['Road_traffic_density'].isin( traffic_options )
-df1 = df1.loc[linhas_selecionadas, :]
+# chave das figuras em cache: versao do dataset + estado dos filtros ( curry.cache )
+filter_state = filter_key( date_slider, traffic_options, version=backend.version() )
 
 # ***************************************************--------------------------------------------------------------------------
 # ------------------- || LAYOUT NO STREAMLIT ********--------------------------------------------------------------------------
 # ***************************************************--------------------------------------------------------------------------
 
-tab1, tab2, tab3 = st.tabs( ['Visao Gerencial', 'Visão Tática', 'Visão Geográfica'] )
+# st.tabs executa o corpo de todas as abas a cada interacao; com o seletor
+# so a secao visivel e calculada e as outras esperam ate serem abertas.
+# A escolha fica no session_state ( key ) e sobrevive as re-execucoes.
+SECTIONS = ['Visao Gerencial', 'Visão Tática', 'Visão Geográfica']
+section = st.radio( 'Seção', SECTIONS, horizontal=True, key='section_empresa', label_visibility='collapsed' )
 
 # ****************************************************************
 # ****|               TAB 01 - Visão Tática                 |*****
 # ****************************************************************
 
-with tab1:
+if section == 'Visao Gerencial':
     with st.container():
         
         # Order Metrics
         st.markdown ('# Orders by Day')
-        fig = order_metric( df1 )
-        st.plotly_chart( fig, use_container_width=True ) # pra exibir o grafico pelo streamlit
+        with timer.stage( 'order_metric' ):
+            fig = cached_figure( order_metric, query, filter_state )
+        with timer.stage( 'render/order_metric' ):
+            st.plotly_chart( fig, use_container_width=True ) # pra exibir o grafico pelo streamlit
 
 #----------------------- || CONTAINER ||
 
@@ -271,44 +201,54 @@ with tab1:
             col1, col2 = st.columns( 2 ) # uso para dividir a primeira coluna em 2
             
             with col1:
-                fig = traffic_order_share( df1 )
+                with timer.stage( 'traffic_order_share' ):
+                    fig = cached_figure( traffic_order_share, query, filter_state )
                 st.header( " Traffic Order Share " )
-                st.plotly_chart( fig, use_container_width=True )
+                with timer.stage( 'render/traffic_order_share' ):
+                    st.plotly_chart( fig, use_container_width=True )
                 
             with col2:
-                fig = traffic_order_city( df1 )
+                with timer.stage( 'traffic_order_city' ):
+                    fig = cached_figure( traffic_order_city, query, filter_state )
                 st.header( " Traffic Order City " )
-                st.plotly_chart( fig, use_container_width=True )
+                with timer.stage( 'render/traffic_order_city' ):
+                    st.plotly_chart( fig, use_container_width=True )
             
 #************************************************************
 #                       TAB 02 - Visão Tática
 #************************************************************
 
-with tab2:
+elif section == 'Visão Tática':
     with st.container():
         st.markdown( '# Order per Week' )
-        fig = order_by_week( df1 )
-        st.plotly_chart( fig, use_container_width=True )
+        with timer.stage( 'order_by_week' ):
+            fig = cached_figure( order_by_week, query, filter_state )
+        with timer.stage( 'render/order_by_week' ):
+            st.plotly_chart( fig, use_container_width=True )
 
 #----------------------- || CONTAINER ||
 
     with st.container():
         st.markdown( '# Order Share by Week' )
-        fig = order_share_by_week( df1 )
-        st.plotly_chart( fig, use_container_width=True )
+        with timer.stage( 'order_share_by_week' ):
+            fig = cached_figure( order_share_by_week, query, filter_state )
+        with timer.stage( 'render/order_share_by_week' ):
+            st.plotly_chart( fig, use_container_width=True )
 
         
 # *********************************************************
 #                 TAB 03 - VISÃO GEOGRAFICA
 # *********************************************************
 
-with tab3:    
+elif section == 'Visão Geográfica':
     st.markdown( '# Country Maps' )
-    country_maps( df1 )
-
-    
-    
-
-
-
-       
\ No newline at end of file
+    map_mode = st.radio( 'Modo do mapa', MAP_MODES, horizontal=True )
+    with timer.stage( f'country_maps/{map_mode}' ):
+        country_maps( query, map_mode, filter_state )
+
+# =================================== :: DEBUG ::
+#                                        -----
+# uma linha JSON por etapa no logger 'curry.stages'; tabela na barra lateral se pedido
+stages = timer.finish()
+if st.session_state.get( 'debug_stages', False ):
+    st.sidebar.dataframe( stages, hide_index=True )
@@ -2,16 +2,12 @@
 # ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
 # ================================================================
 
-import pandas as pd
 import streamlit as st
 import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-import folium
 
-from streamlit_folium import folium_static
-from haversine import haversine
-from PIL import Image
+from curry.assets import LOGO_WIDTH, logo_png
+from curry.backends import get_backend
+from curry.profiling import StageTimer
 
 st.set_page_config( page_title='Visão Entregadores', page_icon='🔎', layout='wide' ) 
 # layout='wide' faz usar todo o espaço do monitor
@@ -20,92 +16,28 @@ st.set_page_config( page_title='Visão Entregadores', page_icon='🔎', layout='
 # ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
 # ================================================================
 
-def top_delivers( df1, top_asc ):
-    
-#######    
-    """
-        Esta função recebe um DF e top_asc contendo "True" ou "False".
-        Ela retornara um DF com o top 10 entregadores mais Rapidos ou 
-        mais Centos por Cidade.
-    """
-#######    
-    
-    df2 = ( df1.loc[:, ['Delivery_person_ID', 'City', 'Time_taken(min)']]
-                           .groupby(['City', 'Delivery_person_ID'])
-                           .max()
-                           .sort_values(['City', 'Time_taken(min)'], ascending=top_asc )
-                           .reset_index() )
-            
-    df_aux01 = df2.loc[df2['City'] == 'Metropolitian', :].head(10)
-    df_aux02 = df2.loc[df2['City'] == 'Urban', :].head(10)
-    df_aux03 = df2.loc[df2['City'] == 'Semi-Urban', :].head(10)
-            
-    df3 = pd.concat( [df_aux01, df_aux02, df_aux03] ).reset_index( drop=True )
-
-    return df3
-    
-# ==================================== ::
-
-def clean_code( df1 ):
-    
-    # 1. Limpeza de 'NaN ' das colunas selecionadas
-    linhas_selecionadas = (df1['Delivery_person_Age'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['Road_traffic_density'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['City'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['Festival'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( int )
-    
-    # 2. convertendo a coluna 'Delivery_person_Ratings' de texto para num decimal
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float)
-    
-    # 3. convertendo a coluna 'Order_Date' de texto para data
-    df1['Order_Date'] = pd.to_datetime( df1['Order_Date'], format='%d-%m-%Y' )
-    
-    # 4. convertendo 'multiple_deliveries' de texto para numero inteiro
-    linhas_selecionadas = (df1['multiple_deliveries'] != 'NaN ' )
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( int )
-    
-    # 6. Removendo os espacos dentro de strings/texto/object
-    df1.loc[ :, 'ID' ] = df1.loc[ :, 'ID' ].str.strip()
-    df1.loc[ :, 'Road_traffic_density'] = df1.loc[ :, 'Road_traffic_density' ].str.strip()
-    df1.loc[ :, 'Type_of_order'] = df1.loc[ :, 'Type_of_order' ].str.strip()
-    df1.loc[ :, 'Type_of_vehicle'] = df1.loc[ :, 'Type_of_vehicle' ].str.strip()
-    df1.loc[ :, 'City' ] = df1.loc[ :, 'City' ].str.strip()
-    df1.loc[ :, 'Festival' ] = df1.loc[ :, 'Festival' ].str.strip()
-    
-    # 7. Limpando a coluna de time taken
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1] )
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype( int )
-    
-    return df1
+# agregacoes da pagina ficam em curry.metrics ( sem Streamlit ) e sao
+# servidas pelo backend ( curry.backends ) via query.table / query.kpis
     
 # =================================================================================
 # |||||||||||||||| === INICIO DA ESTRUTURA LÓGICA DO CÓDIGO  === ||||||||||||||||||
 # =================================================================================
 # =================================== :: IMPORT DATASET ::
 #                                        -------------
-df = pd.read_csv( 'dataset/train.csv' )
+# tempo por etapa desta execucao ( curry.profiling ); memoria so com o painel de debug
+timer = StageTimer( 'Visao Entregadores', trace_memory=st.session_state.get( 'debug_stages', False ) )
 
-# =================================== :: CLEAN DATASET ::
-#                                        -------------
-df1 = clean_code( df )
+# backend dos dados ( curry.backends ): 'pandas' em memoria ( padrao ) ou
+# 'sqlite', escolhido por CURRY_BACKEND; compartilhado pelo processo
+with timer.stage( 'backend' ):
+    backend = get_backend()
 
 # =================================== :: SIDEBAR ::
 #                                        -------
 st.header( 'Marketplace - Visão Entregadores' )
 
-#image_path = '/Users/leona/Documents/repos/jupyterlab/logo.PNG'
-image = Image.open( 'logo.PNG' )
-st.sidebar.image( image, width=120 )
+# logo decodificado uma vez por processo ( curry.assets ), nao a cada execucao
+st.sidebar.image( logo_png(), width=LOGO_WIDTH )
 
 
 st.sidebar.markdown( '# Cury Company' )
@@ -132,14 +64,13 @@ traffic_options = st.sidebar.multiselect(
 
 st.sidebar.markdown( """___""" )
 st.sidebar.markdown( '### Powered by Comunidade DS' )
+st.sidebar.checkbox( 'Debug: tempo por etapa', key='debug_stages' )
 
-# Filtro de Data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
-
-# Filtro de Transito
-linhas_selecionadas = df1['Road_traffic_density'].isin( traffic_options )
-df1 = df1.loc[linhas_selecionadas, :]
+# Filtros de Data e Transito
+# pandas: busca binaria na data + bitmaps de transito + recorte do cubo
+# sqlite: os filtros viram o WHERE de cada consulta
+with timer.stage( 'filter' ):
+    query = backend.query( date_slider, traffic_options )
 
 #=================================================================
 #                         LAYOUT NO STREAMLIT
@@ -150,27 +81,27 @@ tab1, tab2, tab3 = st.tabs( ['Visao Gerencial', '_', '_'] )
 with tab1:
     with st.container():
         st.title( 'Overall Metrics' )
+        # idades e condicao de veiculo em uma unica agregacao ( curry.kpi )
+        with timer.stage( 'compute_kpis' ):
+            kpis = query.kpis( ['max_age', 'min_age', 'best_vehicle_condition', 'worst_vehicle_condition'] )
+
         col1, col2, col3, col4 = st.columns( 4, gap='large' )
         
         with col1:       
             # A Maior idade dos entregadores
-            max_age = df1.loc[:, 'Delivery_person_Age'].max()
-            col1.metric( 'Maior Idade', max_age )
+            col1.metric( 'Maior Idade', kpis.max_age )
             
         with col2:
             # A Menor idade dos entregadores
-            min_age = df1['Delivery_person_Age'].min()
-            col2.metric( 'Menor Idade', min_age )
+            col2.metric( 'Menor Idade', kpis.min_age )
             
         with col3:
             # A Melhor condição de veiculo
-            max_vehicle_condition = df1['Vehicle_condition'].max()
-            col3.metric( 'Melhor condição de veiculos', max_vehicle_condition )
+            col3.metric( 'Melhor condição de veiculos', kpis.best_vehicle_condition )
             
         with col4:
             # A Pior condição de veiculo
-            min_vehicle_condition = df1['Vehicle_condition'].min()
-            col4.metric( ' Pior condição', min_vehicle_condition )
+            col4.metric( ' Pior condição', kpis.worst_vehicle_condition )
             
 # ==================================== ::
 
@@ -181,35 +112,24 @@ with tab1:
         col1, col2 = st.columns( 2 )
         with col1:
             st.subheader( 'Avaliação média por entregador' )
-            df_avg_ratings_per_deliver = (df1.loc[:, ['Delivery_person_ID','Delivery_person_Ratings']]
-                                             .groupby('Delivery_person_ID')
-                                             .mean()
-                                             .reset_index())
+            with timer.stage( 'rating_by_courier' ):
+                df_avg_ratings_per_deliver = query.table( 'rating_by_courier' )
             st.dataframe( df_avg_ratings_per_deliver, height=600 )
 
             
         with col2:
             st.subheader( 'Avaliação média por transito' )
             
-            df_avg_std_rating_by_traffic = ( df1.loc[:, ['Delivery_person_Ratings','Road_traffic_density']]
-                                                .groupby('Road_traffic_density')
-                                                .agg( {'Delivery_person_Ratings': ['mean', 'std'] } ) )
-            # mudanca de nome das colunas
-            df_avg_std_rating_by_traffic.columns = ['delivery_mean', 'delivery_std']
-            # reset do index
-            df_avg_std_rating_by_traffic.reset_index()
+            with timer.stage( 'rating_by_traffic' ):
+                # media e desvio ja com as colunas delivery_mean / delivery_std
+                df_avg_std_rating_by_traffic = query.table( 'rating_by_traffic' ).set_index( 'Road_traffic_density' )
             st.dataframe( df_avg_std_rating_by_traffic )
 
             st.markdown( """___""" )
             with st.container():
                 st.subheader( 'Avaliação média por condição climatica' )
-                df_avg_std_rating_by_weather = ( df1.loc[:, ['Delivery_person_Ratings','Weatherconditions']]
-                                                    .groupby('Weatherconditions')
-                                                    .agg( {'Delivery_person_Ratings': ['mean', 'std'] } ) )
-                # mudanca de nome das colunas
-                df_avg_std_rating_by_weather.columns = ['delivery_mean', 'delivery_std']
-                # reset do index
-                df_avg_std_rating_by_weather.reset_index()
+                with timer.stage( 'rating_by_weather' ):
+                    df_avg_std_rating_by_weather = query.table( 'rating_by_weather' ).set_index( 'Weatherconditions' )
                 st.dataframe( df_avg_std_rating_by_weather )
     
                 
@@ -225,19 +145,29 @@ with tab1:
         st.title(' Velocidade de Entrega' )
         col1, col2 = st.columns( 2 )
         
+        # rapidos e lentos saem do mesmo groupby
+        with timer.stage( 'top_delivers' ):
+            df_fastest = query.table( 'top_fastest' )
+            df_slowest = query.table( 'top_slowest' )
+
         with col1:
             st.subheader( 'Top Entregadores mais rapidos' )
-            df3 = top_delivers( df1, top_asc=True )
-            st.dataframe( df3 )
+            st.dataframe( df_fastest )
 
 
         with col2:
             st.subheader( 'Top Entregadores mais lentos' )
-            df3 = top_delivers( df1, top_asc=False )
-            st.dataframe( df3 )
+            st.dataframe( df_slowest )
             
 # ====================================================================================================::
 # ====================================================================================================::
+
+# =================================== :: DEBUG ::
+#                                        -----
+# uma linha JSON por etapa no logger 'curry.stages'; tabela na barra lateral se pedido
+stages = timer.finish()
+if st.session_state.get( 'debug_stages', False ):
+    st.sidebar.dataframe( stages, hide_index=True )
             
 
 
@@ -251,23 +181,3 @@ with tab1:
 #                    
 #                
 #                return results
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
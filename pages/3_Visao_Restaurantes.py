@@ -2,17 +2,17 @@
 # ||||||||||||||||||||||| === LIBRARY === |||||||||||||||||||||||||
 # ================================================================
 
-import pandas as pd
 import streamlit as st
 import numpy as np
 import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-import folium
 
-from streamlit_folium import folium_static
-from haversine import haversine
-from PIL import Image
+# plotly e importado dentro das funcoes dos graficos: so na primeira figura
+# que nao esta em cache ( curry.cache )
+
+from curry.assets import LOGO_WIDTH, logo_png
+from curry.backends import get_backend
+from curry.cache import cached_figure, filter_key
+from curry.profiling import StageTimer
 
 st.set_page_config( page_title='Visão Restaurantes', page_icon='🔎', layout='wide' )
 
@@ -20,14 +20,10 @@ st.set_page_config( page_title='Visão Restaurantes', page_icon='🔎', layout='
 # ||||||||||||||||||||| === FUNCTIONS === ||||||||||||||||||||||||
 # ================================================================
 
-def avg_std_time_on_traffic( df1 ):
-    df_aux = ( df1.loc[:, ['Time_taken(min)', 'City', 'Road_traffic_density']]
-                  .groupby( ['City', 'Road_traffic_density'] )
-                  .agg( {'Time_taken(min)': ['mean', 'std'] } ) )
-                
-    df_aux.columns = ['avg_time', 'std_time']
-                
-    df_aux = df_aux.reset_index()
+def avg_std_time_on_traffic( query ):
+    import plotly.express as px
+
+    df_aux = query.table( 'time_by_city_traffic' )
                 
     fig = px.sunburst( df_aux, path=['City', 'Road_traffic_density'],
                                 values='avg_time',
@@ -37,13 +33,10 @@ def avg_std_time_on_traffic( df1 ):
 
 # ==================================== ::
 
-def avg_std_time_graph( df1):
-    df_aux = ( df1.loc[:, ['Time_taken(min)', 'City']]
-                  .groupby('City')
-                  .agg( {'Time_taken(min)': ['mean','std']}) )
-                    
-    df_aux.columns = ['avg_time', 'std_time']
-    df_aux = df_aux.reset_index()
+def avg_std_time_graph( query ):
+    import plotly.graph_objects as go
+
+    df_aux = query.table( 'time_by_city' )
         
     fig = go.Figure()
     fig.add_trace( go.Bar( name='Control',
@@ -57,99 +50,21 @@ def avg_std_time_graph( df1):
 
 # ==================================== ::
 
-def avg_std_time_delivery( df1, festival, op ):
-         
-    """
-        Esta funcao calcula o tempo médio e o desvio padrão
-        do tempo de entrega.
-        Parametros:
-             Input:
-                 - df: Dataframe com os dados necessários para o cálculo
-                 - festival: Se está ou não dentro do festival
-                     'Yes': Esta no festival
-                     'No': Não esta no festival
-                 - op: Tipo de operação que precisa ser calculado
-                      'avg_time': Calcula o tempo médio
-                      'std_time': Calcula o desvio padrão do tempo.
-              Output:
-                  - df: Dataframe com 2 colunas e 1 linha
-    """       
-    cols = ['Time_taken(min)', 'Festival']
-    df_aux = ( df1.loc[:, cols]
-                   .groupby('Festival')
-                   .agg( {'Time_taken(min)': ['mean','std'] } ) )     
-
-    df_aux.columns = ['avg_time', 'std_time']
-    df_aux = df_aux.reset_index()
-        
-    df_aux = np.round( df_aux.loc[df_aux['Festival'] == festival, op], 2 )
-    return df_aux
-
-
-# ==================================== ::
-
-def distance( df1, fig ):
+def distance( query, fig ):
+    # 'distance_km' ja vem calculada na carga do dataset ( curry.data )
+    # e somada nas celulas do cubo ( curry.cube / curry.metrics )
     if fig == 'False':
-        cols = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude' ]
-        df1['distance'] = ( df1.loc[:, cols].apply( lambda x: haversine( 
-                                                            (x['Restaurant_latitude'], x['Restaurant_longitude']), 
-                                                            (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ), axis=1 ) )
-        avg_distance = np.round( df1['distance'].mean(), 2)
+        avg_distance = query.kpis( ['avg_distance'] ).avg_distance
         return avg_distance
 
     else:
-        cols = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude' ]
-        df1['distance'] = ( df1.loc[:, cols].apply( lambda x: haversine( 
-                                                            (x['Restaurant_latitude'], x['Restaurant_longitude']), 
-                                                            (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ), axis=1 ) )
-        avg_distance = df1.loc[:, ['City', 'distance']].groupby( 'City' ).mean().reset_index()
-        fig = go.Figure( data=[go.Pie( labels=avg_distance['City'], values=avg_distance['distance'], pull=[0,0.1,0] ) ] )
+        import plotly.graph_objects as go
+
+        avg_distance = query.table( 'distance_by_city' )
+        fig = go.Figure( data=[go.Pie( labels=avg_distance['City'], values=avg_distance['distance_mean'], pull=[0,0.1,0] ) ] )
         
         return fig
     
-# ==================================== ::
-
-def clean_code( df1 ):
-    
-    # 1. Limpeza de 'NaN ' das colunas selecionadas
-    linhas_selecionadas = (df1['Delivery_person_Age'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['Road_traffic_density'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['City'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['Festival'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( int )
-    
-    # 2. convertendo a coluna 'Delivery_person_Ratings' de texto para num decimal
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float)
-    
-    # 3. convertendo a coluna 'Order_Date' de texto para data
-    df1['Order_Date'] = pd.to_datetime( df1['Order_Date'], format='%d-%m-%Y' )
-    
-    # 4. convertendo 'multiple_deliveries' de texto para numero inteiro
-    linhas_selecionadas = (df1['multiple_deliveries'] != 'NaN ' )
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( int )
-    
-    # 6. Removendo os espacos dentro de strings/texto/object
-    df1.loc[ :, 'ID' ] = df1.loc[ :, 'ID' ].str.strip()
-    df1.loc[ :, 'Road_traffic_density'] = df1.loc[ :, 'Road_traffic_density' ].str.strip()
-    df1.loc[ :, 'Type_of_order'] = df1.loc[ :, 'Type_of_order' ].str.strip()
-    df1.loc[ :, 'Type_of_vehicle'] = df1.loc[ :, 'Type_of_vehicle' ].str.strip()
-    df1.loc[ :, 'City' ] = df1.loc[ :, 'City' ].str.strip()
-    df1.loc[ :, 'Festival' ] = df1.loc[ :, 'Festival' ].str.strip()
-    
-    # 7. Limpando a coluna de time taken
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1] )
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype( int )
-    
-    return df1
     
 # =================================================================================
 # |||||||||||||||| === INICIO DA ESTRUTURA LÓGICA DO CÓDIGO  === ||||||||||||||||||
@@ -157,19 +72,20 @@ def clean_code( df1 ):
 
 # =================================== :: IMPORT DATASET ::
 #                                        -------------
-df = pd.read_csv( 'dataset/train.csv' )
+# tempo por etapa desta execucao ( curry.profiling ); memoria so com o painel de debug
+timer = StageTimer( 'Visao Restaurantes', trace_memory=st.session_state.get( 'debug_stages', False ) )
 
-# =================================== :: CLEAN DATASET ::
-#                                        -------------
-df1 = clean_code( df )
+# backend dos dados ( curry.backends ): 'pandas' em memoria ( padrao ) ou
+# 'sqlite', escolhido por CURRY_BACKEND; compartilhado pelo processo
+with timer.stage( 'backend' ):
+    backend = get_backend()
 
 # =================================== :: SIDEBAR ::
 #                                        -------
 st.header( 'Marketplace - Visão Restaurantes' )
 
-#image_path = '/Users/leona/Documents/repos/jupyterlab/logo.PNG'
-image = Image.open( 'logo.PNG' )
-st.sidebar.image( image, width=120 )
+# logo decodificado uma vez por processo ( curry.assets ), nao a cada execucao
+st.sidebar.image( logo_png(), width=LOGO_WIDTH )
 
 st.sidebar.markdown( '# Cury Company' )
 st.sidebar.markdown( '## Fastest Delivery in Town' )
@@ -195,14 +111,16 @@ traffic_options = st.sidebar.multiselect(
 
 st.sidebar.markdown( """___""" )
 st.sidebar.markdown( '### Powered by Comunidade DS' )
+st.sidebar.checkbox( 'Debug: tempo por etapa', key='debug_stages' )
 
-# Filtro de Data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
+# Filtros de Data e Transito
+# pandas: busca binaria na data + bitmaps de transito + recorte do cubo
+# sqlite: os filtros viram o WHERE de cada consulta
+with timer.stage( 'filter' ):
+    query = backend.query( date_slider, traffic_options )
 
-# Filtro de Transito
-linhas_selecionadas = df1['Road_traffic_density'].isin( traffic_options )
-df1 = df1.loc[linhas_selecionadas, :]
+# chave das figuras em cache: versao do dataset + estado dos filtros ( curry.cache )
+filter_state = filter_key( date_slider, traffic_options, version=backend.version() )
 
 #=================================================================::
 #                         LAYOUT NO STREAMLIT
@@ -214,34 +132,34 @@ with tab1:
     with st.container():
         st.title( "Overal Metrics" )
 
+        # todos os cards calculados de uma vez ( curry.kpi )
+        with timer.stage( 'compute_kpis' ):
+            kpis = query.kpis( ['unique_couriers', 'avg_distance',
+                                'festival_avg_time', 'festival_std_time',
+                                'no_festival_avg_time', 'no_festival_std_time'] )
+
         col1, col2, col3, col4, col5, col6 = st.columns(6)
         with col1:
-            delivery_unique = df1.Delivery_person_ID.nunique()
-            col1.metric( 'Entregadores Unicos', delivery_unique )
+            col1.metric( 'Entregadores Unicos', kpis.unique_couriers )
 #                         *******************        
         with col2:
-            avg_distance = distance ( df1, fig='False' )
-            col2.metric( 'Distancia Média', avg_distance )
+            col2.metric( 'Distancia Média', kpis.avg_distance )
 #                         ***************
 
         with col3:
-            df_aux = avg_std_time_delivery( df1, 'Yes', 'avg_time' )
-            col3.metric( 'Tempo Médio', df_aux )
+            col3.metric( 'Tempo Médio', kpis.festival_avg_time )
 #                         ***********
         
         with col4:
-            df_aux = avg_std_time_delivery( df1, 'Yes', 'std_time' )
-            col4.metric( 'STD Entrega', df_aux )
+            col4.metric( 'STD Entrega', kpis.festival_std_time )
 #                         ***********          
       
         with col5:
-            df_aux = avg_std_time_delivery( df1, 'No', 'avg_time' )
-            col5.metric( 'Tempo Médio', df_aux )
+            col5.metric( 'Tempo Médio', kpis.no_festival_avg_time )
 #                         ***********  
         
         with col6:
-            df_aux = avg_std_time_delivery( df1, 'No', 'std_time' )
-            col6.metric( 'STD Entrega', df_aux )
+            col6.metric( 'STD Entrega', kpis.no_festival_std_time )
 #                         ***********            
 
 # =================================== :: CONTAINER ::
@@ -255,13 +173,8 @@ with tab1:
             st.markdown( """___""" )
             st.subheader( "Distribuição da Distancia" )
 #                          *************************         
-            df_aux = ( df1.loc[:, ['Time_taken(min)', 'City', 'Type_of_order' ]]
-                          .groupby( ['City', 'Type_of_order'] )
-                          .agg( {'Time_taken(min)': ['mean','std'] }) )
-            
-            df_aux.columns = ['avg_time', 'std_time']
-            
-            df_aux = df_aux.reset_index()
+            with timer.stage( 'time_by_city_order' ):
+                df_aux = query.table( 'time_by_city_order' )
             
             st.dataframe( df_aux, use_container_width=True )
 
@@ -269,8 +182,10 @@ with tab1:
             st.markdown( """___""" )
             st.subheader( 'Média de tempo por cidade' )
 #                          *************************        
-            fig = avg_std_time_graph( df1)    
-            st.plotly_chart( fig, use_container_width=True )
+            with timer.stage( 'avg_std_time_graph' ):
+                fig = cached_figure( avg_std_time_graph, query, filter_state )    
+            with timer.stage( 'render/avg_std_time_graph' ):
+                st.plotly_chart( fig, use_container_width=True )
         
 # =================================== :: CONTAINER ::
 #                                        ---------
@@ -284,32 +199,36 @@ with tab1:
         with col1:
             st.subheader( "Distancia Média de Entrega" )
 #                          ********************************      
-            fig = distance( df1, fig=True )
-            st.plotly_chart( fig, use_container_width=True )
+            with timer.stage( 'distance' ):
+                fig = cached_figure( distance, query, filter_state, True )
+            with timer.stage( 'render/distance' ):
+                st.plotly_chart( fig, use_container_width=True )
             
             
         with col2:
             st.subheader( 'Tempo médio por tipo de entrega' )
 #                          *******************************    
-            fig = avg_std_time_on_traffic( df1 )
-            st.plotly_chart( fig, use_container_width=True )
-            
-        
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+            with timer.stage( 'avg_std_time_on_traffic' ):
+                fig = cached_figure( avg_std_time_on_traffic, query, filter_state )
+            with timer.stage( 'render/avg_std_time_on_traffic' ):
+                st.plotly_chart( fig, use_container_width=True )
 
+# =================================== :: CONTAINER ::
+#                                        ---------
 
-        
-        
\ No newline at end of file
+    with st.container():
+        st.markdown( """___""" )
+        st.subheader( 'Percentis do tempo de entrega ( p50, p90, p99 )' )
+#                      *************************************************
+        # percentis dos sketches por celula ( curry.quantiles ), sem ordenar as linhas
+        with timer.stage( 'time_quantiles' ):
+            df_aux = query.table( 'time_quantiles' ).round( 2 )
+
+        st.dataframe( df_aux, use_container_width=True, hide_index=True )
+
+# =================================== :: DEBUG ::
+#                                        -----
+# uma linha JSON por etapa no logger 'curry.stages'; tabela na barra lateral se pedido
+stages = timer.finish()
+if st.session_state.get( 'debug_stages', False ):
+    st.sidebar.dataframe( stages, hide_index=True )